@@ -0,0 +1,128 @@
+# bench/_common.py
+"""
+Общие утилиты для бенчмарков: поднимаем Django на временной SQLite-базе
+(рабочий db.sqlite3 не трогаем), сидим данные и считаем перцентили.
+"""
+import atexit
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(db_path=None):
+    """Настраивает Django на отдельной базе и прогоняет миграции. Возвращает путь к базе."""
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "kanban_backend.settings")
+
+    from django.conf import settings
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(prefix="kanban-bench-", suffix=".sqlite3")
+        os.close(fd)
+        atexit.register(os.remove, db_path)
+    else:
+        db_path = str(db_path)
+    settings.DATABASES["default"]["NAME"] = db_path
+    settings.ALLOWED_HOSTS = ["*"]
+    settings.DEBUG = False
+    settings.QUERY_INSPECTOR = {**getattr(settings, "QUERY_INSPECTOR", {}), "ENABLED": False}
+    # нагрузочные прогоны пишут быстрее любого человека — лимиты меряются отдельно (bench/throttle_overhead.py)
+    settings.RATE_LIMITS = {**getattr(settings, "RATE_LIMITS", {}), "ENABLED": False}
+
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+    return db_path
+
+
+# профили данных «тенантов» для нагрузочных прогонов
+PROFILES = {
+    "small": dict(users=10, projects=3, tasks_per_project=40, participants_per_project=5),
+    "medium": dict(users=100, projects=20, tasks_per_project=300, participants_per_project=15),
+    "large": dict(users=1000, projects=60, tasks_per_project=2000, participants_per_project=40),
+}
+
+PASSWORD = "bench-pass"
+
+
+def seed(users=20, projects=5, tasks_per_project=200, participants_per_project=None, password=PASSWORD):
+    """
+    Пользователи с профилями + проекты + задачи по всем колонкам.
+    Пароль хэшируется один раз, всё пишется bulk_create (иначе PBKDF2 на тысячу
+    пользователей занимает минуты). Участники проекта — скользящее окно по
+    пользователям; bench0 состоит во всех проектах.
+    """
+    from datetime import timedelta
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from tasks.models import Project, Task, UserProfile
+
+    hashed = make_password(password)
+    created = User.objects.bulk_create(
+        [User(username=f"bench{i}", password=hashed) for i in range(users)]
+    )
+    UserProfile.objects.bulk_create([
+        UserProfile(user=u, display_name=f"Bench User {i}", role="Разработчик")
+        for i, u in enumerate(created)
+    ])
+
+    per_project = min(participants_per_project or users, users)
+    columns = [c for c, _ in Task.COLUMN_CHOICES]
+    priorities = [p for p, _ in Task.PRIORITY_CHOICES]
+    today = timezone.localdate()
+    Membership = Project.participants.through
+    for p in range(projects):
+        project = Project.objects.create(title=f"Bench project {p}", due_date=today + timedelta(days=30))
+        members = {created[0]} | {created[(p * per_project + k) % users] for k in range(per_project)}
+        members = sorted(members, key=lambda u: u.pk)
+        Membership.objects.bulk_create([Membership(project=project, user=u) for u in members])
+        batch = []
+        for t in range(tasks_per_project):
+            col = columns[t % len(columns)]
+            due = today + timedelta(days=(t % 21) - 7)
+            batch.append(Task(
+                project=project,
+                title=f"Task {p}-{t}",
+                description="Lorem ipsum dolor sit amet " * 4,
+                column=col,
+                position=t,
+                priority=priorities[t % len(priorities)],
+                responsible=members[t % len(members)],
+                due_date=due,
+                completed_at=(due + timedelta(days=(t % 3) - 1)) if col == "done" else None,
+            ))
+        Task.objects.bulk_create(batch, batch_size=1000)
+    # bulk_create обходит счётчики проектов — пересчитываем разом
+    from tasks.counters import reconcile
+    reconcile()
+    return created
+
+
+def seed_profile(name):
+    return seed(**PROFILES[name])
+
+
+def percentile(sorted_values, q):
+    """q-перцентиль (0..100) по уже отсортированному списку, nearest-rank."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(q / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def summarize(latencies, elapsed, errors=0):
+    lat = sorted(latencies)
+    n = len(lat)
+    return {
+        "requests": n,
+        "errors": errors,
+        "rps": n / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(lat, 50) * 1000,
+        "p95_ms": percentile(lat, 95) * 1000,
+        "p99_ms": percentile(lat, 99) * 1000,
+    }
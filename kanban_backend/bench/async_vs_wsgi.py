@@ -0,0 +1,136 @@
+# bench/async_vs_wsgi.py
+"""
+Сравнение WSGI (sync DRF-вьюхи) и ASGI (tasks/async_views.py) под конкурентной нагрузкой.
+
+Сервер не нужен: WSGI-приложение вызываем напрямую из пула потоков
+(как делает многопоточный gunicorn), ASGI-приложение — из одного event loop
+с N одновременными корутинами (как uvicorn). Так сравнивается именно
+Django-стек, без шума сети.
+
+    python bench/async_vs_wsgi.py --concurrency 32 --requests 2000
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _common import setup_django, seed, summarize
+
+# пары (sync-путь, async-путь); {project} подставляется id первого проекта
+ENDPOINTS = [
+    ("me", "/api/me/", "/api/async/me/"),
+    ("users", "/api/users/", "/api/async/users/"),
+    ("board", "/api/tasks/?project={project}", "/api/async/tasks/?project={project}"),
+    ("projects", "/api/projects/", "/api/async/projects/"),
+]
+
+
+def login_cookie(user):
+    from django.conf import settings
+    from django.test import Client
+    client = Client()
+    client.force_login(user)
+    return f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+
+def run_wsgi(path, cookie, total, concurrency):
+    from django.core.wsgi import get_wsgi_application
+    from django.test import RequestFactory
+
+    app = get_wsgi_application()
+    rf = RequestFactory()
+    status_codes = []
+
+    def one(_):
+        environ = rf.get(path, HTTP_COOKIE=cookie, HTTP_ACCEPT="application/json").environ
+        started = time.perf_counter()
+        result = app(environ, lambda status, headers, exc_info=None: status_codes.append(status))
+        b"".join(result)
+        if hasattr(result, "close"):
+            result.close()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+    errors = sum(1 for s in status_codes if not s.startswith("2"))
+    return summarize(latencies, elapsed, errors)
+
+
+def run_asgi(path, cookie, total, concurrency):
+    from django.core.asgi import get_asgi_application
+
+    app = get_asgi_application()
+    raw_path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": raw_path, "raw_path": raw_path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"cookie", cookie.encode()),
+                    (b"accept", b"application/json")],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+
+    async def one():
+        statuses = []
+        body_sent = False
+
+        async def receive():
+            nonlocal body_sent
+            if body_sent:
+                # клиент «висит» до конца ответа; Django отменит это ожидание сам
+                await asyncio.Future()
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        started = time.perf_counter()
+        await app(dict(scope), receive, send)
+        return time.perf_counter() - started, statuses[0] if statuses else 500
+
+    async def main():
+        sem = asyncio.Semaphore(concurrency)
+
+        async def guarded():
+            async with sem:
+                return await one()
+
+        return await asyncio.gather(*(guarded() for _ in range(total)))
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    elapsed = time.perf_counter() - started
+    errors = sum(1 for _, s in results if s >= 400)
+    return summarize([lat for lat, _ in results], elapsed, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--tasks", type=int, default=200, help="задач в проекте")
+    parser.add_argument("--only", choices=[name for name, _, _ in ENDPOINTS])
+    args = parser.parse_args()
+
+    setup_django()
+    users = seed(users=20, projects=3, tasks_per_project=args.tasks)
+    from tasks.models import Project
+    project_id = Project.objects.order_by("id").values_list("id", flat=True).first()
+    cookie = login_cookie(users[0])
+
+    print(f"{'endpoint':<10} {'mode':<5} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, sync_path, async_path in ENDPOINTS:
+        if args.only and name != args.only:
+            continue
+        for mode, path, runner in (("wsgi", sync_path, run_wsgi), ("asgi", async_path, run_asgi)):
+            res = runner(path.format(project=project_id), cookie, args.requests, args.concurrency)
+            print(f"{name:<10} {mode:<5} {res['rps']:>9.1f} {res['p50_ms']:>9.2f} "
+                  f"{res['p99_ms']:>9.2f} {res['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
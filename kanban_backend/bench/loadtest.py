@@ -0,0 +1,321 @@
+# bench/loadtest.py
+"""
+Нагрузочный прогон, повторяющий реальные сценарии фронтенда.
+
+Виртуальный пользователь (как в locust) логинится через /api/csrf/ + /api/login/
+(Login.jsx), открывает список проектов (ProjectsPage.jsx) и дальше в цикле
+с «паузой на подумать» выбирает взвешенное действие:
+
+    board     — загрузка доски: проект, задачи, участники, все пользователи (ProjectBoard.jsx)
+    drag      — перетаскивание карточки в другую колонку: PATCH + GET задачи
+    edit      — редактирование в модалке: PATCH + GET задачи
+    upload    — загрузка картинки в задачу (multipart) + GET задачи
+    projects  — список проектов + задачи каждой карточки (ProjectCard.jsx)
+
+Цели:
+    --target asgi              — in-process ASGI-приложение на временной базе
+                                 с сидом профиля --profile (сеть не нужна);
+    --target http://host:port  — живой сервер (runserver/gunicorn/uvicorn); базу
+                                 для него заранее наполняет `loadtest.py seed`.
+
+    python bench/loadtest.py run --target asgi --profile small --users 20 --duration 30
+    python bench/loadtest.py seed --profile medium --db db.sqlite3
+    python bench/loadtest.py run --target http://127.0.0.1:8000 --users 50 --duration 60
+"""
+import argparse
+import asyncio
+import atexit
+import io
+import json
+import random
+import shutil
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from http.cookies import SimpleCookie
+
+from _common import PASSWORD, PROFILES, setup_django, seed_profile, summarize
+
+COLUMNS = ["new", "in_progress", "testing", "review", "done"]
+WEIGHTS = {"board": 5, "drag": 4, "edit": 2, "upload": 1, "projects": 2}
+
+
+# ---- Транспорты ----
+class AsgiTransport:
+    def __init__(self):
+        from django.core.asgi import get_asgi_application
+        self.app = get_asgi_application()
+
+    async def request(self, method, path, headers, body=b""):
+        raw_path, _, query = path.partition("?")
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": raw_path, "raw_path": raw_path.encode(),
+            "query_string": query.encode(), "root_path": "",
+            "headers": [(b"host", b"testserver"), (b"content-length", str(len(body)).encode())]
+                       + [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+        }
+        sent = False
+        status = 500
+        resp_headers = []
+        chunks = []
+
+        async def receive():
+            nonlocal sent
+            if sent:
+                await asyncio.Future()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            nonlocal status, resp_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                resp_headers = [(k.decode(), v.decode()) for k, v in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, resp_headers, b"".join(chunks)
+
+
+class HttpTransport:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def _do(self, method, path, headers, body):
+        req = urllib.request.Request(self.base_url + path, data=body or None, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                return resp.status, list(resp.headers.items()), resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, list(e.headers.items()), e.read()
+        except OSError:
+            return 599, [], b""
+
+    async def request(self, method, path, headers, body=b""):
+        return await asyncio.to_thread(self._do, method, path, headers, body)
+
+
+# ---- Статистика ----
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, name, seconds, ok):
+        self.latencies[name].append(seconds)
+        if not ok:
+            self.errors[name] += 1
+
+    def report(self, elapsed):
+        print(f"{'request':<28} {'count':>7} {'err %':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        total, total_err, all_lat = 0, 0, []
+        for name in sorted(self.latencies):
+            lat = self.latencies[name]
+            res = summarize(lat, elapsed, self.errors[name])
+            total += res["requests"]
+            total_err += res["errors"]
+            all_lat += lat
+            print(f"{name:<28} {res['requests']:>7} {100 * res['errors'] / max(res['requests'], 1):>6.1f} "
+                  f"{res['rps']:>8.1f} {res['p50_ms']:>8.1f} {res['p95_ms']:>8.1f} {res['p99_ms']:>8.1f}")
+        res = summarize(all_lat, elapsed, total_err)
+        print(f"{'TOTAL':<28} {total:>7} {100 * total_err / max(total, 1):>6.1f} "
+              f"{res['rps']:>8.1f} {res['p50_ms']:>8.1f} {res['p95_ms']:>8.1f} {res['p99_ms']:>8.1f}")
+
+
+def _tiny_png():
+    try:
+        from PIL import Image
+    except ImportError:
+        # 1×1 прозрачный PNG
+        return bytes.fromhex(
+            "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+            "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+        )
+    buf = io.BytesIO()
+    Image.new("RGB", (640, 480), (random.randrange(256), 120, 200)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+# ---- Виртуальный пользователь ----
+class VirtualUser:
+    def __init__(self, transport, stats, username, think_time):
+        self.t = transport
+        self.stats = stats
+        self.username = username
+        self.think_time = think_time
+        self.cookies = {}
+        self.project_ids = []
+        self.tasks = {}  # project_id -> список id задач
+
+    def _headers(self, extra=None):
+        headers = {"Accept": "application/json"}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        if "csrftoken" in self.cookies:
+            headers["X-CSRFToken"] = self.cookies["csrftoken"]
+        if extra:
+            headers.update(extra)
+        return headers
+
+    async def call(self, name, method, path, payload=None, body=b"", content_type=None):
+        extra = {}
+        if payload is not None:
+            body = json.dumps(payload).encode()
+            content_type = "application/json"
+        if content_type:
+            extra["Content-Type"] = content_type
+        started = time.perf_counter()
+        status, headers, content = await self.t.request(method, path, self._headers(extra), body)
+        self.stats.add(name, time.perf_counter() - started, 200 <= status < 400)
+        for key, value in headers:
+            if key.lower() == "set-cookie":
+                for morsel in SimpleCookie(value).values():
+                    self.cookies[morsel.key] = morsel.value
+        if status >= 400 or not content:
+            return status, None
+        try:
+            return status, json.loads(content)
+        except ValueError:
+            return status, None
+
+    async def login(self):
+        await self.call("GET /api/csrf/", "GET", "/api/csrf/")
+        status, _ = await self.call("POST /api/login/", "POST", "/api/login/",
+                                    {"username": self.username, "password": PASSWORD})
+        return status == 200
+
+    async def projects(self):
+        _, data = await self.call("GET /api/projects/", "GET", "/api/projects/")
+        await self.call("GET /api/users/", "GET", "/api/users/")
+        self.project_ids = [p["id"] for p in (data or [])]
+        for pid in self.project_ids[:6]:
+            _, tasks = await self.call("GET /api/tasks/?project=[id]", "GET", f"/api/tasks/?project={pid}")
+            self.tasks[pid] = [t["id"] for t in (tasks or [])]
+
+    async def board(self):
+        pid = random.choice(self.project_ids)
+        await self.call("GET /api/projects/[id]/", "GET", f"/api/projects/{pid}/")
+        _, tasks = await self.call("GET /api/tasks/?project=[id]", "GET", f"/api/tasks/?project={pid}")
+        await self.call("GET /api/users/?project=[id]", "GET", f"/api/users/?project={pid}")
+        await self.call("GET /api/users/", "GET", "/api/users/")
+        self.tasks[pid] = [t["id"] for t in (tasks or [])]
+
+    def _pick_task(self):
+        candidates = [pid for pid in self.project_ids if self.tasks.get(pid)]
+        if not candidates:
+            return None
+        return random.choice(self.tasks[random.choice(candidates)])
+
+    async def drag(self):
+        task_id = self._pick_task()
+        if task_id is None:
+            return
+        payload = {"column": random.choice(COLUMNS), "position": random.randrange(50)}
+        await self.call("PATCH /api/tasks/[id]/ (drag)", "PATCH", f"/api/tasks/{task_id}/", payload)
+        await self.call("GET /api/tasks/[id]/", "GET", f"/api/tasks/{task_id}/")
+
+    async def edit(self):
+        task_id = self._pick_task()
+        if task_id is None:
+            return
+        payload = {"title": f"Edited {uuid.uuid4().hex[:6]}", "priority": random.choice(["low", "medium", "high"])}
+        await self.call("PATCH /api/tasks/[id]/ (edit)", "PATCH", f"/api/tasks/{task_id}/", payload)
+        await self.call("GET /api/tasks/[id]/", "GET", f"/api/tasks/{task_id}/")
+
+    async def upload(self):
+        task_id = self._pick_task()
+        if task_id is None:
+            return
+        boundary = uuid.uuid4().hex
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"task\"\r\n\r\n{task_id}\r\n"
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"load.png\"\r\n"
+            f"Content-Type: image/png\r\n\r\n"
+        ).encode() + _tiny_png() + f"\r\n--{boundary}--\r\n".encode()
+        await self.call("POST /api/task-images/", "POST", "/api/task-images/", body=body,
+                        content_type=f"multipart/form-data; boundary={boundary}")
+        await self.call("GET /api/tasks/[id]/", "GET", f"/api/tasks/{task_id}/")
+
+    async def run(self, deadline):
+        if not await self.login():
+            return
+        await self.projects()
+        if not self.project_ids:
+            return
+        actions = list(WEIGHTS)
+        weights = [WEIGHTS[a] for a in actions]
+        while time.monotonic() < deadline:
+            await getattr(self, random.choices(actions, weights)[0])()
+            if self.think_time:
+                await asyncio.sleep(random.uniform(0, 2 * self.think_time))
+
+
+async def _run(transport, args):
+    stats = Stats()
+    deadline = time.monotonic() + args.duration
+    users = []
+    for i in range(args.users):
+        users.append(VirtualUser(transport, stats, f"bench{i % args.accounts}", args.think_time))
+    started = time.perf_counter()
+
+    async def spawn(i, vu):
+        await asyncio.sleep(i * args.ramp_up / max(args.users, 1))
+        await vu.run(deadline)
+
+    await asyncio.gather(*(spawn(i, vu) for i, vu in enumerate(users)))
+    stats.report(time.perf_counter() - started)
+
+
+def cmd_seed(args):
+    setup_django(args.db)
+    seed_profile(args.profile)
+    print(f"seeded profile {args.profile!r}: {PROFILES[args.profile]}")
+
+
+def cmd_run(args):
+    if args.target == "asgi":
+        setup_django()
+        seed_profile(args.profile)
+        from django.conf import settings
+        settings.MEDIA_ROOT = tempfile.mkdtemp(prefix="kanban-bench-media-")  # не мусорим в рабочие медиа
+        atexit.register(shutil.rmtree, settings.MEDIA_ROOT, True)
+        transport = AsgiTransport()
+    else:
+        transport = HttpTransport(args.target)
+    if args.accounts is None:
+        args.accounts = min(args.users, PROFILES[args.profile]["users"])
+    print(f"target={args.target} profile={args.profile} users={args.users} duration={args.duration}s")
+    asyncio.run(_run(transport, args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_seed = sub.add_parser("seed", help="наполнить базу профилем данных")
+    p_seed.add_argument("--profile", choices=PROFILES, default="small")
+    p_seed.add_argument("--db", required=True, help="путь к SQLite-базе, которую использует сервер")
+    p_seed.set_defaults(func=cmd_seed)
+
+    p_run = sub.add_parser("run", help="нагрузочный прогон")
+    p_run.add_argument("--target", default="asgi")
+    p_run.add_argument("--profile", choices=PROFILES, default="small")
+    p_run.add_argument("--users", type=int, default=10, help="виртуальных пользователей")
+    p_run.add_argument("--accounts", type=int, help="под сколькими учётками логиниться (по умолчанию min(users, профиль))")
+    p_run.add_argument("--duration", type=float, default=20.0, help="секунд")
+    p_run.add_argument("--ramp-up", type=float, default=2.0, help="секунд на запуск всех пользователей")
+    p_run.add_argument("--think-time", type=float, default=0.5, help="средняя пауза между действиями, с")
+    p_run.set_defaults(func=cmd_run)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
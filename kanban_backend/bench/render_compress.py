@@ -0,0 +1,71 @@
+# bench/render_compress.py
+"""
+Время рендера и экономия байт на больших ответах TaskViewSet.list.
+
+Сериализуем доску из --tasks задач один раз, затем сравниваем:
+    * stdlib JSONRenderer (DRF) против FastJSONRenderer (orjson);
+    * gzip (уровни 1/6/9) и brotli (если установлен) — размер и время сжатия.
+
+    python bench/render_compress.py --tasks 5000
+"""
+import argparse
+import time
+
+from _common import setup_django, seed
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    seed(users=30, projects=1, tasks_per_project=args.tasks)
+
+    from django.test import RequestFactory
+    from rest_framework.renderers import JSONRenderer
+    from tasks import compression, renderers
+    from tasks.models import Task
+    from tasks.serializers import TaskSerializer
+
+    # тот же queryset, что у TaskViewSet.list
+    qs = (Task.objects.select_related("responsible", "project")
+          .prefetch_related("images").order_by("position", "id"))
+    request = RequestFactory().get("/api/tasks/")
+    data = TaskSerializer(qs, many=True, context={"request": request}).data
+    print(f"{len(data)} tasks")
+
+    stdlib_t, stdlib_body = timeit(lambda: JSONRenderer().render(data), args.repeat)
+    fast_t, fast_body = timeit(lambda: renderers.FastJSONRenderer().render(data), args.repeat)
+    print(f"{'renderer':<22} {'ms':>9} {'bytes':>11}")
+    print(f"{'JSONRenderer (json)':<22} {stdlib_t * 1000:>9.1f} {len(stdlib_body):>11}")
+    name = "FastJSONRenderer" + ("" if renderers.orjson else " (no orjson)")
+    print(f"{name:<22} {fast_t * 1000:>9.1f} {len(fast_body):>11}   x{stdlib_t / fast_t:.1f}")
+
+    print()
+    print(f"{'encoding':<22} {'ms':>9} {'bytes':>11} {'saved':>7}")
+    raw = len(fast_body)
+    variants = [(f"gzip -{lvl}", "gzip", {"GZIP_LEVEL": lvl}) for lvl in (1, 6, 9)]
+    if compression.brotli is not None:
+        variants += [(f"br q{q}", "br", {"BROTLI_QUALITY": q}) for q in (1, 5, 11)]
+    else:
+        print("(brotli не установлен — только gzip)")
+    for label, enc, override in variants:
+        config = {**compression.get_config(), **override}
+        t, body = timeit(lambda: compression.compress(fast_body, enc, config), args.repeat)
+        print(f"{label:<22} {t * 1000:>9.1f} {len(body):>11} {100 * (1 - len(body) / raw):>6.1f}%")
+
+
+if __name__ == "__main__":
+    main()
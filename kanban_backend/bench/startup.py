@@ -0,0 +1,168 @@
+# bench/startup.py
+"""
+Холодный старт воркера: сколько проходит от запуска интерпретатора до ответа
+на первый запрос и сколько памяти занимает простаивающий процесс.
+
+Каждый замер — отдельный процесс (`python bench/startup.py --child wsgi|asgi|setup`):
+    setup — только django.setup() (так стартует любая manage.py-команда);
+    wsgi  — get_wsgi_application() + GET /api/me/;
+    asgi  — get_asgi_application() + тот же запрос через ASGI.
+Дополнительно один прогон wsgi под `python -X importtime` — самые дорогие
+импорты и сумма по пакетам, и проверка, что Pillow не грузится до загрузки картинок.
+
+    python bench/startup.py --runs 7 --top 15
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+MODES = ("setup", "wsgi", "asgi")
+PATH = "/api/me/"
+WATCHED = ("PIL", "rest_framework", "orjson")
+
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| *(\S+)")
+
+
+# ---- дочерний процесс ----
+def _wsgi_request():
+    from django.core.wsgi import get_wsgi_application
+    from django.test import RequestFactory
+
+    app = get_wsgi_application()
+    ready = time.perf_counter()
+    statuses = []
+    environ = RequestFactory().get(PATH, HTTP_HOST="localhost", HTTP_ACCEPT="application/json").environ
+    result = app(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    b"".join(result)
+    if hasattr(result, "close"):
+        result.close()
+    return ready, int(statuses[0].split()[0])
+
+
+def _asgi_request():
+    import asyncio
+    from django.core.asgi import get_asgi_application
+
+    app = get_asgi_application()
+    ready = time.perf_counter()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": PATH, "raw_path": PATH.encode(),
+        "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"localhost"), (b"accept", b"application/json")],
+        "client": ("127.0.0.1", 50000), "server": ("localhost", 80),
+    }
+    statuses = []
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if body_sent:
+            await asyncio.Future()
+        body_sent = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    asyncio.run(app(scope, receive, send))
+    return ready, statuses[0]
+
+
+def child(mode):
+    started = time.perf_counter()
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "kanban_backend.settings")
+    from django.conf import settings
+    # рабочую базу не трогаем; /api/me/ без сессии в БД и не ходит
+    settings.DATABASES["default"]["NAME"] = ":memory:"
+
+    if mode == "setup":
+        import django
+        django.setup()
+        ready, status = time.perf_counter(), None
+    elif mode == "wsgi":
+        ready, status = _wsgi_request()
+    else:
+        ready, status = _asgi_request()
+    done = time.perf_counter()
+
+    try:
+        import resource
+        maxrss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:  # pragma: no cover - не Unix
+        maxrss_kb = None
+    print(json.dumps({
+        "ready_ms": (ready - started) * 1000,
+        "first_ms": (done - started) * 1000,
+        "status": status,
+        "maxrss_kb": maxrss_kb,
+        "loaded": [name for name in WATCHED if name in sys.modules],
+    }))
+
+
+# ---- родитель ----
+def run_child(mode, importtime=False):
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + [__file__, "--child", mode]
+    started = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=BASE_DIR, check=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["wall_ms"] = wall_ms
+    return result, proc.stderr
+
+
+def analyze_importtime(stderr, top):
+    rows = []
+    for line in stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), m.group(3)))
+    by_package = {}
+    for self_us, _, name in rows:
+        pkg = name.split(".")[0]
+        by_package[pkg] = by_package.get(pkg, 0) + self_us
+
+    print(f"\nimporttime (wsgi): всего {sum(r[0] for r in rows) / 1000:.1f} ms, модулей {len(rows)}")
+    print(f"{'пакет':<24} {'self ms':>9}")
+    for pkg, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"{pkg:<24} {us / 1000:>9.1f}")
+    print(f"\n{'модуль (cumulative)':<48} {'ms':>9}")
+    project = [r for r in rows if r[2].split(".")[0] in ("tasks", "kanban_backend")]
+    for _, cumulative_us, name in sorted(project, key=lambda r: -r[1])[:top]:
+        print(f"{name:<48} {cumulative_us / 1000:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    print(f"{'mode':<6} {'wall ms':>9} {'ready ms':>9} {'1st req ms':>11} {'rss MB':>8} {'status':>7}  loaded")
+    for mode in MODES:
+        results = [run_child(mode)[0] for _ in range(args.runs)]
+        med = {k: statistics.median(r[k] for r in results) for k in ("wall_ms", "ready_ms", "first_ms")}
+        rss = results[-1]["maxrss_kb"]
+        print(f"{mode:<6} {med['wall_ms']:>9.1f} {med['ready_ms']:>9.1f} {med['first_ms']:>11.1f} "
+              f"{(rss or 0) / 1024:>8.1f} {str(results[-1]['status'] or '-'):>7}  {','.join(results[-1]['loaded'])}")
+
+    _, stderr = run_child("wsgi", importtime=True)
+    analyze_importtime(stderr, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# bench/throttle_overhead.py
+"""
+Накладные расходы TokenBucketThrottle на один запрос: allow_request() на кэше
+из настроек (LocMem по умолчанию; с Redis — сетевой round-trip ×2).
+
+    python bench/throttle_overhead.py --calls 20000
+"""
+import argparse
+import time
+
+from _common import setup_django, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=100, help="разных ключей бакета")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.request import Request
+    from tasks import throttling
+
+    # большой бакет: меряем саму проверку, а не отказы
+    settings.RATE_LIMITS = {**throttling.get_config(), "ENABLED": True,
+                            "SCOPES": {"bench": {"RATE": 1e6, "BURST": 1e6}}}
+    view = type("BenchView", (), {"throttle_scope": "bench"})()
+    factory = APIRequestFactory()
+    requests = []
+    for i in range(args.users):
+        request = Request(factory.post("/api/tasks/", {}, format="json"))
+        request.user = User(pk=i + 1)
+        requests.append(request)
+
+    latencies = []
+    started = time.perf_counter()
+    for i in range(args.calls):
+        request = requests[i % args.users]
+        t0 = time.perf_counter()
+        allowed = throttling.TokenBucketThrottle().allow_request(request, view)
+        latencies.append(time.perf_counter() - t0)
+        assert allowed
+    res = summarize(latencies, time.perf_counter() - started)
+    print(f"cache backend: {settings.CACHES[throttling.get_config()['CACHE']]['BACKEND']}")
+    print(f"allow_request: p50 {res['p50_ms'] * 1000:.1f} µs, p99 {res['p99_ms'] * 1000:.1f} µs "
+          f"({res['rps']:.0f} checks/s)")
+
+
+if __name__ == "__main__":
+    main()
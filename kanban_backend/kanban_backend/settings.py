@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -44,14 +46,45 @@ INSTALLED_APPS = [
 ]
 
 REST_FRAMEWORK = {
+    # orjson-рендерер/парсер (tasks/renderers.py); без orjson — штатный json
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',  # ✅ HTML-интерфейс
+        'tasks.renderers.FastJSONRenderer',
+    ) + (
+        ('rest_framework.renderers.BrowsableAPIRenderer',) if DEBUG else ()  # ✅ HTML-интерфейс только в DEBUG
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'tasks.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # токен-бакеты по throttle_scope вьюсетов (tasks/throttling.py, RATE_LIMITS)
+    'DEFAULT_THROTTLE_CLASSES': (
+        'tasks.throttling.TokenBucketThrottle',
     ),
 }
 
+# Лимиты записи/загрузок: RATE — токенов/сек, BURST — ёмкость бакета.
+# Бакеты живут в кэше CACHE и пишутся атомарными add/incr/decr (tasks/throttling.py).
+# LocMem — только для одного процесса: у каждого воркера были бы свои бакеты и
+# лимит умножился бы на число воркеров. В проде CACHE — общий Redis/Memcached.
+RATE_LIMITS = {
+    "ENABLED": True,
+    "CACHE": "default",
+    "SCOPES": {
+        "tasks": {"RATE": 2.0, "BURST": 60},
+        "projects": {"RATE": 0.5, "BURST": 20},
+        "uploads": {"RATE": 0.2, "BURST": 10, "BYTES_PER_TOKEN": 1024 * 1024},
+    },
+    "UPLOAD_CONCURRENCY": 2,     # одновременных сжатий картинок на процесс, сверх — 503
+    "BUSY_RETRY_AFTER": 2,
+}
+
 MIDDLEWARE = [
-    'corsheaders.middleware.CorsMiddleware',  # 👈 ОБЯЗАТЕЛЬНО ПЕРВЫМ
+    'tasks.metrics.PerformanceMetricsMiddleware',  # тайминги: оборачивает весь стек
+    'tasks.querywatch.QueryInspectorMiddleware',   # N+1 / медленные запросы (см. QUERY_INSPECTOR)
+    'tasks.replicas.ReplicaRoutingMiddleware',     # GET -> реплики, пин на primary после записи
+    'tasks.compression.CompressionMiddleware',     # br/gzip по Accept-Encoding (см. RESPONSE_COMPRESSION)
+    'corsheaders.middleware.CorsMiddleware',  # 👈 ОБЯЗАТЕЛЬНО ПЕРВЫМ (после метрик)
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -61,6 +94,84 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Тайминги запросов / Server-Timing / /api/_metrics (см. tasks/metrics.py)
+PERF_METRICS = {
+    "ENABLED": True,
+    "SAMPLE_RATE": 1.0,      # в проде достаточно 0.05–0.1
+    "SERVER_TIMING": True,
+    # без staff-сессии /api/_metrics отдаётся только этим адресам (REMOTE_ADDR);
+    # не добавляйте 127.0.0.1, если перед Django стоит прокси на той же машине
+    "SCRAPE_IPS": (),
+}
+
+# Детектор N+1 и медленных запросов (см. tasks/querywatch.py); пишет в логгер tasks.querywatch
+QUERY_INSPECTOR = {
+    "ENABLED": DEBUG,
+    "SAMPLE_RATE": 1.0 if DEBUG else 0.05,
+    "N_PLUS_ONE_THRESHOLD": 5,
+    "SLOW_QUERY_MS": 200,
+    "STACK_DEPTH": 3,
+}
+
+# Сжатие ответов (см. tasks/compression.py); brotli — если установлен пакет brotli
+RESPONSE_COMPRESSION = {
+    "MIN_SIZE": 1024,
+    "GZIP_LEVEL": 6,
+    "BROTLI_QUALITY": 5,
+    "EXCLUDE_PATHS": ("/api/csrf/",),
+}
+
+# Архив выполненных задач (см. tasks/archive.py, manage.py archive_tasks)
+TASK_ARCHIVE = {
+    "AFTER_DAYS": 30,        # done-задачи, выполненные раньше, уезжают в ArchivedTask
+    "BATCH_SIZE": 500,       # задач за одну транзакцию
+    "PAUSE": 0.1,            # сек между пачками — не держим блокировки подряд
+}
+
+# Дайджесты дедлайнов (см. tasks/deadlines.py, manage.py deadline_digest --loop)
+DEADLINE_DIGESTS = {
+    "DUE_SOON_DAYS": 2,      # «скоро срок» — due_date не дальше стольких дней
+    "CATCH_UP_DAYS": 7,      # насколько назад смотреть после простоя планировщика
+    "INTERVAL": 3600,        # сек между тиками в режиме --loop
+}
+
+# Календарь GET /api/calendar/ (см. tasks/calendar.py)
+CALENDAR = {
+    "DEFAULT_DAYS": 28,        # окно без ?to=
+    "MAX_DAYS": 92,            # самое длинное окно за один запрос
+}
+
+# Фоновое удаление проектов (см. tasks/deletion.py, manage.py purge_deleted --loop)
+PROJECT_DELETION = {
+    "INLINE_MAX_TASKS": 200,   # проект поменьше дочищается прямо в DELETE-запросе
+    "BATCH_SIZE": 1000,        # строк за транзакцию
+    "PAUSE": 0.05,             # сек между пачками
+    "STALE_AFTER": 300,        # сек без пульса — задание «running» забирает другой воркер
+    "INTERVAL": 10,            # сек между опросами очереди в режиме --loop
+}
+
+# Массовая загрузка пользователей (см. tasks/provisioning.py, manage.py provision_users)
+USER_PROVISIONING = {
+    "BATCH_SIZE": 1000,        # строк на транзакцию
+    "MAX_ERRORS": 100,         # ошибочных строк в отчёте
+}
+
+# Сборщик осиротевших картинок (см. tasks/media_gc.py, manage.py gc_media --loop)
+MEDIA_GC = {
+    "GRACE_HOURS": 24,               # моложе — не трогаем: строка могла ещё не закоммититься
+    "QUARANTINE_DIR": "quarantine/", # "" — удалять сразу, без карантина
+    "QUARANTINE_DAYS": 7,
+    "CHUNK": 1000,                   # имён на запрос / кандидатов на проход по архиву
+    "INTERVAL": 86400,               # сек между прогонами в режиме --loop
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {"tasks": {"handlers": ["console"], "level": "INFO"}},
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
@@ -92,9 +203,57 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+    },
+    # Реплика для чтения (см. tasks/replicas.py), например:
+    # "replica": {
+    #     "ENGINE": "django.db.backends.sqlite3",
+    #     "NAME": BASE_DIR / "db-replica.sqlite3",
+    #     "TEST": {"MIRROR": "default"},
+    # },
+}
+
+# Шарды с задачами и картинками проектов (tasks/sharding.py); пользователи, проекты
+# и всё остальное — в default. Новый шард: добавить в DATABASES и сюда,
+# manage.py migrate --database <alias>, manage.py init_shard <alias>.
+# Список только дописывается в конец: от позиции зависит блок id шарда.
+SHARDING = {
+    "SHARDS": ["default"],
+    "DIRECTORY_TTL": 30,       # сек; кэш «проект -> шард» в памяти процесса
+    "FAN_OUT_WORKERS": 8,
+}
+
+DATABASE_ROUTERS = ["tasks.sharding.ShardRouter", "tasks.replicas.ReplicaRouter"]
+
+# Чтение с реплик: алиасы из DATABASES; после записи клиент PIN_SECONDS читает с primary
+READ_REPLICAS = {
+    "ALIASES": [alias for alias in DATABASES if alias not in SHARDING["SHARDS"]],
+    "PIN_SECONDS": 5,
+    "MAX_LAG": 2.0,            # сек; реплика с большим лагом пропускается
+    "LAG_CHECK_INTERVAL": 5.0,
+    "COOKIE": "kanban_primary",
+}
+
+
+# Cache
+# Для нескольких воркеров нужен общий кэш (инвалидация auth-кэша и лимиты запросов
+# должны быть видны всем процессам; LocMem подходит только для runserver/одного
+# процесса), например:
+#   "BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://127.0.0.1:6379/1"
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
     }
 }
 
+# Сессии: чтение из кэша, запись сквозная в БД. Без серверного хранения вообще —
+# "django.contrib.sessions.backends.signed_cookies" (но тогда logout не отзывает копии cookie).
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+# Пользователь + профиль + проекты из кэша (tasks/auth_cache.py)
+AUTHENTICATION_BACKENDS = ["tasks.auth_cache.CachedModelBackend"]
+AUTH_CACHE_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -145,6 +304,10 @@ CORS_ALLOWED_ORIGINS = [
 ]
 CORS_ALLOW_METHODS = ['GET','POST','PUT','PATCH','DELETE','OPTIONS']
 CORS_ALLOW_CREDENTIALS = True  # если используешь cookies/SessionAuth
+# оптимистичная блокировка (tasks/concurrency.py): фронтенд с :5173 шлёт If-Match,
+# а ETag ответа должен быть виден fetch'у — иначе preflight отклонит запрос / заголовок скрыт
+CORS_ALLOW_HEADERS = (*default_headers, "if-match")
+CORS_EXPOSE_HEADERS = ["ETag"]
 
 CSRF_TRUSTED_ORIGINS = [
     'http://localhost:5173',
@@ -5,18 +5,59 @@ from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserChangeForm, UserCreationForm
 
-from .models import UserProfile, Task, TaskImage, Project
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils.functional import cached_property
+
+from . import counters, flow
+from .models import ArchivedTask, DeletionJob, NotificationDigest, UserProfile, Task, TaskImage, Project
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для больших таблиц без точного COUNT(*):
+    * без фильтров на PostgreSQL — оценка планировщика из pg_class.reltuples;
+    * иначе — счёт с потолком MAX_COUNT (дальше потолка страницы не листаются,
+      сузьте выборку поиском/фильтром).
+    """
+    MAX_COUNT = 10_000
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if not qs.query.where and not qs.query.distinct:
+            estimate = self._estimate(qs)
+            if estimate is not None and estimate > self.MAX_COUNT:
+                return estimate
+        return qs.order_by().values("pk")[:self.MAX_COUNT].count()
+
+    @staticmethod
+    def _estimate(qs):
+        connection = connections[qs.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [qs.model._meta.db_table])
+            row = cursor.fetchone()
+        return row[0] if row and row[0] > 0 else None
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # без второго COUNT(*) по всей таблице
+    list_per_page = 50
+
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(LargeTableAdmin):
     list_display = ("id", "title", "due_date", "participants_count", "created_at")
-    search_fields = ("title", "description")
+    search_fields = ("^title",)  # title__istartswith — индекс tasks_proj_title_nocase / _upper_like (0025)
     readonly_fields = ("created_at", "updated_at")
     fields = ("title", "description", "due_date", "participants", "created_at", "updated_at")
-    filter_horizontal = ("participants",)  # удобный выбор многих пользователей
+    autocomplete_fields = ("participants",)  # вместо filter_horizontal, который грузит всех пользователей
 
     def participants_count(self, obj):
-        return obj.participants.count()
+        return obj.participants_count  # денормализованный счётчик, без запроса на строку
     participants_count.short_description = "Участников"
 
 
@@ -50,6 +91,11 @@ class CustomUserCreationForm(UserCreationForm):
 class UserAdmin(DjangoUserAdmin):
     form = CustomUserChangeForm
     add_form = CustomUserCreationForm
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # istartswith по функциональным индексам username/display_name (миграция 0014);
+    # он же обслуживает autocomplete участников в ProjectAdmin
+    search_fields = ("^username", "^profile__display_name")
 
     fieldsets = (
         (None, {'fields': ('username', 'password')}),
@@ -116,13 +162,62 @@ admin.site.register(User, UserAdmin)
 
 # Остальные модели — без изменений
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(LargeTableAdmin):
     list_display = ("id", "title", "column", "priority", "responsible", "due_date")
     list_filter = ("column", "priority")
-    search_fields = ("title", "description")
+    list_select_related = ("responsible",)
+    search_fields = ("^title",)  # title__istartswith — индекс tasks_task_title_nocase / _upper_like (0025)
+    autocomplete_fields = ("project", "responsible")
+
+    # счётчики проекта и журнал переходов — как в TaskViewSet (tasks/counters.py, tasks/flow.py)
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            old = counters.task_state(Task.objects.select_for_update().get(pk=obj.pk)) if change else None
+            super().save_model(request, obj, form, change)
+            new = counters.task_state(obj)
+            counters.apply_task_change(old=old, new=new)
+            flow.record(obj.pk, old=old, new=new)
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Task.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            states = [(task.pk, counters.task_state(task)) for task in queryset.select_for_update()]
+            super().delete_queryset(request, queryset)
+            for task_id, old in states:
+                counters.apply_task_change(old=old)
+                flow.record(task_id, old=old)
 
 
 @admin.register(TaskImage)
-class TaskImageAdmin(admin.ModelAdmin):
+class TaskImageAdmin(LargeTableAdmin):
     list_display = ("id", "task", "position")
-    list_filter = ("task",)
+    list_select_related = ("task",)
+    raw_id_fields = ("task",)  # вместо выпадающего списка всех задач
+    search_fields = ("=task__id",)
+
+
+@admin.register(ArchivedTask)
+class ArchivedTaskAdmin(LargeTableAdmin):
+    list_display = ("original_id", "title", "project", "completed_at", "archived_at")
+    list_select_related = ("project",)
+    raw_id_fields = ("project", "responsible")
+    search_fields = ("=original_id",)
+
+
+@admin.register(NotificationDigest)
+class NotificationDigestAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "created_at", "delivered_at")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    search_fields = ("^user__username",)
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(LargeTableAdmin):
+    list_display = ("id", "project_id", "title", "status", "purged", "total", "created_at", "finished_at")
+    list_filter = ("status",)
+    raw_id_fields = ("requested_by",)
+    readonly_fields = ("project_id", "title", "requested_by", "total", "purged", "created_at", "updated_at",
+                       "finished_at")
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class TasksConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "tasks"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .metrics import install_db_wrapper
+        from . import auth_cache, counters, media_gc, querywatch, sharding, subtasks  # noqa: F401 — регистрируют сигналы
+
+        sharding.check_config()
+        connection_created.connect(install_db_wrapper, dispatch_uid="tasks.metrics.install_db_wrapper")
+        if querywatch.get_config()["ENABLED"]:
+            connection_created.connect(querywatch.install_inspector_wrapper,
+                                       dispatch_uid="tasks.querywatch.install_inspector_wrapper")
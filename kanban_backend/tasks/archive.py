@@ -0,0 +1,123 @@
+# tasks/archive.py
+"""
+Горячая/холодная часть задач: выполненные давно задачи переезжают из Task
+в ArchivedTask, чтобы доска и её индексы работали только с активным набором.
+
+Пачка переносится в одной транзакции: строки Task блокируются
+(SELECT ... FOR UPDATE SKIP LOCKED там, где СУБД умеет, — несколько
+воркеров не мешают друг другу и не ждут пользовательских правок),
+копируются bulk_create'ом вместе со списком картинок и удаляются.
+Счётчики проекта сдвигаются одним UPDATE на проект: tasks_done -> tasks_archived.
+Файлы картинок не трогаем — на них теперь ссылается ArchivedTask.images.
+При шардировании шарды обходятся по очереди, на каждом — только проекты,
+которые на нём живут и не переносятся (sharding.owned_project_ids).
+"""
+import logging
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from . import counters, media_gc, sharding
+from .models import ArchivedTask, Project, Task, TaskClosure, TaskImage
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "AFTER_DAYS": 30,
+    "BATCH_SIZE": 500,
+    "PAUSE": 0.1,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "TASK_ARCHIVE", {})}
+
+
+def cutoff_date(after_days=None):
+    after_days = get_config()["AFTER_DAYS"] if after_days is None else after_days
+    return timezone.localdate() - timedelta(days=after_days)
+
+
+def candidates(cutoff, project_ids=None):
+    # задача с подзадачами ждёт, пока не уедут они (архив плоский, дерево не переносится)
+    qs = Task.objects.filter(column="done", completed_at__lt=cutoff, children__isnull=True)
+    return qs if project_ids is None else qs.filter(project_id__in=project_ids)
+
+
+def archive_batch(cutoff, batch_size, project_ids=None):
+    """Переносит до batch_size задач закреплённого шарда; возвращает число перенесённых."""
+    with sharding.atomic():
+        qs = candidates(cutoff, project_ids).order_by("id")
+        if connections[sharding.current() or DEFAULT_DB_ALIAS].features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True, of=("self",))
+        tasks = list(qs[:batch_size])
+        if not tasks:
+            return 0
+        ids = [t.pk for t in tasks]
+
+        images = defaultdict(list)
+        for task_id, name, position in (TaskImage.objects.filter(task_id__in=ids)
+                                        .order_by("task_id", "position")
+                                        .values_list("task_id", "image", "position")):
+            images[task_id].append({"image": name, "position": position})
+
+        ArchivedTask.objects.bulk_create([
+            ArchivedTask(
+                original_id=t.pk, project_id=t.project_id, title=t.title, description=t.description,
+                priority=t.priority, responsible_id=t.responsible_id, due_date=t.due_date,
+                completed_at=t.completed_at, created_at=t.created_at, images=images[t.pk],
+            )
+            for t in tasks
+        ])
+        # TaskImage удаляем явно: cascade-сборщик иначе сделает это по одной пачке на задачу;
+        # файлы остаются — на них теперь ссылается ArchivedTask.images
+        with media_gc.keep_files():
+            TaskImage.objects.filter(task_id__in=ids).delete()
+        # кандидаты — листья: поддерева нет, detach (pre_delete) не нужен — хватает их строк closure
+        sharding.raw_delete(TaskClosure.objects.filter(descendant_id__in=ids))
+        sharding.raw_delete(Task.objects.filter(pk__in=ids))
+
+        moved, late = Counter(), Counter()
+        for t in tasks:
+            if t.project_id is None:
+                continue
+            moved[t.project_id] += 1
+            late[t.project_id] += counters.task_state(t)[2]
+        for project_id, n in moved.items():
+            Project.objects.filter(pk=project_id).update(
+                # счётчики могли разойтись с таблицей (задача создана мимо API) — не ниже нуля
+                tasks_done=counters.shifted("tasks_done", -n),
+                tasks_done_late=counters.shifted("tasks_done_late", -late[project_id]),
+                tasks_archived=counters.shifted("tasks_archived", n),
+            )
+    return len(tasks)
+
+
+def archive_done_tasks(after_days=None, batch_size=None, max_batches=None, pause=None):
+    """Гоняет archive_batch, пока есть кандидаты. Возвращает общее число задач."""
+    config = get_config()
+    batch_size = batch_size or config["BATCH_SIZE"]
+    pause = config["PAUSE"] if pause is None else pause
+    cutoff = cutoff_date(after_days)
+
+    total = batches = 0
+    for alias in sharding.shards():
+        with sharding.use_shard(alias):
+            project_ids = sharding.owned_project_ids(alias)
+            while max_batches is None or batches < max_batches:
+                moved = archive_batch(cutoff, batch_size, project_ids)
+                if not moved:
+                    break
+                total += moved
+                batches += 1
+                logger.info("archive[%s]: moved %d tasks (total %d, completed before %s)",
+                            alias, moved, total, cutoff)
+                if moved < batch_size:
+                    break
+                if pause:
+                    time.sleep(pause)
+    return total
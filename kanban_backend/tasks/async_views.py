@@ -0,0 +1,213 @@
+# tasks/async_views.py
+"""
+Async (ASGI-native) версии горячих read-эндпоинтов.
+
+Отдаём тот же JSON, что и DRF-вьюхи в views.py, но без DRF-диспетчеризации:
+пользователь берётся через request.auser(), данные — через async ORM
+(aiterator / aget / afirst), а сериализаторы работают уже по полностью
+загруженным объектам (select_related/prefetch_related), поэтому внутри
+сериализации нет ни одного ленивого запроса.
+
+Имеет смысл только под ASGI (kanban_backend/asgi.py); под WSGI Django
+будет гонять каждую такую вьюху через отдельный event loop.
+
+При шардировании (tasks/sharding.py) список задач собирается синхронным
+fan-out'ом по шардам в потоке (sync_to_async), project/responsible подгружаются
+отдельными запросами в default вместо JOIN.
+"""
+from itertools import chain
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db.models import Count, Prefetch, Q
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_safe
+from rest_framework.request import Request
+
+from . import auth_cache, deletion, sharding, subtasks
+from .models import Task, Project
+from .renderers import dumps
+from .serializers import TaskSerializer, UserSerializer, ProjectSerializer
+from .views import DIRECTORY_PARAMS, directory_page, user_directory_queryset, user_lookup_queryset
+
+NOT_AUTHENTICATED = {"detail": "Authentication credentials were not provided."}
+CHUNK_SIZE = 500
+
+
+class _RequestShim:
+    """Минимум от DRF Request, который нужен сериализаторам (build_absolute_uri)."""
+
+    def __init__(self, request, user):
+        self._request = request
+        self.user = user
+
+    def build_absolute_uri(self, location=None):
+        return self._request.build_absolute_uri(location)
+
+
+def _users_qs():
+    return User.objects.select_related("profile")
+
+
+def _visible_projects(user):
+    if user.is_superuser or user.is_staff:
+        return Project.objects.all()
+    return Project.objects.filter(participants=user)
+
+
+def _projects_qs(user):
+    return (_visible_projects(user)
+            .prefetch_related(Prefetch("participants", queryset=_users_qs().order_by("id")))
+            .order_by("-id"))
+
+
+def _tasks_qs(user):
+    qs = (sharding.join(Task.objects, "responsible__profile", "project")
+          .prefetch_related(
+              Prefetch("project__participants", queryset=_users_qs().order_by("id")),
+              "images",
+          ))
+    if sharding.is_sharded():
+        # синхронно: вызывается только из _sharded_tasks в потоке
+        if not (user.is_superuser or user.is_staff):
+            qs = qs.filter(project_id__in=auth_cache.member_project_ids(user))
+        elif hidden := deletion.hidden_project_ids():
+            qs = qs.exclude(project_id__in=hidden)
+    else:
+        # удалённые проекты (tasks/deletion.py) — тем же JOIN'ом
+        qs = qs.filter(project__deleted_at__isnull=True)
+        if not (user.is_superuser or user.is_staff):
+            qs = qs.filter(project__participants=user)
+    return qs.order_by("position", "id")
+
+
+def _sharded_tasks(user, project_id):
+    """
+    Синхронно: директория + fan-out по шардам, слияние по (position, id).
+    Возвращает (задачи, прогресс подзадач) — closure считается на шарде задач.
+    """
+    qs = _tasks_qs(user)
+    aliases = None
+    if project_id:
+        qs = qs.filter(project_id=project_id)
+        alias = sharding.shard_for_project(project_id) if project_id.isdigit() else None
+        aliases = [alias] if alias else None
+    def shard_tasks(alias):
+        tasks = [t for t in qs.using(alias) if sharding.owns(alias, t.project_id)]
+        return tasks, subtasks.rollup([t.pk for t in tasks])
+
+    per_shard = sharding.fan_out(shard_tasks, aliases).values()
+    tasks = sorted(chain.from_iterable(t for t, _ in per_shard), key=lambda t: (t.position, t.pk))
+    return tasks, {k: v for _, shard_rollup in per_shard for k, v in shard_rollup.items()}
+
+
+def _json(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type="application/json")
+
+
+async def _collect(qs):
+    return [obj async for obj in qs.aiterator(chunk_size=CHUNK_SIZE)]
+
+
+@require_safe
+async def me(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _json({"detail": "unauthenticated"}, status=401)
+    # из auth-кэша пользователь приходит уже с профилем; иначе — один JOIN-запрос
+    if "profile" not in user._state.fields_cache:
+        user = await _users_qs().aget(pk=user.pk)
+    return _json(UserSerializer(user).data)
+
+
+def _directory_page(request, user):
+    """Синхронно: страница справочника как у /api/users/?q= (скоуп, поиск, курсор — views.directory_page)."""
+    drf_request = Request(request)
+    drf_request.user = user
+    return directory_page(drf_request)
+
+
+@require_safe
+async def users_list(request):
+    """Те же ветки, что у views.users_list: ?project=, ?exact=, справочник (?q=/limit/cursor), массив видимых."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _json(NOT_AUTHENTICATED, status=403)
+    project_id = request.GET.get("project")
+    if project_id:
+        project = await Project.objects.filter(pk=project_id).only("id").afirst()
+        if project is None:
+            return _json({"detail": "Проект не найден"}, status=404)
+        qs = _users_qs().filter(projects=project)
+    elif "exact" in request.GET:
+        qs = user_lookup_queryset(request.GET["exact"])
+    elif DIRECTORY_PARAMS & request.GET.keys():
+        return _json(await sync_to_async(_directory_page)(request, user))
+    else:
+        # member_project_ids — кэш и, возможно, запрос: строим queryset в потоке
+        qs = await sync_to_async(user_directory_queryset)(user)
+    users = await _collect(qs.order_by("id"))
+    return _json(UserSerializer(users, many=True).data)
+
+
+@require_safe
+async def task_list(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _json(NOT_AUTHENTICATED, status=403)
+    project_id = request.GET.get("project")
+    if sharding.is_sharded():
+        tasks, rollup = await sync_to_async(_sharded_tasks)(user, project_id)
+    else:
+        qs = _tasks_qs(user)
+        if project_id:
+            qs = qs.filter(project_id=project_id)
+        tasks = await _collect(qs)
+        rollup = await sync_to_async(subtasks.rollup)([t.pk for t in tasks])
+    ctx = {"request": _RequestShim(request, user), "subtask_rollup": rollup}
+    return _json(TaskSerializer(tasks, many=True, context=ctx).data)
+
+
+@require_safe
+async def project_list(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _json(NOT_AUTHENTICATED, status=403)
+    projects = await _collect(_projects_qs(user))
+    return _json(ProjectSerializer(projects, many=True).data)
+
+
+@require_safe
+async def project_stats(request, pk):
+    """
+    Метрики карточки проекта (то, что ProjectCard.jsx считает по полному списку задач):
+    всего / новые / в работе / выполнено / просрочено — всё и «мои», одним агрегатом.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _json(NOT_AUTHENTICATED, status=403)
+    project = await _visible_projects(user).filter(pk=pk).only("id").afirst()
+    if project is None:
+        return _json({"detail": "Проект не найден"}, status=404)
+
+    active = Q(column__in=("in_progress", "testing", "review"))
+    mine = Q(responsible_id=user.pk)
+    overdue = Q(due_date__lt=timezone.localdate()) & ~Q(column="done")
+    tasks = Task.objects
+    if sharding.is_sharded():
+        tasks = tasks.using(await sync_to_async(sharding.shard_for_project)(project.pk))
+    stats = await tasks.filter(project_id=project.pk).aaggregate(
+        total_all=Count("id"),
+        new_all=Count("id", filter=Q(column="new")),
+        active_all=Count("id", filter=active),
+        done_all=Count("id", filter=Q(column="done")),
+        total_mine=Count("id", filter=mine),
+        new_mine=Count("id", filter=mine & Q(column="new")),
+        active_mine=Count("id", filter=mine & active),
+        done_mine=Count("id", filter=mine & Q(column="done")),
+        overdue_mine=Count("id", filter=mine & overdue),
+    )
+    total = stats["total_all"]
+    stats["progress"] = (stats["done_all"] * 100 + total // 2) // total if total else 0
+    return _json({"project": project.pk, **stats})
@@ -0,0 +1,123 @@
+# tasks/auth_cache.py
+"""
+Кэш аутентификации: пользователь + профиль + множество id его проектов.
+
+CachedModelBackend подменяет ModelBackend.get_user(): стандартный
+AuthenticationMiddleware (и request.auser() в async-вьюхах) берёт пользователя
+из кэша, проверка хэша сессии остаётся штатной. Вместе с SESSION_ENGINE=cached_db
+тёплый запрос доходит до вьюхи без единого SQL-запроса на авторизацию,
+а UserSerializer не догружает профиль.
+
+Инвалидация — сигналами: post_save/post_delete User и UserProfile,
+m2m_changed по Project.participants (с любой стороны связи).
+Промах кэша читает с primary (не с реплики, см. tasks/replicas.py): иначе в кэш
+на AUTH_CACHE_TIMEOUT попал бы ещё не доехавший до реплики снимок.
+
+Кэш должен быть общим для всех воркеров (Redis/Memcached), иначе сигнал
+сбросит запись только в своём процессе; AUTH_CACHE_TIMEOUT ограничивает
+устаревание в худшем случае.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Project, UserProfile
+
+KEY = "authcache:user:{}"
+
+
+def _key(user_id):
+    return KEY.format(user_id)
+
+
+def _timeout():
+    return getattr(settings, "AUTH_CACHE_TIMEOUT", 300)
+
+
+def _load(user_id):
+    try:
+        user = User.objects.using(DEFAULT_DB_ALIAS).select_related("profile").get(pk=user_id)
+    except User.DoesNotExist:
+        return None
+    user._project_ids = frozenset(user.projects.values_list("pk", flat=True))
+    return user
+
+
+async def _aload(user_id):
+    try:
+        user = await User.objects.using(DEFAULT_DB_ALIAS).select_related("profile").aget(pk=user_id)
+    except User.DoesNotExist:
+        return None
+    user._project_ids = frozenset([pk async for pk in user.projects.values_list("pk", flat=True)])
+    return user
+
+
+def get_cached_user(user_id):
+    user = cache.get(_key(user_id))
+    if user is None:
+        user = _load(user_id)
+        if user is not None:
+            cache.set(_key(user_id), user, _timeout())
+    return user
+
+
+def member_project_ids(user):
+    """id проектов пользователя: из кэшированного объекта, иначе одним запросом."""
+    ids = getattr(user, "_project_ids", None)
+    if ids is None:
+        ids = user._project_ids = frozenset(user.projects.values_list("pk", flat=True))
+    return ids
+
+
+def is_member(user, project):
+    return project is not None and project.pk in member_project_ids(user)
+
+
+def invalidate(*user_ids):
+    cache.delete_many([_key(pk) for pk in user_ids])
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        user = await cache.aget(_key(user_id))
+        if user is None:
+            user = await _aload(user_id)
+            if user is not None:
+                await cache.aset(_key(user_id), user, _timeout())
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+
+# ---- Инвалидация ----
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _user_changed(sender, instance, **kwargs):
+    invalidate(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def _profile_changed(sender, instance, **kwargs):
+    invalidate(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Project.participants.through)
+def _membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # user.projects.add/remove/clear — меняется только этот пользователь
+        if action.startswith("post_"):
+            invalidate(instance.pk)
+        return
+    if action == "pre_clear":
+        instance._cleared_user_ids = list(instance.participants.values_list("pk", flat=True))
+    elif action == "post_clear":
+        invalidate(*getattr(instance, "_cleared_user_ids", []))
+    elif action in ("post_add", "post_remove") and pk_set:
+        invalidate(*pk_set)
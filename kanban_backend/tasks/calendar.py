@@ -0,0 +1,97 @@
+# tasks/calendar.py
+"""
+Календарь: GET /api/calendar/?from=YYYY-MM-DD&to=YYYY-MM-DD[&project=N].
+
+Задачи с due_date в окне и сроки проектов (Project.due_date) по всем проектам
+пользователя, сгруппированные по дням:
+
+    {
+      "from": "2025-08-01", "to": "2025-08-28", "count": 2,
+      "projects": {"3": {"title": ..., "due_date": "2025-08-20"}},   # только упомянутые
+      "days": [
+        {"date": "2025-08-04",
+         "tasks": [{"id", "title", "column", "priority", "project_id",
+                    "responsible_id", "parent_id"}],
+         "milestones": [3]},                                           # id проектов
+        ...
+      ]
+    }
+
+Дни без задач и сроков не передаются. Запросов два независимо от размера
+доски: проекты пользователя (заодно названия, сроки и шард) и задачи —
+диапазон по индексу tasks_task_proj_due_idx (project, due_date) внутри
+каждого проекта, так что читаются только попавшие в окно строки.
+При шардировании задачи берутся с шардов параллельно (sharding.fan_out),
+каждый шард — только по своим проектам.
+"""
+from collections import defaultdict
+from itertools import chain
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from . import auth_cache, sharding
+from .models import Project, Task
+
+DEFAULTS = {
+    "DEFAULT_DAYS": 28,   # окно без ?to=
+    "MAX_DAYS": 92,
+}
+
+TASK_FIELDS = ("id", "title", "column", "priority", "project_id", "responsible_id", "parent_id")
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "CALENDAR", {})}
+
+
+def _projects(user, project_id=None):
+    """[(id, title, due_date, shard)] проектов, которые видит user (staff — любой по ?project=)."""
+    qs = Project.objects.using(DEFAULT_DB_ALIAS).order_by("id")
+    if project_id is not None:
+        qs = qs.filter(pk=project_id)
+    if project_id is None or not (user.is_superuser or user.is_staff):
+        qs = qs.filter(pk__in=auth_cache.member_project_ids(user))
+    return list(qs.values_list("id", "title", "due_date", "shard"))
+
+
+def _tasks(project_ids, since, until):
+    return list(
+        Task.objects.filter(project_id__in=project_ids, due_date__gte=since, due_date__lte=until)
+        .order_by()
+        .values_list("due_date", "position", *TASK_FIELDS)
+    )
+
+
+def window(user, since, until, project_id=None):
+    projects = _projects(user, project_id)
+    by_shard = defaultdict(list)
+    for pk, _title, _due, shard in projects:
+        by_shard[shard if sharding.is_sharded() else DEFAULT_DB_ALIAS].append(pk)
+    rows = []
+    if by_shard:
+        # каждый шард спрашиваем только о его проектах: копии переносимого проекта не задваиваются
+        per_shard = sharding.fan_out(lambda alias: _tasks(by_shard[alias], since, until), aliases=by_shard)
+        rows = sorted(chain.from_iterable(per_shard.values()), key=lambda row: row[:3])
+
+    days = defaultdict(lambda: {"tasks": [], "milestones": []})
+    mentioned = set()
+    for due_date, _position, *values in rows:
+        task = dict(zip(TASK_FIELDS, values))
+        days[due_date]["tasks"].append(task)
+        mentioned.add(task["project_id"])
+    for pk, _title, due_date, _shard in projects:
+        if due_date is not None and since <= due_date <= until:
+            days[due_date]["milestones"].append(pk)
+            mentioned.add(pk)
+
+    return {
+        "from": since.isoformat(),
+        "to": until.isoformat(),
+        "count": len(rows),
+        "projects": {
+            str(pk): {"title": title, "due_date": due_date and due_date.isoformat()}
+            for pk, title, due_date, _shard in projects if pk in mentioned
+        },
+        "days": [{"date": day.isoformat(), **days[day]} for day in sorted(days)],
+    }
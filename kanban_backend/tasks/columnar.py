@@ -0,0 +1,113 @@
+# tasks/columnar.py
+"""
+Колоночное представление доски для GET /api/tasks/?project=N.
+
+Клиент просит его заголовком `Accept: application/vnd.kanban.columnar+json`
+(или ?format=columnar). Вместо списка объектов с повторяющимися ключами отдаём:
+
+    {
+      "format": "columnar/1",
+      "count": 3,
+      "enums":   {"column": ["new", ...], "priority": ["low", ...]},
+      "dicts":   {"date": ["2025-08-01", ...],
+                  "users": [{"id": 1, "username": ..., "display_name": ..., "role": ...}]},
+      "columns": {"id": [...], "title": [...], "column": [0, 4, ...],
+                  "due_date": [0, null, ...],  # индексы в dicts.date
+                  "responsible": [0, null, ...],  # индексы в dicts.users
+                  "images": [[[id, position, url], ...], ...],
+                  "subtasks": [[total, done], null, ...], ...}
+    }
+
+done_color не передаётся — фронтенд считает его сам (computeDoneColor).
+Данные берутся через values_list без DRF-сериализаторов: 4 запроса на доску
+(задачи, пользователи с профилями, картинки, прогресс подзадач) независимо от её размера.
+"""
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+
+from . import subtasks
+from .models import Task, TaskImage
+from .renderers import FastJSONRenderer
+from .serializers import UserSerializer
+
+MEDIA_TYPE = "application/vnd.kanban.columnar+json"
+FORMAT = "columnar/1"
+
+COLUMNS = [c for c, _ in Task.COLUMN_CHOICES]
+PRIORITIES = [p for p, _ in Task.PRIORITY_CHOICES]
+
+SCALAR_FIELDS = ("id", "title", "description", "position", "project_id", "version", "parent_id")
+
+
+class ColumnarTaskRenderer(FastJSONRenderer):
+    media_type = MEDIA_TYPE
+    format = "columnar"
+
+
+class _Dictionary:
+    """Словарное кодирование: значение -> индекс в таблице (None остаётся None)."""
+
+    def __init__(self):
+        self.values = []
+        self._index = {}
+
+    def code(self, value):
+        if value is None:
+            return None
+        idx = self._index.get(value)
+        if idx is None:
+            idx = self._index[value] = len(self.values)
+            self.values.append(value)
+        return idx
+
+
+def _image_url(name, request):
+    if not name:
+        return ""
+    rel = default_storage.url(name)
+    if rel.startswith(("http://", "https://")):
+        return rel
+    return request.build_absolute_uri(rel) if request else rel
+
+
+def encode_tasks(queryset, request=None):
+    fields = SCALAR_FIELDS + ("column", "priority", "due_date", "completed_at", "responsible_id")
+    rows = list(queryset.prefetch_related(None).order_by("position", "id").values_list(*fields))
+
+    column_code = {c: i for i, c in enumerate(COLUMNS)}
+    priority_code = {p: i for i, p in enumerate(PRIORITIES)}
+    dates = _Dictionary()
+    users = _Dictionary()
+
+    n_scalar = len(SCALAR_FIELDS)
+    columns = {name: [row[i] for row in rows] for i, name in enumerate(SCALAR_FIELDS)}
+    columns["column"] = [column_code[row[n_scalar]] for row in rows]
+    columns["priority"] = [priority_code[row[n_scalar + 1]] for row in rows]
+    columns["due_date"] = [dates.code(row[n_scalar + 2] and row[n_scalar + 2].isoformat()) for row in rows]
+    columns["completed_at"] = [dates.code(row[n_scalar + 3] and row[n_scalar + 3].isoformat()) for row in rows]
+    columns["responsible"] = [users.code(row[n_scalar + 4]) for row in rows]
+
+    # пользователи — одним запросом, в порядке индексов словаря
+    by_id = {u.pk: u for u in User.objects.select_related("profile").filter(pk__in=users.values)}
+    user_table = [
+        UserSerializer(by_id[pk]).data if pk in by_id else {"id": pk}  # удалён между запросами
+        for pk in users.values
+    ]
+
+    images = {task_id: [] for task_id in columns["id"]}
+    image_rows = (TaskImage.objects.filter(task_id__in=columns["id"])
+                  .order_by("task_id", "position").values_list("task_id", "id", "position", "image"))
+    for task_id, image_id, position, name in image_rows:
+        images[task_id].append([image_id, position, _image_url(name, request)])
+    columns["images"] = [images[task_id] for task_id in columns["id"]]
+
+    rollup = subtasks.rollup(columns["id"])
+    columns["subtasks"] = [list(rollup[task_id]) if task_id in rollup else None for task_id in columns["id"]]
+
+    return {
+        "format": FORMAT,
+        "count": len(rows),
+        "enums": {"column": COLUMNS, "priority": PRIORITIES},
+        "dicts": {"date": dates.values, "users": user_table},
+        "columns": columns,
+    }
@@ -0,0 +1,115 @@
+# tasks/compression.py
+"""
+Сжатие ответов с выбором кодировки по Accept-Encoding: brotli (если установлен
+пакет brotli), иначе gzip. Маленькие ответы (< MIN_SIZE) и уже сжатые типы не трогаем.
+
+Настройки (settings.RESPONSE_COMPRESSION): MIN_SIZE, GZIP_LEVEL, BROTLI_QUALITY,
+EXCLUDE_PATHS — пути, где в теле есть секреты (CSRF-токен), сжатие там
+открывает BREACH, поэтому они исключены.
+"""
+import gzip
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - опциональная зависимость
+    brotli = None
+
+DEFAULTS = {
+    "MIN_SIZE": 1024,
+    "GZIP_LEVEL": 6,
+    "BROTLI_QUALITY": 5,
+    "EXCLUDE_PATHS": ("/api/csrf/",),
+}
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "RESPONSE_COMPRESSION", {})}
+
+
+def accepted_encodings(header):
+    """{'br': 1.0, 'gzip': 0.8, ...} из Accept-Encoding (q=0 — явно запрещено)."""
+    result = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        result[name] = q
+    return result
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for enc in candidates:
+        q = accepted.get(enc, wildcard)
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def compress(content, encoding, config):
+    if encoding == "br":
+        return brotli.compress(content, quality=config["BROTLI_QUALITY"])
+    return gzip.compress(content, compresslevel=config["GZIP_LEVEL"], mtime=0)
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = get_config()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "")
+        if not (content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if len(response.content) < self.config["MIN_SIZE"] or request.path in self.config["EXCLUDE_PATHS"]:
+            return response
+
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding, self.config)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            # тело другое — сильный ETag больше не верен (как в django GZipMiddleware)
+            response["ETag"] = "W/" + etag
+        return response
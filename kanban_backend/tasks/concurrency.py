@@ -0,0 +1,116 @@
+# tasks/concurrency.py
+"""
+Оптимистичная блокировка для Task и Project.
+
+У строки есть `version`; API отдаёт её в поле `version` и заголовке ETag ("<version>").
+PATCH/PUT с `If-Match: "<version>"` выполняется одним условным запросом
+
+    UPDATE ... SET <изменённые поля>, version = version + 1 WHERE id = %s AND version = %s
+
+и при 0 обновлённых строк отвечает 412 — без SELECT FOR UPDATE и без
+перечитывания строки. Без If-Match поведение прежнее (last-write-wins),
+но version всё равно растёт, чтобы ETag'и у других клиентов устарели.
+
+В UPDATE попадают только поля из запроса (и auto_now), поэтому запись не
+затирает счётчики проекта, которые параллельно двигает tasks/counters.py.
+Сигналы pre_save/post_save модели при этом не шлются.
+"""
+from django.db.models import F
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.utils import model_meta
+
+UNSAFE_UPDATE_METHODS = ("PUT", "PATCH")
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "Объект изменён другим пользователем — обновите его и повторите."
+    default_code = "precondition_failed"
+
+
+def etag(version):
+    return f'"{version}"'
+
+
+def parse_if_match(header):
+    """
+    Версия из If-Match. None — заголовка нет или "*" (условие не нужно).
+    Слабый W/"3" принимаем тоже: CompressionMiddleware ослабляет ETag сжатых ответов.
+    Нераспознанный тег — -1, он не совпадёт ни с одной версией.
+    """
+    header = (header or "").strip()
+    if not header or header == "*":
+        return None
+    tag = header.split(",")[0].strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    return int(tag) if tag.isdigit() else -1
+
+
+def conditional_update(instance, fields, expected_version=None):
+    """
+    UPDATE только `fields` (+ auto_now и version). При expected_version —
+    с условием на версию; 412, если строку уже изменили.
+    """
+    model = type(instance)
+    opts = model._meta
+    names = set(fields)
+    values = {}
+    for field in opts.concrete_fields:
+        if field.primary_key or field.name == "version":
+            continue
+        if field.name in names or getattr(field, "auto_now", False):
+            values[field.attname] = field.pre_save(instance, add=False)
+
+    qs = model._base_manager.filter(pk=instance.pk)
+    if expected_version is not None:
+        qs = qs.filter(version=expected_version)
+    if not qs.update(version=F("version") + 1, **values):
+        raise PreconditionFailed()
+
+    if expected_version is not None:
+        instance.version = expected_version + 1
+    else:
+        instance.refresh_from_db(fields=["version"])
+    return instance
+
+
+class VersionedSerializerMixin:
+    """ModelSerializer.update через conditional_update; версия ожидается в context["if_match"]."""
+
+    def update(self, instance, validated_data):
+        info = model_meta.get_field_info(instance)
+        m2m_fields = []
+        fields = []
+        for attr, value in validated_data.items():
+            if attr in info.relations and info.relations[attr].to_many:
+                m2m_fields.append((attr, value))
+            else:
+                setattr(instance, attr, value)
+                fields.append(attr)
+
+        conditional_update(instance, fields, self.context.get("if_match"))
+
+        for attr, value in m2m_fields:
+            getattr(instance, attr).set(value)
+        return instance
+
+
+class ConditionalUpdateMixin:
+    """Для ModelViewSet: If-Match -> context["if_match"], ETag в ответах с одним объектом."""
+
+    def get_serializer_context(self):
+        ctx = super().get_serializer_context()
+        if self.request.method in UNSAFE_UPDATE_METHODS:
+            ctx["if_match"] = parse_if_match(self.request.headers.get("If-Match"))
+        return ctx
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        data = getattr(response, "data", None)
+        if (self.action in ("retrieve", "create", "update", "partial_update")
+                and response.status_code < 300 and isinstance(data, dict) and "version" in data):
+            response["ETag"] = etag(data["version"])
+        return response
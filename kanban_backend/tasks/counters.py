@@ -0,0 +1,175 @@
+# tasks/counters.py
+"""
+Денормализованные счётчики проекта: задачи по колонкам, «выполнено с опозданием»
+и число участников. Пишутся атомарными UPDATE ... SET x = x + 1 (F-выражения),
+поэтому конкурентные записи не теряют инкременты и не требуют чтения строки проекта.
+
+«Просрочено» сюда не входит: оно зависит от сегодняшней даты, а не от записи.
+Заархивированные задачи (tasks_archived) считаются выполненными: прогресс
+проекта не должен падать оттого, что done-задачи уехали в архив.
+
+Пишут их TaskViewSet и TaskAdmin. Задачи, созданные мимо них (shell, bulk,
+миграции данных), счётчики не двигают — поэтому уменьшение ограничено нулём
+(иначе CHECK поля упал бы на удалении такой задачи), а точные значения
+восстанавливает manage.py reconcile_counters.
+"""
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from .models import Project, Task
+
+COLUMN_FIELDS = {col: f"tasks_{col}" for col, _ in Task.COLUMN_CHOICES}
+
+
+def is_done_late(column, due_date, completed_at):
+    return column == "done" and bool(due_date and completed_at and completed_at > due_date)
+
+
+def task_state(task):
+    """Снимок того, что влияет на счётчики: (project_id, column, done_late)."""
+    return (task.project_id, task.column, is_done_late(task.column, task.due_date, task.completed_at))
+
+
+def shifted(name, delta):
+    """F(name) + delta, не ниже нуля (PositiveIntegerField)."""
+    return F(name) + delta if delta >= 0 else Greatest(F(name) + delta, 0)
+
+
+def _apply(deltas):
+    for project_id, fields in deltas.items():
+        changes = {name: shifted(name, d) for name, d in fields.items() if d}
+        if changes:
+            Project.objects.filter(pk=project_id).update(**changes)
+
+
+def apply_task_change(old=None, new=None):
+    """
+    old/new — результат task_state() до и после записи (None для create/delete).
+    Вызывать внутри той же транзакции, что и сама запись задачи.
+    """
+    deltas = {}
+    for state, sign in ((old, -1), (new, +1)):
+        if state is None or state[0] is None:
+            continue
+        project_id, column, late = state
+        fields = deltas.setdefault(project_id, Counter())
+        fields[COLUMN_FIELDS[column]] += sign
+        if late:
+            fields["tasks_done_late"] += sign
+    _apply(deltas)
+
+
+COUNTER_FIELDS = [*COLUMN_FIELDS.values(), "tasks_done_late", "tasks_archived", "participants_count"]
+
+
+def refresh(project):
+    """Подтягивает в объект проекта счётчики, сдвинутые UPDATE-ами выше (для ответа API)."""
+    if project is not None:
+        project.refresh_from_db(fields=COUNTER_FIELDS)
+
+
+def as_dict(project):
+    data = {col: getattr(project, field) for col, field in COLUMN_FIELDS.items()}
+    total = sum(data.values()) + project.tasks_archived
+    done = project.tasks_done + project.tasks_archived
+    data.update(
+        total=total,
+        archived=project.tasks_archived,
+        done_late=project.tasks_done_late,
+        participants=project.participants_count,
+        progress=(done * 100 + total // 2) // total if total else 0,
+    )
+    return data
+
+
+RECONCILE_CHUNK = 500
+
+
+def _real_task_counts(alias, project_ids):
+    """{project_id: {поле: n}} по живым задачам — на шарде, где живут задачи проектов."""
+    real = {}
+    tasks = Task.objects.using(alias).filter(project_id__in=project_ids).order_by()
+    for project_id, column, n in tasks.values_list("project_id", "column").annotate(n=Count("id")):
+        real.setdefault(project_id, {})[COLUMN_FIELDS[column]] = n
+    for project_id, n in (tasks.filter(column="done", completed_at__gt=F("due_date"))
+                          .values_list("project_id").annotate(n=Count("id"))):
+        real.setdefault(project_id, {})["tasks_done_late"] = n
+    return real
+
+
+def reconcile(projects=None):
+    """
+    Пересчитывает счётчики с нуля и чинит расхождения.
+    Возвращает число проектов, у которых что-то поменялось.
+
+    Задачи считаются сгруппированными запросами по шарду проекта
+    (tasks/sharding.py: строка проекта и его задачи могут жить в разных базах),
+    пачками по RECONCILE_CHUNK проектов.
+    """
+    projects = Project.objects.all() if projects is None else projects
+    task_fields = [*COLUMN_FIELDS.values(), "tasks_done_late"]
+    rows = projects.annotate(real_tasks_archived=Count("archived_tasks")).order_by("pk").iterator()
+
+    fixed = 0
+    while chunk := list(islice(rows, RECONCILE_CHUNK)):
+        ids = [row.pk for row in chunk]
+        by_shard = defaultdict(list)
+        for row in chunk:
+            by_shard[row.shard].append(row.pk)
+        real = {}
+        for alias, shard_ids in by_shard.items():
+            real.update(_real_task_counts(alias, shard_ids))
+        participants = dict(
+            Project.participants.through.objects
+            .filter(project_id__in=ids).values("project_id")
+            .annotate(n=Count("id")).values_list("project_id", "n")
+        )
+        for row in chunk:
+            expected = {f: real.get(row.pk, {}).get(f, 0) for f in task_fields}
+            expected["tasks_archived"] = row.real_tasks_archived
+            expected["participants_count"] = participants.get(row.pk, 0)
+            changes = {f: n for f, n in expected.items() if getattr(row, f) != n}
+            if changes:
+                Project.objects.filter(pk=row.pk).update(**changes)
+                fixed += 1
+    return fixed
+
+
+# ---- Участники: m2m_changed по Project.participants ----
+def _linked_project_ids(instance, reverse, pk_set):
+    """Проекты, в которых связь реально существует (remove() присылает pk_set как есть)."""
+    links = Project.participants.through.objects
+    if reverse:
+        links = links.filter(user_id=instance.pk)
+        if pk_set is not None:
+            links = links.filter(project_id__in=pk_set)
+        return list(links.values_list("project_id", flat=True))
+    links = links.filter(project_id=instance.pk)
+    if pk_set is not None:
+        links = links.filter(user_id__in=pk_set)
+    return [instance.pk] * links.count()
+
+
+@receiver(m2m_changed, sender=Project.participants.through)
+def update_participants_count(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("pre_remove", "pre_clear"):
+        # запоминаем, что реально удалится, пока связи ещё есть
+        instance._removed_project_ids = _linked_project_ids(instance, reverse, pk_set)
+        return
+    if action in ("post_remove", "post_clear"):
+        deltas = Counter(getattr(instance, "_removed_project_ids", []))
+        instance._removed_project_ids = []
+        sign = -1
+    elif action == "post_add" and pk_set:
+        # post_add получает только реально добавленные id
+        deltas = Counter(pk_set) if reverse else Counter({instance.pk: len(pk_set)})
+        sign = 1
+    else:
+        return
+    for project_id, n in deltas.items():
+        Project.objects.filter(pk=project_id).update(participants_count=shifted("participants_count", sign * n))
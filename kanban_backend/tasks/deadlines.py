@@ -0,0 +1,114 @@
+# tasks/deadlines.py
+"""
+Сканер дедлайнов: раз в тик (manage.py deadline_digest --loop) находит задачи
+и проекты, у которых скоро срок или он уже прошёл, и пишет каждому
+пользователю один NotificationDigest со списком новых напоминаний.
+
+Задачи берутся одним диапазонным запросом по частичному индексу
+tasks_task_due_open_idx (due_date среди не-done), проекты — по индексу
+Project.due_date; окно [сегодня - CATCH_UP_DAYS, сегодня + DUE_SOON_DAYS],
+так что работа пропорциональна числу попавших в окно задач, а не всей таблице.
+CATCH_UP_DAYS покрывает простой планировщика. При шардировании диапазонный
+запрос уходит на все шарды параллельно (sharding.fan_out).
+
+Идемпотентность — через DeadlineNotice (target, object_id, kind, due_date):
+напоминание пишется в той же транзакции, что и дайджест, и второй раз не
+попадает. Смена due_date даёт новое напоминание. Записи старше окна удаляются.
+"""
+import logging
+from collections import defaultdict
+from itertools import chain
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import deletion, sharding
+from .models import DeadlineNotice, NotificationDigest, Project, Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "DUE_SOON_DAYS": 2,
+    "CATCH_UP_DAYS": 7,
+    "INTERVAL": 3600,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "DEADLINE_DIGESTS", {})}
+
+
+def _kind(due_date, today):
+    return "overdue" if due_date < today else "due_soon"
+
+
+def _known(target, object_ids):
+    if not object_ids:
+        return set()
+    return set(DeadlineNotice.objects.filter(target=target, object_id__in=object_ids)
+               .values_list("object_id", "kind", "due_date"))
+
+
+def _open_tasks(alias, low, high, hidden):
+    rows = (
+        Task.objects.filter(due_date__gte=low, due_date__lte=high, responsible__isnull=False)
+        .exclude(column="done")
+        .exclude(project_id__in=hidden)   # проекты, помеченные удалёнными (tasks/deletion.py)
+        .order_by()   # без сортировки по position — чистый проход по индексу
+        .values_list("id", "title", "project_id", "due_date", "responsible_id")
+    )
+    # копии задач проекта, который сейчас переносится, есть на двух шардах — берём авторитетную
+    return [row for row in rows if sharding.owns(alias, row[2])]
+
+
+def scan(today=None, config=None):
+    """Один тик. Возвращает (число новых напоминаний, число дайджестов)."""
+    config = config or get_config()
+    today = today or timezone.localdate()
+    low = today - timedelta(days=config["CATCH_UP_DAYS"])
+    high = today + timedelta(days=config["DUE_SOON_DAYS"])
+
+    hidden = deletion.hidden_project_ids()
+    tasks = list(chain.from_iterable(
+        sharding.fan_out(lambda alias: _open_tasks(alias, low, high, hidden)).values()
+    ))
+    projects = list(Project.objects.filter(due_date__gte=low, due_date__lte=high)
+                    .order_by().values_list("id", "title", "due_date"))
+    members = defaultdict(list)
+    for project_id, user_id in (Project.participants.through.objects
+                                .filter(project_id__in=[p[0] for p in projects])
+                                .values_list("project_id", "user_id")):
+        members[project_id].append(user_id)
+
+    known_tasks = _known("task", [t[0] for t in tasks])
+    known_projects = _known("project", [p[0] for p in projects])
+
+    notices = []
+    items = defaultdict(list)   # user_id -> элементы дайджеста
+    for task_id, title, project_id, due_date, user_id in tasks:
+        kind = _kind(due_date, today)
+        if (task_id, kind, due_date) in known_tasks:
+            continue
+        notices.append(DeadlineNotice(target="task", object_id=task_id, kind=kind, due_date=due_date))
+        items[user_id].append({"target": "task", "id": task_id, "project_id": project_id,
+                               "title": title, "kind": kind, "due_date": due_date.isoformat()})
+    for project_id, title, due_date in projects:
+        kind = _kind(due_date, today)
+        if (project_id, kind, due_date) in known_projects:
+            continue
+        notices.append(DeadlineNotice(target="project", object_id=project_id, kind=kind, due_date=due_date))
+        for user_id in members[project_id]:
+            items[user_id].append({"target": "project", "id": project_id, "title": title,
+                                   "kind": kind, "due_date": due_date.isoformat()})
+
+    with transaction.atomic():
+        DeadlineNotice.objects.filter(due_date__lt=low).delete()
+        DeadlineNotice.objects.bulk_create(notices, ignore_conflicts=True)
+        NotificationDigest.objects.bulk_create(
+            [NotificationDigest(user_id=user_id, items=user_items) for user_id, user_items in items.items()]
+        )
+    if notices:
+        logger.info("deadlines: %d new notices, %d digests (window %s..%s)", len(notices), len(items), low, high)
+    return len(notices), len(items)
@@ -0,0 +1,183 @@
+# tasks/deletion.py
+"""
+Удаление проектов без каскадного сборщика в запросе.
+
+DELETE /api/projects/<id>/ только помечает проект (Project.deleted_at) и
+заводит DeletionJob: проект сразу пропадает из Project.objects (менеджер
+по умолчанию), из auth-кэша участников и, значит, из всех списков задач.
+Маленький проект (не больше INLINE_MAX_TASKS задач и архивных задач —
+считаются реальные строки с потолком, а не денормализованные счётчики,
+которые могут разойтись с таблицей) дочищается тут же,
+ответ 204 как раньше; большой — 202 с заданием, его дочищает
+manage.py purge_deleted --loop, прогресс — GET /api/deletions/<id>/.
+
+Очистка идёт пачками по BATCH_SIZE, каждая — своя короткая транзакция:
+    1. задачи на шарде проекта: имена файлов картинок -> DELETE картинок и
+       задач одним запросом каждый (sharding.raw_delete, без сигналов),
+       файлы удаляются после коммита (media_gc.delete_after_commit);
+    2. архив проекта — так же, с файлами из ArchivedTask.images;
+    3. журнал переходов, сводки, напоминания — просто DELETE;
+    4. сама строка проекта (участники — каскадом, строк уже немного).
+Пачка коммитится вместе с прогрессом задания, поэтому прерванную очистку
+другой воркер продолжает с места остановки (задание «running» без пульса
+дольше STALE_AFTER секунд считается брошенным).
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import auth_cache, media_gc, sharding
+from .models import (ArchivedTask, CycleTimeDay, DeadlineNotice, DeletionJob, FlowDay, Project, Task,
+                     TaskClosure, TaskImage, TaskTransition)
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "INLINE_MAX_TASKS": 200,
+    "BATCH_SIZE": 1000,
+    "PAUSE": 0.05,
+    "STALE_AFTER": 300,
+    "INTERVAL": 10,
+}
+
+COUNTER_FIELDS = ("tasks_new", "tasks_in_progress", "tasks_testing", "tasks_review", "tasks_done",
+                  "tasks_archived")
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "PROJECT_DELETION", {})}
+
+
+def hidden_project_ids():
+    """Проекты, помеченные удалёнными и ещё не дочищенные, — их задачи не показываем."""
+    return list(Project.all_objects.filter(deleted_at__isnull=False).values_list("pk", flat=True))
+
+
+def delete_project(project, user=None):
+    """Помечает проект удалённым и заводит задание; маленький проект дочищает сразу."""
+    config = get_config()
+    total = sum(getattr(project, field) for field in COUNTER_FIELDS)   # для прогресса, это оценка
+    inline = _is_small(project, config["INLINE_MAX_TASKS"])
+    participant_ids = list(project.participants.values_list("pk", flat=True))
+    with transaction.atomic():
+        Project.all_objects.filter(pk=project.pk).update(deleted_at=timezone.now())
+        job = DeletionJob.objects.create(project_id=project.pk, title=project.title, requested_by=user,
+                                         total=total)
+    auth_cache.invalidate(*participant_ids)
+    sharding.forget(project.pk)
+    if inline and _claim(job):
+        purge(job, pause=0)
+        job.refresh_from_db()
+    return job
+
+
+def _is_small(project, limit):
+    """Не больше limit строк задач (на шарде проекта) и архива; COUNT по LIMIT limit + 1, не по всей таблице."""
+    with sharding.use_shard(project.shard):
+        tasks = Task.objects.filter(project_id=project.pk)[:limit + 1].count()
+    if tasks > limit:
+        return False
+    return ArchivedTask.objects.filter(project_id=project.pk)[:limit + 1 - tasks].count() + tasks <= limit
+
+
+# ---- Очередь ----
+def _claim(job):
+    """Забирает задание себе: pending или брошенное running. Условный UPDATE — без гонок между воркерами."""
+    now = timezone.now()
+    claimed = DeletionJob.objects.filter(pk=job.pk, status=job.status, updated_at=job.updated_at).update(
+        status="running", updated_at=now,
+    )
+    if claimed:
+        job.status, job.updated_at = "running", now
+    return bool(claimed)
+
+
+def next_job(config=None):
+    config = config or get_config()
+    stale = timezone.now() - timedelta(seconds=config["STALE_AFTER"])
+    candidates = (DeletionJob.objects
+                  .filter(Q(status="pending") | Q(status="running", updated_at__lt=stale))
+                  .order_by("id")[:10])
+    for job in candidates:
+        if _claim(job):
+            return job
+    return None
+
+
+def run_pending(config=None):
+    """Дочищает все задания в очереди. Возвращает число завершённых."""
+    config = config or get_config()
+    done = 0
+    while (job := next_job(config)) is not None:
+        purge(job, config=config)
+        done += 1
+    return done
+
+
+# ---- Очистка ----
+def _progress(job, purged=0):
+    DeletionJob.objects.filter(pk=job.pk).update(purged=F("purged") + purged, updated_at=timezone.now())
+
+
+def _drain(queryset, job, batch_size, pause, files=None, counts=False):
+    """
+    Удаляет строки queryset пачками по pk. files(ids) — удалить зависимые строки
+    пачки и вернуть имена их файлов (файлы удаляются после коммита);
+    counts — пачка идёт в прогресс задания.
+    """
+    model = queryset.model
+    alias = sharding.current() or DEFAULT_DB_ALIAS
+    while True:
+        with sharding.atomic():
+            ids = list(queryset.order_by().values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                return
+            if files is not None:
+                media_gc.delete_after_commit(files(ids), alias)
+            sharding.raw_delete(model._base_manager.filter(pk__in=ids))
+            _progress(job, len(ids) if counts else 0)
+        if pause:
+            time.sleep(pause)
+
+
+def _delete_task_children(ids):
+    """Строки, ссылающиеся на пачку задач: картинки (имена файлов — наружу), closure, parent."""
+    images = TaskImage.objects.filter(task_id__in=ids)
+    names = list(images.values_list("image", flat=True))
+    sharding.raw_delete(images)
+    sharding.raw_delete(TaskClosure.objects.filter(Q(ancestor_id__in=ids) | Q(descendant_id__in=ids)))
+    Task.objects.filter(parent_id__in=ids).exclude(pk__in=ids).update(parent=None)
+    return names
+
+
+def _archive_files(ids):
+    rows = ArchivedTask.objects.filter(pk__in=ids).values_list("images", flat=True)
+    return [item.get("image") for images in rows for item in images]
+
+
+def purge(job, config=None, pause=None):
+    config = config or get_config()
+    batch_size = config["BATCH_SIZE"]
+    pause = config["PAUSE"] if pause is None else pause
+    project = Project.all_objects.filter(pk=job.project_id).first()
+
+    if project is not None:
+        with sharding.use_shard(project.shard):
+            _drain(Task.objects.filter(project_id=project.pk), job, batch_size, pause,
+                   files=_delete_task_children, counts=True)
+        _drain(ArchivedTask.objects.filter(project_id=project.pk), job, batch_size, pause,
+               files=_archive_files, counts=True)
+        for model in (TaskTransition, FlowDay, CycleTimeDay):
+            _drain(model.objects.filter(project_id=project.pk), job, batch_size, pause)
+        DeadlineNotice.objects.filter(target="project", object_id=project.pk).delete()
+        # дочерних строк больше нет — сборщик удалит только участников и саму строку
+        Project.all_objects.filter(pk=project.pk).delete()
+
+    DeletionJob.objects.filter(pk=job.pk).update(status="done", finished_at=timezone.now(),
+                                                 updated_at=timezone.now())
+    logger.info("deletion: project %s (%s) purged", job.project_id, job.title)
@@ -0,0 +1,214 @@
+# tasks/flow.py
+"""
+Журнал переходов задач между колонками и его суточные сводки.
+
+record() пишется из TaskViewSet в той же транзакции, что и сама задача:
+создание (""->col), смена колонки (a->b), удаление/перенос из проекта (col->"").
+Архивирование (tasks/archive.py) переходом не считается — для CFD
+заархивированная задача остаётся в done.
+
+rollup() раз в сутки (manage.py rollup_flow) материализует:
+    FlowDay       — по проекту, дню и колонке: WIP на конец дня, вошло, вышло;
+    CycleTimeDay  — по проекту и дню: throughput и p50/p85/p95 cycle/lead time.
+Сводка считается назад от текущих счётчиков проекта (tasks/counters.py):
+count(d-1) = count(d) - вошло(d) + вышло(d), так что журнал читается только
+за окно пересчёта, а эндпоинт аналитики — O(дней) строк.
+"""
+import math
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import sharding
+from .counters import COLUMN_FIELDS
+from .models import ArchivedTask, CycleTimeDay, FlowDay, Project, Task, TaskTransition
+
+COLUMNS = list(COLUMN_FIELDS)
+PERCENTILES = (50, 85, 95)
+ID_CHUNK = 500
+
+
+def record(task_id, old=None, new=None):
+    """old/new — counters.task_state() до и после записи (None для create/delete)."""
+    old_project, old_column = (old[0], old[1]) if old else (None, "")
+    new_project, new_column = (new[0], new[1]) if new else (None, "")
+    if old_project == new_project:
+        if old_column == new_column or old_project is None:
+            return
+        rows = [(old_project, old_column, new_column)]
+    else:
+        rows = [(p, f, t) for p, f, t in ((old_project, old_column, ""), (new_project, "", new_column))
+                if p is not None]
+    now = timezone.now()
+    TaskTransition.objects.bulk_create([
+        TaskTransition(project_id=p, task_id=task_id, from_column=f, to_column=t, at=now)
+        for p, f, t in rows
+    ])
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def percentile(values, p):
+    """Nearest-rank по отсортированному списку."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def default_range():
+    """С дня после последней сводки (или первого события) по вчера включительно."""
+    until = timezone.localdate() - timedelta(days=1)
+    last = FlowDay.objects.aggregate(last=Max("day"))["last"]
+    if last is not None:
+        return last + timedelta(days=1), until
+    first = TaskTransition.objects.aggregate(first=Min("at"))["first"]
+    since = timezone.localdate(first) if first else until
+    return min(since, until), until
+
+
+def _flow_rows(since, until):
+    # события с начала окна до текущего момента: нужны, чтобы откатиться от счётчиков
+    entered = defaultdict(lambda: defaultdict(int))   # (project, day) -> column -> n
+    exited = defaultdict(lambda: defaultdict(int))
+    events = (TaskTransition.objects.filter(at__gte=_day_start(since))
+              .annotate(day=TruncDate("at"))
+              .values_list("project_id", "day", "from_column", "to_column")
+              .annotate(n=Count("id")).order_by())
+    active = set()
+    for project_id, day, from_column, to_column, n in events:
+        active.add(project_id)
+        if to_column:
+            entered[project_id, day][to_column] += n
+        if from_column:
+            exited[project_id, day][from_column] += n
+
+    today = timezone.localdate()
+    rows = []
+    for project in Project.objects.only("pk", "tasks_archived", *COLUMN_FIELDS.values()).iterator():
+        current = {col: getattr(project, field) for col, field in COLUMN_FIELDS.items()}
+        current["done"] += project.tasks_archived
+        if project.pk not in active and not any(current.values()):
+            continue
+        day = today
+        while day >= since:
+            key = (project.pk, day)
+            if day <= until:
+                rows.extend(
+                    FlowDay(project_id=project.pk, day=day, column=col, count=current[col],
+                            entered=entered[key][col] if key in entered else 0,
+                            exited=exited[key][col] if key in exited else 0)
+                    for col in COLUMNS
+                )
+            for col in COLUMNS:
+                current[col] -= entered[key][col] if key in entered else 0
+                current[col] += exited[key][col] if key in exited else 0
+            day -= timedelta(days=1)
+    return rows
+
+
+def _first_seen(task_ids, **filters):
+    seen = {}
+    for i in range(0, len(task_ids), ID_CHUNK):
+        chunk = task_ids[i:i + ID_CHUNK]
+        seen.update(TaskTransition.objects.filter(task_id__in=chunk, **filters)
+                    .values("task_id").annotate(first=Min("at")).values_list("task_id", "first"))
+    return seen
+
+
+def _created_at(task_ids):
+    """Начало lead time: событие создания, иначе created_at задачи (живой или архивной)."""
+    created = _first_seen(task_ids, from_column="")
+    missing = [pk for pk in task_ids if pk not in created]
+    for i in range(0, len(missing), ID_CHUNK):
+        chunk = missing[i:i + ID_CHUNK]
+        for alias in sharding.shards():
+            created.update(Task.objects.using(alias).filter(pk__in=chunk).values_list("pk", "created_at"))
+        created.update(ArchivedTask.objects.filter(original_id__in=chunk).values_list("original_id", "created_at"))
+    return created
+
+
+def _cycle_rows(since, until):
+    done = {}   # (project, day, task) -> момент последнего входа в done за день
+    events = (TaskTransition.objects
+              .filter(to_column="done", at__gte=_day_start(since), at__lt=_day_start(until + timedelta(days=1)))
+              .values_list("project_id", "task_id", "at"))
+    for project_id, task_id, at in events:
+        key = (project_id, timezone.localdate(at), task_id)
+        done[key] = max(at, done.get(key, at))
+    task_ids = sorted({task_id for _, _, task_id in done})
+    started = _first_seen(task_ids, to_column="in_progress")
+    created = _created_at(task_ids)
+
+    samples = defaultdict(lambda: ([], []))   # (project, day) -> (cycle, lead), часы
+    throughput = Counter()
+    for (project_id, day, task_id), at in done.items():
+        throughput[project_id, day] += 1
+        cycle, lead = samples[project_id, day]
+        if task_id in started and started[task_id] <= at:
+            cycle.append((at - started[task_id]).total_seconds() / 3600)
+        if task_id in created and created[task_id] <= at:
+            lead.append((at - created[task_id]).total_seconds() / 3600)
+
+    rows = []
+    for (project_id, day), (cycle, lead) in samples.items():
+        cycle.sort()
+        lead.sort()
+        stats = {}
+        for p in PERCENTILES:
+            stats[f"cycle_p{p}"] = percentile(cycle, p)
+            stats[f"lead_p{p}"] = percentile(lead, p)
+        rows.append(CycleTimeDay(project_id=project_id, day=day, throughput=throughput[project_id, day],
+                                 **{k: v if v is None else round(v, 2) for k, v in stats.items()}))
+    return rows
+
+
+def rollup(since=None, until=None):
+    """Пересчитывает сводки за [since, until]; повторный запуск перезаписывает те же дни."""
+    default_since, default_until = default_range()
+    since = default_since if since is None else since
+    until = default_until if until is None else until
+    if since > until:
+        return 0
+    flow_rows = _flow_rows(since, until)
+    cycle_rows = _cycle_rows(since, until)
+    with transaction.atomic():
+        FlowDay.objects.filter(day__gte=since, day__lte=until).delete()
+        CycleTimeDay.objects.filter(day__gte=since, day__lte=until).delete()
+        FlowDay.objects.bulk_create(flow_rows, batch_size=1000)
+        CycleTimeDay.objects.bulk_create(cycle_rows, batch_size=1000)
+    return (until - since).days + 1
+
+
+def project_analytics(project, since, until):
+    """Данные для графиков: CFD и cycle time по дням — два запроса по сводкам."""
+    flow = defaultdict(lambda: {"counts": {}, "entered": {}, "exited": {}})
+    for day, column, count, entered, exited in (
+            FlowDay.objects.filter(project=project, day__gte=since, day__lte=until)
+            .order_by("day").values_list("day", "column", "count", "entered", "exited")):
+        point = flow[day]
+        point["counts"][column] = count
+        point["entered"][column] = entered
+        point["exited"][column] = exited
+    cycle = [
+        {
+            "day": row.day,
+            "throughput": row.throughput,
+            "cycle": {f"p{p}": getattr(row, f"cycle_p{p}") for p in PERCENTILES},
+            "lead": {f"p{p}": getattr(row, f"lead_p{p}") for p in PERCENTILES},
+        }
+        for row in CycleTimeDay.objects.filter(project=project, day__gte=since, day__lte=until).order_by("day")
+    ]
+    return {
+        "project": project.pk,
+        "from": since,
+        "to": until,
+        "columns": COLUMNS,
+        "cfd": [{"day": day, **point} for day, point in flow.items()],
+        "cycle_time": cycle,
+    }
@@ -0,0 +1,72 @@
+# tasks/images.py
+"""
+Сжатие загружаемых картинок (Pillow): ресайз до MAX_SIDE, WebP для непрозрачных,
+PNG для картинок с альфой.
+
+Модуль импортируется лениво из TaskImageViewSet.create: PIL.Image тянет за собой
+десятки миллисекунд импорта и память, которые не нужны воркерам и командам,
+не принимающим загрузки (см. bench/startup.py).
+"""
+from io import BytesIO
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image
+import os
+import uuid
+
+MAX_SIDE = 2560
+WEBP_QUALITY = 82
+PNG_COMPRESS_LEVEL = 6
+
+def _has_alpha(pil: Image.Image) -> bool:
+    return pil.mode in ("RGBA", "LA") or (pil.mode == "P" and "transparency" in pil.info)
+
+def _resize_down(pil: Image.Image) -> Image.Image:
+    w, h = pil.size
+    long_side = max(w, h)
+    if long_side <= MAX_SIDE:
+        return pil
+    scale = MAX_SIDE / float(long_side)
+    new_size = (int(w * scale), int(h * scale))
+    return pil.resize(new_size, Image.Resampling.LANCZOS)
+
+def compress_image_to_best(file_obj, prefer_webp=True):
+    file_obj.seek(0)
+    with Image.open(file_obj) as im:
+        im.load()
+        im.info.pop("icc_profile", None)
+        im.info.pop("exif", None)
+
+        has_alpha = _has_alpha(im)
+        im = _resize_down(im)
+
+        buffer = BytesIO()
+        orig_name = getattr(file_obj, "name", f"upload_{uuid.uuid4().hex}")
+        base, _ext = os.path.splitext(orig_name)
+
+        if has_alpha:
+            if im.mode not in ("RGBA", "LA"):
+                im = im.convert("RGBA")
+            im.save(buffer, format="PNG", optimize=True, compress_level=PNG_COMPRESS_LEVEL)
+            new_ext = ".png"
+        else:
+            if im.mode != "RGB":
+                im = im.convert("RGB")
+            if prefer_webp:
+                im.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=6)
+                new_ext = ".webp"
+            else:
+                im.save(buffer, format="JPEG", quality=86, optimize=True, progressive=True)
+                new_ext = ".jpg"
+
+        buffer.seek(0)
+        new_name = f"{base}{new_ext}"
+        content_type = "image/png" if new_ext == ".png" else ("image/webp" if new_ext == ".webp" else "image/jpeg")
+
+        return InMemoryUploadedFile(
+            file=buffer,
+            field_name="image",
+            name=new_name,
+            content_type=content_type,
+            size=buffer.getbuffer().nbytes,
+            charset=None,
+        ), new_name
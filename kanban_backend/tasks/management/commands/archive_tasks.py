@@ -0,0 +1,27 @@
+# tasks/management/commands/archive_tasks.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.archive import archive_done_tasks, get_config
+
+
+class Command(BaseCommand):
+    help = "Переносит давно выполненные задачи в архив (ArchivedTask) пачками."
+
+    def add_arguments(self, parser):
+        config = get_config()
+        parser.add_argument("--after-days", type=int, default=config["AFTER_DAYS"],
+                            help="архивировать done-задачи, выполненные раньше стольких дней назад")
+        parser.add_argument("--batch-size", type=int, default=config["BATCH_SIZE"])
+        parser.add_argument("--max-batches", type=int, default=None, help="ограничить один прогон")
+        parser.add_argument("--loop", type=float, default=0, metavar="SECONDS",
+                            help="не завершаться: повторять прогон каждые SECONDS секунд")
+
+    def handle(self, *args, after_days, batch_size, max_batches, loop, **options):
+        while True:
+            moved = archive_done_tasks(after_days=after_days, batch_size=batch_size, max_batches=max_batches)
+            self.stdout.write(self.style.SUCCESS(f"Заархивировано задач: {moved}"))
+            if not loop:
+                return
+            time.sleep(loop)
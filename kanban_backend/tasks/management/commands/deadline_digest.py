@@ -0,0 +1,23 @@
+# tasks/management/commands/deadline_digest.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.deadlines import get_config, scan
+
+
+class Command(BaseCommand):
+    help = "Ищет задачи и проекты со скорым/прошедшим сроком и пишет дайджесты пользователям."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", type=float, nargs="?", const=get_config()["INTERVAL"], default=0,
+                            metavar="SECONDS",
+                            help="не завершаться: тик каждые SECONDS секунд (по умолчанию DEADLINE_DIGESTS['INTERVAL'])")
+
+    def handle(self, *args, loop, **options):
+        while True:
+            notices, digests = scan()
+            self.stdout.write(self.style.SUCCESS(f"Напоминаний: {notices}, дайджестов: {digests}"))
+            if not loop:
+                return
+            time.sleep(loop)
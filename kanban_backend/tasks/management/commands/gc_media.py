@@ -0,0 +1,35 @@
+# tasks/management/commands/gc_media.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from tasks.media_gc import collect, get_config
+
+
+class Command(BaseCommand):
+    help = "Ищет файлы картинок без строк в БД и переносит их в карантин (или удаляет)."
+
+    def add_arguments(self, parser):
+        config = get_config()
+        parser.add_argument("--grace-hours", type=float, default=config["GRACE_HOURS"],
+                            help="не трогать файлы моложе стольких часов")
+        parser.add_argument("--delete", action="store_true", help="удалять сразу, без карантина")
+        parser.add_argument("--dry-run", action="store_true", help="только отчёт")
+        parser.add_argument("--loop", type=float, nargs="?", const=config["INTERVAL"], default=0,
+                            metavar="SECONDS",
+                            help="не завершаться: прогон каждые SECONDS секунд (по умолчанию MEDIA_GC['INTERVAL'])")
+
+    def handle(self, *args, grace_hours, delete, dry_run, loop, **options):
+        while True:
+            r = collect(grace_hours=grace_hours, quarantine=False if delete else None, dry_run=dry_run)
+            verb = "найдено" if dry_run else ("удалено" if delete or not get_config()["QUARANTINE_DIR"]
+                                              else "в карантин")
+            self.stdout.write(self.style.SUCCESS(
+                f"Файлов: {r['scanned']}, сирот {verb}: {r['orphans']} ({filesizeformat(r['orphan_bytes'])}), "
+                f"моложе grace: {r['skipped_recent']}, "
+                f"удалено из карантина: {r['purged']} ({filesizeformat(r['purged_bytes'])})"
+            ))
+            if not loop:
+                return
+            time.sleep(loop)
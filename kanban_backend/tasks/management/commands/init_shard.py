@@ -0,0 +1,21 @@
+# tasks/management/commands/init_shard.py
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks import sharding
+
+
+class Command(BaseCommand):
+    help = ("Готовит шард (tasks/sharding.py): ставит автоинкремент Task/TaskImage в его блок id. "
+            "Схему перед этим — manage.py migrate --database <alias>.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("alias", help="алиас из SHARDING['SHARDS']")
+
+    def handle(self, *args, alias, **options):
+        if alias not in sharding.shards():
+            raise CommandError(f"{alias!r} нет в SHARDING['SHARDS']")
+        sharding.reset_sequences(alias)
+        block = sharding.id_block(alias)
+        self.stdout.write(self.style.SUCCESS(
+            f"Шард {alias}: id задач с {block + 1} до {block + sharding.get_config()['ID_BLOCK']}"
+        ))
@@ -0,0 +1,28 @@
+# tasks/management/commands/move_project.py
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks import sharding
+from tasks.models import Project
+
+
+class Command(BaseCommand):
+    help = ("Переносит задачи и картинки проекта на другой шард без остановки: копия, "
+            "короткая заморозка записи (503 + Retry-After), досинхронизация, переключение.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_id", type=int)
+        parser.add_argument("target", help="алиас шарда из SHARDING['SHARDS']")
+        parser.add_argument("--keep-source", action="store_true",
+                            help="не удалять строки на старом шарде (удалить потом вручную)")
+        parser.add_argument("--grace", type=float, default=None, metavar="SECONDS",
+                            help="пауза перед удалением старых строк (по умолчанию DIRECTORY_TTL)")
+
+    def handle(self, *args, project_id, target, keep_source, grace, **options):
+        try:
+            tasks, images = sharding.move_project(project_id, target, keep_source=keep_source, grace=grace,
+                                                  log=self.stdout.write)
+        except Project.DoesNotExist:
+            raise CommandError(f"Проекта {project_id} нет")
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Перенесено задач: {tasks}, картинок: {images}"))
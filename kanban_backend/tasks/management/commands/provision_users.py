@@ -0,0 +1,35 @@
+# tasks/management/commands/provision_users.py
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks import provisioning
+
+
+class Command(BaseCommand):
+    help = ("Создаёт/обновляет пользователей, их профили и участие в проектах из CSV или NDJSON "
+            "(выгрузка каталога сотрудников) пачками, без запроса на каждую строку.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="файл .csv / .ndjson (.jsonl) или - для stdin")
+        parser.add_argument("--format", dest="fmt", choices=provisioning.FORMATS, default=None,
+                            help="формат, если не понятен по расширению")
+        parser.add_argument("--batch-size", type=int, default=None, help="строк на транзакцию")
+
+    def handle(self, *args, path, fmt, batch_size, **options):
+        fmt = fmt or provisioning.guess_format(path)
+        if fmt is None:
+            raise CommandError("Не удалось определить формат — укажите --format")
+        try:
+            stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+        except OSError as exc:
+            raise CommandError(str(exc))
+        with stream:
+            report = provisioning.provision(stream, fmt, batch_size=batch_size, log=self.stdout.write)
+        for error in report["errors"]:
+            self.stderr.write(f"строка {error['line']}: {error['error']}")
+        if report["unknown_projects"]:
+            self.stderr.write(f"проектов нет: {report['unknown_projects']}")
+        summary = {k: v for k, v in report.items() if k not in ("errors", "unknown_projects")}
+        self.stdout.write(self.style.SUCCESS(json.dumps(summary, ensure_ascii=False)))
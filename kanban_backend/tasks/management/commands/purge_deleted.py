@@ -0,0 +1,25 @@
+# tasks/management/commands/purge_deleted.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.deletion import get_config, run_pending
+
+
+class Command(BaseCommand):
+    help = "Дочищает проекты, помеченные удалёнными: задачи, картинки, архив и журналы пачками."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", type=float, nargs="?", const=get_config()["INTERVAL"], default=0,
+                            metavar="SECONDS",
+                            help="не завершаться: опрос очереди каждые SECONDS секунд "
+                                 "(по умолчанию PROJECT_DELETION['INTERVAL'])")
+
+    def handle(self, *args, loop, **options):
+        while True:
+            done = run_pending()
+            if done or not loop:
+                self.stdout.write(self.style.SUCCESS(f"Удалено проектов: {done}"))
+            if not loop:
+                return
+            time.sleep(loop)
@@ -0,0 +1,19 @@
+# tasks/management/commands/reconcile_counters.py
+from django.core.management.base import BaseCommand
+
+from tasks.counters import reconcile
+from tasks.models import Project
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счётчики проектов и чинит расхождения."
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_ids", nargs="*", type=int, help="только эти проекты (по умолчанию — все)")
+
+    def handle(self, *args, project_ids, **options):
+        projects = Project.objects.all()
+        if project_ids:
+            projects = projects.filter(pk__in=project_ids)
+        fixed = reconcile(projects)
+        self.stdout.write(self.style.SUCCESS(f"Исправлено проектов: {fixed}"))
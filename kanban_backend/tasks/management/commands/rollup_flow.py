@@ -0,0 +1,35 @@
+# tasks/management/commands/rollup_flow.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from tasks.flow import rollup
+
+
+class Command(BaseCommand):
+    help = "Собирает суточные сводки CFD и cycle time из журнала переходов (tasks/flow.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="YYYY-MM-DD: пересчитать с этого дня (по умолчанию — после последней сводки)")
+        parser.add_argument("--until", help="YYYY-MM-DD: по этот день включительно (по умолчанию — вчера)")
+        parser.add_argument("--loop", type=float, default=0, metavar="SECONDS",
+                            help="не завершаться: повторять каждые SECONDS секунд")
+
+    def _date(self, value, name):
+        if value is None:
+            return None
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"--{name}: ожидается дата YYYY-MM-DD")
+        return day
+
+    def handle(self, *args, since, until, loop, **options):
+        since, until = self._date(since, "since"), self._date(until, "until")
+        while True:
+            days = rollup(since=since, until=until)
+            self.stdout.write(self.style.SUCCESS(f"Пересчитано дней: {days}"))
+            if not loop:
+                return
+            since = until = None   # дальше — только новые дни
+            time.sleep(loop)
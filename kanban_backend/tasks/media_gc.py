@@ -0,0 +1,222 @@
+# tasks/media_gc.py
+"""
+Сборщик осиротевших картинок в MEDIA_ROOT/tasks/.
+
+Быстрый путь — post_delete: удалили TaskImage (сам или каскадом от Task/Project)
+или ArchivedTask — файл удаляется после коммита транзакции. Архивирование
+(tasks/archive.py) удаляет строки TaskImage, но файлы остаются за
+ArchivedTask.images — там хук выключен через keep_files().
+
+Страховка — collect() (manage.py gc_media --loop): файлы, мимо которых прошёл
+хук (падение процесса между коммитом и удалением, старые данные, bulk-удаления).
+Листинг каталога сортируется и сливается merge-join'ом с потоком имён из
+TaskImage всех шардов — keyset-пачки по CHUNK в бинарном порядке (Collate),
+совпадающем с порядком строк в Python, так что ссылки целиком в память не
+грузятся. Кандидаты (нет в TaskImage и старше GRACE_HOURS — файл мог
+записаться раньше своей строки) пачками сверяются с ArchivedTask.images:
+там JSON, индекса по именам нет, поэтому архив читается один раз на пачку
+кандидатов, а не на каждый файл.
+
+Сироту переносим в QUARANTINE_DIR (через QUARANTINE_DAYS удаляется) или сразу
+удаляем, если каталог карантина пустой. Отчёт — число файлов и байт.
+"""
+import heapq
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models.functions import Collate
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import sharding
+from .models import ArchivedTask, TaskImage
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "PREFIX": "tasks/",
+    "GRACE_HOURS": 24,
+    "QUARANTINE_DIR": "quarantine/",
+    "QUARANTINE_DAYS": 7,
+    "CHUNK": 1000,
+    "INTERVAL": 86400,
+}
+
+BINARY_COLLATIONS = {"postgresql": "C", "sqlite": "BINARY", "mysql": "utf8mb4_bin"}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "MEDIA_GC", {})}
+
+
+# ---- Быстрый путь: post_delete ----
+_keep_files = ContextVar("media_gc_keep_files", default=False)
+
+
+@contextmanager
+def keep_files():
+    """Удалять строки, не трогая файлы (на них ссылается кто-то ещё)."""
+    token = _keep_files.set(True)
+    try:
+        yield
+    finally:
+        _keep_files.reset(token)
+
+
+def _delete_files(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            # не страшно: останется сиротой и его подберёт collect()
+            logger.warning("media_gc: не удалось удалить %s", name, exc_info=True)
+
+
+def delete_after_commit(names, using):
+    names = [name for name in names if name]
+    if names and not _keep_files.get():
+        transaction.on_commit(lambda: _delete_files(names), using=using)
+
+
+@receiver(post_delete, sender=TaskImage)
+def _task_image_deleted(sender, instance, using, **kwargs):
+    delete_after_commit([instance.image.name], using)
+
+
+@receiver(post_delete, sender=ArchivedTask)
+def _archived_task_deleted(sender, instance, using, **kwargs):
+    delete_after_commit([item.get("image") for item in instance.images], using)
+
+
+# ---- Сборщик ----
+def _referenced(alias, prefix, chunk):
+    """Имена файлов TaskImage на шарде по возрастанию, пачками по chunk (keyset)."""
+    collation = BINARY_COLLATIONS.get(connections[alias].vendor)
+    qs = TaskImage.objects.using(alias).filter(image__startswith=prefix)
+    if collation:
+        qs = qs.annotate(name=Collate("image", collation))
+        key = "name"
+    else:
+        key = "image"
+    last = None
+    while True:
+        page = qs if last is None else qs.filter(**{f"{key}__gt": last})
+        names = list(page.order_by(key).values_list(key, flat=True)[:chunk])
+        yield from names
+        if len(names) < chunk:
+            return
+        last = names[-1]
+
+
+def _listing(storage, prefix):
+    """Файлы каталога prefix (без подкаталогов), отсортированные, с полным именем."""
+    try:
+        _dirs, files = storage.listdir(prefix)
+    except FileNotFoundError:
+        return []
+    return sorted(prefix + name for name in files)
+
+
+def _orphan_candidates(listing, prefix, chunk):
+    """merge-join отсортированного листинга с потоком ссылок: имена без строки TaskImage."""
+    refs = heapq.merge(*(_referenced(alias, prefix, chunk) for alias in sharding.shards()))
+    ref = next(refs, None)
+    for name in listing:
+        while ref is not None and ref < name:
+            ref = next(refs, None)
+        if ref != name:
+            yield name
+
+
+def _archived_names(names):
+    """Какие из names упомянуты в ArchivedTask.images (один проход по архиву)."""
+    wanted, found = set(names), set()
+    rows = ArchivedTask.objects.exclude(images=[]).values_list("images", flat=True)
+    for images in rows.iterator(chunk_size=2000):
+        for item in images:
+            if item.get("image") in wanted:
+                found.add(item["image"])
+    return found
+
+
+def _quarantine(storage, name, target):
+    if hasattr(storage, "path"):
+        path = storage.path(target)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(storage.path(name), path)
+        os.utime(path)   # срок карантина — с момента переноса
+    else:
+        with storage.open(name) as f:
+            storage.save(target, f)
+        storage.delete(name)
+
+
+def _purge_quarantine(storage, config, now, dry_run):
+    root = config["QUARANTINE_DIR"]
+    deadline = now - timedelta(days=config["QUARANTINE_DAYS"])
+    files = purged = 0
+    for name in _listing(storage, root + config["PREFIX"]):
+        if storage.get_modified_time(name) >= deadline:
+            continue
+        files += 1
+        purged += storage.size(name)
+        if not dry_run:
+            storage.delete(name)
+    return files, purged
+
+
+def collect(grace_hours=None, quarantine=None, dry_run=False, storage=None):
+    """
+    Один проход. Возвращает отчёт:
+    {"scanned", "orphans", "orphan_bytes", "skipped_recent", "purged", "purged_bytes"}.
+    quarantine=False — удалять сразу, иначе переносить в QUARANTINE_DIR.
+    """
+    config = get_config()
+    storage = storage or default_storage
+    prefix, chunk = config["PREFIX"], config["CHUNK"]
+    grace_hours = config["GRACE_HOURS"] if grace_hours is None else grace_hours
+    if quarantine is None:
+        quarantine = bool(config["QUARANTINE_DIR"])
+    now = timezone.now()
+    cutoff = now - timedelta(hours=grace_hours)
+
+    listing = _listing(storage, prefix)
+    report = {"scanned": len(listing), "orphans": 0, "orphan_bytes": 0,
+              "skipped_recent": 0, "purged": 0, "purged_bytes": 0}
+
+    def flush(batch):
+        archived = _archived_names(batch)
+        for name in [n for n in batch if n not in archived]:
+            size = storage.size(name)
+            report["orphans"] += 1
+            report["orphan_bytes"] += size
+            if dry_run:
+                continue
+            if quarantine:
+                _quarantine(storage, name, config["QUARANTINE_DIR"] + name)
+            else:
+                storage.delete(name)
+
+    batch = []
+    for name in _orphan_candidates(listing, prefix, chunk):
+        if storage.get_modified_time(name) > cutoff:
+            report["skipped_recent"] += 1
+            continue
+        batch.append(name)
+        if len(batch) >= chunk:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    if config["QUARANTINE_DIR"]:
+        report["purged"], report["purged_bytes"] = _purge_quarantine(storage, config, now, dry_run)
+    logger.info("media_gc: %s", report)
+    return report
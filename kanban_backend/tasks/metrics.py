@@ -0,0 +1,272 @@
+# tasks/metrics.py
+"""
+Пер-запросная инструментовка производительности.
+
+* PerformanceMetricsMiddleware — меряет весь запрос, число/время SQL-запросов
+  и размер ответа, пишет заголовок Server-Timing и копит гистограммы по маршрутам;
+* TimedSerializerMixin — время сериализации DRF (учитывается только верхний
+  уровень .data, вложенные сериализаторы входят в него); TimedListSerializer
+  живёт в tasks/serializers.py — модуль грузится из AppConfig.ready и не должен
+  тянуть за собой DRF;
+* metrics_view — /api/_metrics в текстовом формате Prometheus.
+
+Настройки (settings.PERF_METRICS):
+    ENABLED        — выключатель целиком;
+    SAMPLE_RATE    — доля инструментируемых запросов (0..1); для несэмплированных
+                     запросов стоимость — один random() и проверка ContextVar в SQL-обёртке;
+    SERVER_TIMING  — отдавать ли заголовок Server-Timing;
+    SCRAPE_IPS     — с каких адресов /api/_metrics доступен без staff-сессии.
+                     По умолчанию пусто — только staff. Адрес берётся из REMOTE_ADDR:
+                     за обратным прокси на той же машине это 127.0.0.1 у всех клиентов,
+                     поэтому открывайте сборщику только адрес, который прокси не
+                     проксирует (отдельный порт/интерфейс Prometheus), например
+                     "SCRAPE_IPS": ("10.0.5.12",).
+
+Метрики живут в памяти процесса: при нескольких воркерах Prometheus
+собирает каждый воркер отдельно (или агрегирует по instance).
+"""
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+DEFAULTS = {
+    "ENABLED": True,
+    "SAMPLE_RATE": 1.0,
+    "SERVER_TIMING": True,
+    "SCRAPE_IPS": (),
+}
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 500_000, 1_000_000, 5_000_000, 20_000_000)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "PERF_METRICS", {})}
+
+
+class RequestTimings:
+    __slots__ = ("db_count", "db_time", "serialize_time")
+
+    def __init__(self):
+        self.db_count = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+
+
+_current = ContextVar("request_timings", default=None)
+
+
+# ---- SQL ----
+def db_execute_wrapper(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_count += 1
+        timings.db_time += time.perf_counter() - started
+
+
+def install_db_wrapper(sender, connection, **kwargs):
+    """
+    Обработчик connection_created: обёртка висит на соединении постоянно,
+    а данные пишет только когда в текущем контексте есть RequestTimings.
+    Так она одинаково работает и для sync-вьюх, и для async ORM
+    (ContextVar переезжает в поток вместе с sync_to_async).
+    """
+    if db_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_execute_wrapper)
+
+
+# ---- Сериализация ----
+class TimedSerializerMixin:
+    @property
+    def data(self):
+        timings = _current.get()
+        if timings is None:
+            return super().data
+        started = time.perf_counter()
+        db_before = timings.db_time
+        try:
+            return super().data
+        finally:
+            # ленивые SQL-запросы из сериализаторов уже учтены в db — не считаем их дважды
+            elapsed = time.perf_counter() - started - (timings.db_time - db_before)
+            timings.serialize_time += max(elapsed, 0.0)
+
+
+# ---- Агрегация ----
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class _RouteStats:
+    __slots__ = ("duration", "queries", "size", "db_seconds", "serialize_seconds", "statuses")
+
+    def __init__(self):
+        self.duration = _Histogram(DURATION_BUCKETS)
+        self.queries = _Histogram(QUERY_BUCKETS)
+        self.size = _Histogram(SIZE_BUCKETS)
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.statuses = {}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route, method, status, duration, timings, size):
+        with self._lock:
+            stats = self._routes.get((route, method))
+            if stats is None:
+                stats = self._routes[(route, method)] = _RouteStats()
+            stats.duration.observe(duration)
+            stats.queries.observe(timings.db_count)
+            stats.size.observe(size)
+            stats.db_seconds += timings.db_time
+            stats.serialize_seconds += timings.serialize_time
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self, sample_rate):
+        out = [
+            "# HELP kanban_metrics_sample_rate Fraction of requests that are instrumented.",
+            "# TYPE kanban_metrics_sample_rate gauge",
+            f"kanban_metrics_sample_rate {sample_rate}",
+        ]
+        with self._lock:
+            items = sorted(self._routes.items())
+            out += ["# HELP kanban_requests_total Sampled requests by route, method and status.",
+                    "# TYPE kanban_requests_total counter"]
+            for (route, method), s in items:
+                for status, n in sorted(s.statuses.items()):
+                    out.append(f'kanban_requests_total{{route="{route}",method="{method}",status="{status}"}} {n}')
+            for name, attr, help_text in (
+                ("kanban_request_duration_seconds", "duration", "Wall time of the request."),
+                ("kanban_request_db_queries", "queries", "SQL queries per request."),
+                ("kanban_response_size_bytes", "size", "Response body size."),
+            ):
+                out += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (route, method), s in items:
+                    out.extend(getattr(s, attr).lines(name, f'route="{route}",method="{method}"'))
+            for name, attr, help_text in (
+                ("kanban_request_db_seconds_total", "db_seconds", "Time spent in SQL."),
+                ("kanban_request_serialize_seconds_total", "serialize_seconds", "Time spent in DRF serializers."),
+            ):
+                out += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (route, method), s in items:
+                    out.append(f'{name}{{route="{route}",method="{method}"}} {getattr(s, attr)}')
+        return "\n".join(out) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# ---- Middleware ----
+class PerformanceMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = get_config()
+        self.enabled = self.config["ENABLED"] and self.config["SAMPLE_RATE"] > 0
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        rate = self.config["SAMPLE_RATE"]
+        return self.enabled and (rate >= 1 or random.random() < rate)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - started)
+
+    def _finish(self, request, response, timings, duration):
+        match = getattr(request, "resolver_match", None)
+        route = match.view_name if match else "unmatched"
+        if route == "metrics":
+            return response
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(route, request.method, response.status_code, duration, timings, size)
+
+        if self.config["SERVER_TIMING"]:
+            db_ms = timings.db_time * 1000
+            ser_ms = timings.serialize_time * 1000
+            total_ms = duration * 1000
+            response["Server-Timing"] = ", ".join((
+                f'db;dur={db_ms:.2f};desc="{timings.db_count} queries"',
+                f"ser;dur={ser_ms:.2f}",
+                f"app;dur={max(total_ms - db_ms - ser_ms, 0):.2f}",
+                f"total;dur={total_ms:.2f}",
+            ))
+        return response
+
+
+# ---- /api/_metrics ----
+def metrics_view(request):
+    config = get_config()
+    user = getattr(request, "user", None)
+    is_staff = bool(user and user.is_authenticated and user.is_staff)
+    if not (is_staff or request.META.get("REMOTE_ADDR") in config["SCRAPE_IPS"]):
+        return HttpResponseForbidden("forbidden\n", content_type="text/plain")
+    rate = config["SAMPLE_RATE"] if config["ENABLED"] else 0
+    return HttpResponse(registry.render(rate), content_type="text/plain; version=0.0.4; charset=utf-8")
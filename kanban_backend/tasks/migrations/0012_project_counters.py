@@ -0,0 +1,72 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:02
+
+from django.db import migrations, models
+from django.db.models import Count, F, Q
+
+
+def backfill_counters(apps, schema_editor):
+    Project = apps.get_model("tasks", "Project")
+    Task = apps.get_model("tasks", "Task")
+    Membership = Project.participants.through
+
+    columns = ("new", "in_progress", "testing", "review", "done")
+    per_project = (
+        Task.objects.filter(project__isnull=False)
+        .values("project_id")
+        .annotate(
+            tasks_done_late=Count(
+                "id", filter=Q(column="done", completed_at__gt=F("due_date"))
+            ),
+            **{f"tasks_{c}": Count("id", filter=Q(column=c)) for c in columns},
+        )
+    )
+    for row in per_project:
+        Project.objects.filter(pk=row.pop("project_id")).update(**row)
+    for row in Membership.objects.values("project_id").annotate(n=Count("id")):
+        Project.objects.filter(pk=row["project_id"]).update(participants_count=row["n"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0011_task_completed_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="participants_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="tasks_done",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="tasks_done_late",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="tasks_in_progress",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="tasks_new",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="tasks_review",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="tasks_testing",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0012_project_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="userprofile",
+            name="display_name",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                max_length=255,
+                verbose_name="Отображаемое имя",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(fields=["title"], name="tasks_proj_title_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(fields=["title"], name="tasks_task_title_idx"),
+        ),
+    ]
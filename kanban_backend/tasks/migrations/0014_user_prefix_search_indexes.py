@@ -0,0 +1,43 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:20
+
+from django.db import migrations
+
+# Префиксный поиск без учёта регистра (username__istartswith / display_name__istartswith):
+# PostgreSQL строит UPPER(col) LIKE UPPER('q%') — нужен функциональный индекс с pattern_ops;
+# SQLite сравнивает LIKE без учёта регистра — нужен индекс с COLLATE NOCASE.
+INDEXES = {
+    "postgresql": [
+        "CREATE INDEX IF NOT EXISTS auth_user_username_upper_like ON auth_user (UPPER(username) varchar_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS tasks_profile_dname_upper_like ON tasks_userprofile (UPPER(display_name) varchar_pattern_ops)",
+    ],
+    "sqlite": [
+        "CREATE INDEX IF NOT EXISTS auth_user_username_nocase ON auth_user (username COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS tasks_profile_dname_nocase ON tasks_userprofile (display_name COLLATE NOCASE)",
+    ],
+}
+DROP = {
+    "postgresql": ["auth_user_username_upper_like", "tasks_profile_dname_upper_like"],
+    "sqlite": ["auth_user_username_nocase", "tasks_profile_dname_nocase"],
+}
+
+
+def create_indexes(apps, schema_editor):
+    for sql in INDEXES.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_indexes(apps, schema_editor):
+    for name in DROP.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0013_admin_search_indexes"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
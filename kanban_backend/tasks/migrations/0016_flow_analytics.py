@@ -0,0 +1,133 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0015_archived_task"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CycleTimeDay",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("throughput", models.PositiveIntegerField(default=0)),
+                ("cycle_p50", models.FloatField(null=True)),
+                ("cycle_p85", models.FloatField(null=True)),
+                ("cycle_p95", models.FloatField(null=True)),
+                ("lead_p50", models.FloatField(null=True)),
+                ("lead_p85", models.FloatField(null=True)),
+                ("lead_p95", models.FloatField(null=True)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cycle_time_days",
+                        to="tasks.project",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("project", "day"), name="unique_cycle_time_day"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="FlowDay",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "column",
+                    models.CharField(
+                        choices=[
+                            ("new", "Новые"),
+                            ("in_progress", "Выполняются"),
+                            ("testing", "Тестирование"),
+                            ("review", "Правки"),
+                            ("done", "Выполнено"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+                ("entered", models.PositiveIntegerField(default=0)),
+                ("exited", models.PositiveIntegerField(default=0)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="flow_days",
+                        to="tasks.project",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("project", "day", "column"), name="unique_flow_day"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="TaskTransition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("task_id", models.BigIntegerField()),
+                (
+                    "from_column",
+                    models.CharField(blank=True, default="", max_length=20),
+                ),
+                ("to_column", models.CharField(blank=True, default="", max_length=20)),
+                ("at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transitions",
+                        to="tasks.project",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["at"], name="tasks_trans_at_idx"),
+                    models.Index(fields=["task_id", "at"], name="tasks_trans_task_idx"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0016_flow_analytics"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeadlineNotice",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "target",
+                    models.CharField(
+                        choices=[("task", "Задача"), ("project", "Проект")],
+                        max_length=10,
+                    ),
+                ),
+                ("object_id", models.BigIntegerField()),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("due_soon", "Скоро срок"), ("overdue", "Просрочено")],
+                        max_length=10,
+                    ),
+                ),
+                ("due_date", models.DateField(db_index=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="NotificationDigest",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("items", models.JSONField(default=list)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("delivered_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["-id"],
+            },
+        ),
+        migrations.AlterField(
+            model_name="project",
+            name="due_date",
+            field=models.DateField(
+                blank=True, db_index=True, null=True, verbose_name="Срок сдачи"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("column", "done"), _negated=True),
+                fields=["due_date"],
+                name="tasks_task_due_open_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="deadlinenotice",
+            constraint=models.UniqueConstraint(
+                fields=("target", "object_id", "kind", "due_date"),
+                name="unique_deadline_notice",
+            ),
+        ),
+        migrations.AddField(
+            model_name="notificationdigest",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="digests",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notificationdigest",
+            index=models.Index(fields=["user", "-id"], name="tasks_digest_user_idx"),
+        ),
+    ]
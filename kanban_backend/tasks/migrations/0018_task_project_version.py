@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0017_deadline_digests"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0018_task_project_version"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="shard",
+            field=models.CharField(
+                db_index=True, default="default", editable=False, max_length=64
+            ),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="shard_frozen",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AlterField(
+            model_name="task",
+            name="project",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="tasks",
+                to="tasks.project",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="task",
+            name="responsible",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="tasks",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
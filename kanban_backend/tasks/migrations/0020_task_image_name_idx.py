@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0019_project_shards"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="taskimage",
+            index=models.Index(fields=["image"], name="tasks_image_name_idx"),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0022_task_subtasks"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["project", "due_date"], name="tasks_task_proj_due_idx"
+            ),
+        ),
+    ]
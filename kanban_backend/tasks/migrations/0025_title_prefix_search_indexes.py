@@ -0,0 +1,58 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:49
+
+from django.db import migrations, models
+
+# Поиск ^title в админке — title__istartswith, как и для username/display_name в 0014:
+# обычные B-tree индексы из 0013 такой LIKE не обслуживают (SCAN), поэтому они
+# удаляются, а вместо них строятся функциональный (PostgreSQL) / NOCASE (SQLite).
+INDEXES = {
+    "postgresql": [
+        "CREATE INDEX IF NOT EXISTS tasks_proj_title_upper_like ON tasks_project (UPPER(title) varchar_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS tasks_task_title_upper_like ON tasks_task (UPPER(title) varchar_pattern_ops)",
+    ],
+    "sqlite": [
+        "CREATE INDEX IF NOT EXISTS tasks_proj_title_nocase ON tasks_project (title COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS tasks_task_title_nocase ON tasks_task (title COLLATE NOCASE)",
+    ],
+}
+DROP = {
+    "postgresql": ["tasks_proj_title_upper_like", "tasks_task_title_upper_like"],
+    "sqlite": ["tasks_proj_title_nocase", "tasks_task_title_nocase"],
+}
+
+
+def create_indexes(apps, schema_editor):
+    for sql in INDEXES.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_indexes(apps, schema_editor):
+    for name in DROP.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0024_task_mine_idx"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="project",
+            name="tasks_proj_title_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="task",
+            name="tasks_task_title_idx",
+        ),
+        # display_name ищется через tasks_profile_dname_* из 0014
+        migrations.AlterField(
+            model_name="userprofile",
+            name="display_name",
+            field=models.CharField(
+                blank=True, default="", max_length=255, verbose_name="Отображаемое имя"
+            ),
+        ),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0025_title_prefix_search_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShardSequence",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("value", models.BigIntegerField()),
+            ],
+        ),
+    ]
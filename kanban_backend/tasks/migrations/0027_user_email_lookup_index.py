@@ -0,0 +1,40 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:40
+
+from django.db import migrations
+
+# Точный поиск пользователя по email без учёта регистра (email__iexact, /api/users/?exact=):
+# PostgreSQL сравнивает UPPER(email) = UPPER('q'), SQLite — LIKE без шаблона (NOCASE).
+INDEXES = {
+    "postgresql": [
+        "CREATE INDEX IF NOT EXISTS auth_user_email_upper_like ON auth_user (UPPER(email) varchar_pattern_ops)",
+    ],
+    "sqlite": [
+        "CREATE INDEX IF NOT EXISTS auth_user_email_nocase ON auth_user (email COLLATE NOCASE)",
+    ],
+}
+DROP = {
+    "postgresql": ["auth_user_email_upper_like"],
+    "sqlite": ["auth_user_email_nocase"],
+}
+
+
+def create_indexes(apps, schema_editor):
+    for sql in INDEXES.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_indexes(apps, schema_editor):
+    for name in DROP.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0026_shardsequence"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -1,11 +1,19 @@
 # tasks/models.py
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
+class ActiveProjectManager(models.Manager):
+    """Проекты без пометки удаления: удалённые скрыты отовсюду, пока их дочищает tasks/deletion.py."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Project(models.Model):
     title = models.CharField("Название проекта", max_length=255)
     description = models.TextField("Описание", blank=True, default="")
-    due_date = models.DateField("Срок сдачи", null=True, blank=True)  # ← дедлайн
+    due_date = models.DateField("Срок сдачи", null=True, blank=True, db_index=True)  # ← дедлайн
     participants = models.ManyToManyField(                       # ← участники проекта
         User,
         blank=True,
@@ -14,6 +22,27 @@ class Project(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1, editable=False)  # ETag / If-Match (tasks/concurrency.py)
+
+    # Шард с задачами и картинками проекта (tasks/sharding.py); сама строка проекта — в default
+    shard = models.CharField(max_length=64, default="default", editable=False, db_index=True)
+    shard_frozen = models.BooleanField(default=False, editable=False)  # идёт move_project: запись задач закрыта
+    # Помечен удалённым; задачи и прочее удаляет фоновая очистка (tasks/deletion.py)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+
+    # Денормализованные счётчики (см. tasks/counters.py): поддерживаются на запись
+    # через F()-апдейты, чинятся командой reconcile_counters
+    tasks_new = models.PositiveIntegerField(default=0, editable=False)
+    tasks_in_progress = models.PositiveIntegerField(default=0, editable=False)
+    tasks_testing = models.PositiveIntegerField(default=0, editable=False)
+    tasks_review = models.PositiveIntegerField(default=0, editable=False)
+    tasks_done = models.PositiveIntegerField(default=0, editable=False)
+    tasks_done_late = models.PositiveIntegerField(default=0, editable=False)   # выполнено позже due_date
+    tasks_archived = models.PositiveIntegerField(default=0, editable=False)    # ушло в ArchivedTask
+    participants_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ActiveProjectManager()
+    all_objects = models.Manager()   # включая помеченные удалёнными
 
     class Meta:
         ordering = ["-id"]
@@ -53,15 +82,20 @@ class Task(models.Model):
         ('critical', 'Критичный'),
     ]
 
-    # Привязка к проекту
-    project = models.ForeignKey(Project, related_name="tasks", on_delete=models.CASCADE, null=True, blank=True)
+    # Привязка к проекту. Задачи могут жить в другой базе (шарде), чем проект и пользователи,
+    # поэтому FK без ограничения в БД — каскады и так делает Django (и tasks/sharding.py)
+    project = models.ForeignKey(Project, related_name="tasks", on_delete=models.CASCADE, null=True, blank=True,
+                                db_constraint=False)
 
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     column = models.CharField(max_length=20, choices=COLUMN_CHOICES, default='new')
     position = models.PositiveIntegerField(default=0)
 
-    responsible = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tasks')
+    responsible = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tasks',
+                                    db_constraint=False)
+    # Подзадачи: родитель — из того же проекта; все уровни — в TaskClosure (tasks/subtasks.py)
+    parent = models.ForeignKey("self", on_delete=models.SET_NULL, null=True, blank=True, related_name="children")
 
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='medium')
     due_date = models.DateField(null=True, blank=True)
@@ -69,9 +103,22 @@ class Task(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1, editable=False)  # ETag / If-Match (tasks/concurrency.py)
 
     class Meta:
         ordering = ['position']
+        indexes = [
+            # сканер дедлайнов (tasks/deadlines.py): диапазон по due_date среди открытых задач
+            models.Index(fields=["due_date"], name="tasks_task_due_open_idx",
+                         condition=~models.Q(column="done")),
+            # календарь (tasks/calendar.py): диапазон по due_date внутри каждого проекта пользователя
+            models.Index(fields=["project", "due_date"], name="tasks_task_proj_due_idx"),
+            # «мои задачи» (tasks/my_tasks.py): по колонкам, внутри — по сроку
+            models.Index(fields=["responsible", "column", "due_date"], name="tasks_task_mine_idx"),
+        ]
+
+    def __str__(self):
+        return self.title
 
 class TaskImage(models.Model):
     task = models.ForeignKey(Task, related_name="images", on_delete=models.CASCADE)
@@ -83,3 +130,161 @@ class TaskImage(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["task", "position"], name="unique_task_position"),
         ]
+        # сборщик сирот (tasks/media_gc.py) читает имена файлов по порядку
+        indexes = [models.Index(fields=["image"], name="tasks_image_name_idx")]
+
+
+class TaskClosure(models.Model):
+    """
+    Closure-таблица иерархии задач: строка на каждую пару (предок, потомок)
+    на любой глубине, без пар задачи с самой собой. Живёт на шарде проекта.
+    """
+    ancestor = models.ForeignKey(Task, related_name="descendant_links", on_delete=models.CASCADE)
+    descendant = models.ForeignKey(Task, related_name="ancestor_links", on_delete=models.CASCADE)
+    depth = models.PositiveSmallIntegerField()   # 1 — прямой потомок
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["ancestor", "descendant"], name="unique_task_closure"),
+        ]
+        indexes = [models.Index(fields=["descendant", "depth"], name="tasks_closure_desc_idx")]
+
+
+class ShardSequence(models.Model):
+    """
+    Последний выданный id блока шарда для таблицы (tasks/sharding.py). Нужен
+    только на SQLite: её автоинкремент после переноса проекта уходит в чужой блок.
+    """
+    name = models.CharField(max_length=64, primary_key=True)   # db_table
+    value = models.BigIntegerField()
+
+
+# ==== Архив выполненных задач (см. tasks/archive.py) ====
+class ArchivedTask(models.Model):
+    """
+    Холодная копия задачи из колонки done. Картинки переезжают списком
+    [{"image": <имя файла>, "position": n}] — файлы на диске остаются на месте.
+    """
+    original_id = models.BigIntegerField(unique=True)
+    project = models.ForeignKey(Project, related_name="archived_tasks", on_delete=models.CASCADE, null=True, blank=True)
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    priority = models.CharField(max_length=10, choices=Task.PRIORITY_CHOICES, default='medium')
+    responsible = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_tasks')
+    due_date = models.DateField(null=True, blank=True)
+    completed_at = models.DateField(null=True, blank=True)
+    images = models.JSONField(default=list, blank=True)
+
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-original_id"]
+        indexes = [models.Index(fields=["project", "-original_id"], name="tasks_archive_project_idx")]
+
+    def __str__(self):
+        return self.title
+
+
+# ==== Журнал переходов между колонками и суточные сводки (см. tasks/flow.py) ====
+class TaskTransition(models.Model):
+    """
+    Append-only: одна строка на смену колонки. from_column="" — задача появилась
+    в проекте, to_column="" — ушла из него (удалена или перенесена в другой).
+    task_id без FK: журнал переживает удаление и архивирование задачи.
+    """
+    project = models.ForeignKey(Project, related_name="transitions", on_delete=models.CASCADE)
+    task_id = models.BigIntegerField()
+    from_column = models.CharField(max_length=20, blank=True, default="")
+    to_column = models.CharField(max_length=20, blank=True, default="")
+    at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["at"], name="tasks_trans_at_idx"),
+            models.Index(fields=["task_id", "at"], name="tasks_trans_task_idx"),
+        ]
+
+
+class FlowDay(models.Model):
+    """Сколько задач стояло в колонке на конец дня и сколько вошло/вышло за день."""
+    project = models.ForeignKey(Project, related_name="flow_days", on_delete=models.CASCADE)
+    day = models.DateField()
+    column = models.CharField(max_length=20, choices=Task.COLUMN_CHOICES)
+    count = models.IntegerField(default=0)
+    entered = models.PositiveIntegerField(default=0)
+    exited = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["project", "day", "column"], name="unique_flow_day")]
+
+
+class CycleTimeDay(models.Model):
+    """Пропускная способность и перцентили cycle/lead time (часы) по задачам, закрытым за день."""
+    project = models.ForeignKey(Project, related_name="cycle_time_days", on_delete=models.CASCADE)
+    day = models.DateField()
+    throughput = models.PositiveIntegerField(default=0)
+    cycle_p50 = models.FloatField(null=True)
+    cycle_p85 = models.FloatField(null=True)
+    cycle_p95 = models.FloatField(null=True)
+    lead_p50 = models.FloatField(null=True)
+    lead_p85 = models.FloatField(null=True)
+    lead_p95 = models.FloatField(null=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["project", "day"], name="unique_cycle_time_day")]
+
+
+# ==== Напоминания о дедлайнах (см. tasks/deadlines.py) ====
+class DeadlineNotice(models.Model):
+    """Что уже попало в дайджест: повторный прогон сканера не дублирует напоминания."""
+    TARGET_CHOICES = [("task", "Задача"), ("project", "Проект")]
+    KIND_CHOICES = [("due_soon", "Скоро срок"), ("overdue", "Просрочено")]
+
+    target = models.CharField(max_length=10, choices=TARGET_CHOICES)
+    object_id = models.BigIntegerField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    due_date = models.DateField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["target", "object_id", "kind", "due_date"], name="unique_deadline_notice"),
+        ]
+
+
+class NotificationDigest(models.Model):
+    """Пачка напоминаний для одного пользователя за один прогон сканера."""
+    user = models.ForeignKey(User, related_name="digests", on_delete=models.CASCADE)
+    items = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [models.Index(fields=["user", "-id"], name="tasks_digest_user_idx")]
+
+
+
+# ==== Фоновое удаление проектов (см. tasks/deletion.py) ====
+class DeletionJob(models.Model):
+    """
+    Очистка проекта, помеченного удалённым. project_id без FK: строка проекта
+    удаляется последним шагом, а запись о задании остаётся для истории и прогресса.
+    """
+    STATUS_CHOICES = [("pending", "В очереди"), ("running", "Выполняется"), ("done", "Готово")]
+
+    project_id = models.BigIntegerField(db_index=True)
+    title = models.CharField(max_length=255)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name="deletion_jobs")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    total = models.PositiveIntegerField(default=0)     # задач (живых и в архиве) на момент удаления
+    purged = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)   # пульс воркера, ставится явно
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [models.Index(fields=["status", "updated_at"], name="tasks_deletion_queue_idx")]
@@ -0,0 +1,114 @@
+# tasks/my_tasks.py
+"""
+«Мои задачи»: GET /api/tasks/mine/ — открытые задачи пользователя во всех его
+проектах, по колонкам, внутри колонки по due_date (без срока — в конце), затем id.
+
+Первая страница — один запрос на шард для всех колонок сразу: оконные
+ROW_NUMBER/COUNT с PARTITION BY column по индексу tasks_task_mine_idx
+(responsible, column, due_date) дают первые limit задач и размер каждой
+колонки. Дальше колонка листается отдельно (?column=&cursor=) keyset-запросом
+«после (due_date, id)» с LIMIT — тоже по индексу, без OFFSET.
+
+Курсор — "<due_date>.<id>" последней отданной задачи ("" вместо даты — без срока).
+При шардировании запрос уходит на шарды с проектами пользователя параллельно
+(sharding.fan_out), каждый шард — только по своим проектам; результаты сливаются.
+"""
+from datetime import date
+
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils.dateparse import parse_date
+
+from . import auth_cache, sharding
+from .models import Task
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+OPEN_COLUMNS = [c for c, _ in Task.COLUMN_CHOICES if c != "done"]
+ORDERING = (F("due_date").asc(nulls_last=True), F("id").asc())
+
+
+def _key(task):
+    return task.due_date is None, task.due_date or date.min, task.pk
+
+
+def encode_cursor(task):
+    return f"{task.due_date.isoformat() if task.due_date else ''}.{task.pk}"
+
+
+def decode_cursor(value):
+    """(due_date | None, id) или ValueError."""
+    due, _, pk = value.rpartition(".")
+    day = parse_date(due) if due else None
+    if due and day is None:
+        raise ValueError(value)
+    return day, int(pk)
+
+
+def _by_shard(user):
+    """{шард: [id проектов пользователя на нём]}; пусто — проектов нет."""
+    project_ids = auth_cache.member_project_ids(user)
+    if not project_ids:
+        return {}
+    if not sharding.is_sharded():
+        return {sharding.shards()[0]: list(project_ids)}
+    return sharding.group_by_shard(project_ids)
+
+
+def _base(user, project_ids):
+    return sharding.join(
+        Task.objects.filter(responsible_id=user.pk, project_id__in=project_ids), "project"
+    )
+
+
+def first_pages(user, limit):
+    """{column: (всего в колонке, [задачи], есть ли ещё)} по всем открытым колонкам."""
+    groups = _by_shard(user)
+
+    def shard_rows(alias):
+        return list(
+            _base(user, groups[alias])
+            .filter(column__in=OPEN_COLUMNS)
+            .annotate(row=Window(RowNumber(), partition_by=F("column"), order_by=ORDERING),
+                      column_total=Window(Count("id"), partition_by=F("column")))
+            .filter(row__lte=limit + 1)
+            .order_by()
+        )
+
+    per_column = {column: [0, []] for column in OPEN_COLUMNS}
+    if groups:
+        for rows in sharding.fan_out(shard_rows, aliases=groups).values():
+            totals = {}
+            for task in rows:
+                per_column[task.column][1].append(task)
+                totals[task.column] = task.column_total
+            for column, total in totals.items():
+                per_column[column][0] += total
+    result = {}
+    for column, (total, tasks) in per_column.items():
+        tasks.sort(key=_key)
+        result[column] = (total, tasks[:limit], len(tasks) > limit)
+    return result
+
+
+def column_page(user, column, cursor, limit):
+    """([задачи колонки после cursor], есть ли ещё); cursor None — с начала колонки."""
+    groups = _by_shard(user)
+    due, pk = cursor or (None, None)
+    if cursor is None:
+        after = Q()
+    elif due is None:
+        after = Q(due_date__isnull=True, pk__gt=pk)
+    else:
+        after = Q(due_date__gt=due) | Q(due_date=due, pk__gt=pk) | Q(due_date__isnull=True)
+
+    def shard_rows(alias):
+        return list(_base(user, groups[alias]).filter(after, column=column).order_by(*ORDERING)[:limit + 1])
+
+    tasks = []
+    if groups:
+        for rows in sharding.fan_out(shard_rows, aliases=groups).values():
+            tasks.extend(rows)
+    tasks.sort(key=_key)
+    return tasks[:limit], len(tasks) > limit
@@ -0,0 +1,18 @@
+# tasks/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class UserDirectoryPagination(CursorPagination):
+    """Keyset-пагинация справочника пользователей по уникальному username."""
+    ordering = ("username",)
+    page_size = 20
+    page_size_query_param = "limit"
+    max_page_size = 100
+
+
+class ArchivePagination(CursorPagination):
+    """Архив задач: новые (по исходному id) сверху; индекс (project, -original_id)."""
+    ordering = ("-original_id",)
+    page_size = 50
+    page_size_query_param = "limit"
+    max_page_size = 200
@@ -0,0 +1,62 @@
+# tasks/participants.py
+"""
+Изменение состава проекта дельтой: POST /api/projects/<id>/participants/
+{"add": [id, ...], "remove": [id, ...]} вместо пересылки всего списка
+participants_ids (тот проверяет каждый id отдельным запросом и сравнивает
+связь целиком через .set()).
+
+Число запросов не зависит от размера дельты и проекта:
+    UPDATE версии проекта (с If-Match — условный, tasks/concurrency.py; строка
+        проекта заодно блокируется до конца транзакции — параллельные дельты
+        одного проекта идут по очереди);
+    SELECT пользователей дельты одним IN — несуществующие id -> ошибка;
+    SELECT текущих связей среди них одним IN;
+    INSERT новых связей одним bulk_create, DELETE снятых одним запросом;
+    UPDATE participants_count на разницу (не ниже нуля, counters.shifted).
+Связи пишутся мимо менеджера M2M, поэтому m2m_changed не шлётся: то, что
+делают его обработчики (счётчик участников в tasks/counters.py, auth-кэш в
+tasks/auth_cache.py), делаем здесь, и auth-кэш сбрасываем только тем, чьё
+членство действительно изменилось.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from . import auth_cache, counters
+from .concurrency import conditional_update
+from .models import Project
+
+MAX_IDS = 1000   # пользователей в одной дельте
+
+Membership = Project.participants.through
+
+
+class UnknownUsers(ValueError):
+    def __init__(self, ids):
+        super().__init__(ids)
+        self.ids = sorted(ids)
+
+
+def apply_delta(project, add=(), remove=(), expected_version=None):
+    """
+    Добавляет/убирает участников. Возвращает (добавленные id, убранные id) —
+    без тех, кто уже был/не был в проекте. UnknownUsers — если каких-то id нет.
+    """
+    add, remove = set(add), set(remove)
+    with transaction.atomic():
+        conditional_update(project, [], expected_version)
+        known = set(User.objects.filter(pk__in=add | remove).values_list("pk", flat=True))
+        if unknown := (add | remove) - known:
+            raise UnknownUsers(unknown)
+        current = set(Membership.objects.filter(project_id=project.pk, user_id__in=add | remove)
+                      .values_list("user_id", flat=True))
+        added, removed = sorted(add - current), sorted(remove & current)
+        if added:
+            Membership.objects.bulk_create([Membership(project_id=project.pk, user_id=pk) for pk in added])
+        if removed:
+            Membership.objects.filter(project_id=project.pk, user_id__in=removed).delete()
+        if delta := len(added) - len(removed):
+            Project.objects.filter(pk=project.pk).update(
+                participants_count=counters.shifted("participants_count", delta))
+    auth_cache.invalidate(*added, *removed)
+    project.refresh_from_db(fields=["participants_count"])
+    return added, removed
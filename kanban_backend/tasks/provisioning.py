@@ -0,0 +1,223 @@
+# tasks/provisioning.py
+"""
+Массовая загрузка пользователей из выгрузки каталога сотрудников:
+manage.py provision_users FILE и POST /api/users/provision/ (только staff).
+
+Вход — поток строк CSV (заголовок обязателен) или NDJSON (объект на строку):
+    username, email, first_name, last_name, display_name, role, projects
+projects — id проектов (в CSV через ";" или пробел, в NDJSON — список).
+Обновляются только поля из заголовка CSV / ключей первой строки NDJSON,
+остальные у существующих пользователей не трогаются. Членство только
+добавляется: из проектов, которых нет в строке, пользователь не убирается.
+Пароль новым пользователям не задаётся (вход — после сброса пароля).
+
+Строки идут пачками по BATCH_SIZE, каждая пачка — своя транзакция и
+постоянное число запросов, сколько бы в ней ни было пользователей:
+    какие username уже есть; upsert User — bulk_create(update_conflicts=True);
+    id по username; upsert UserProfile так же; существующие связи с проектами;
+    bulk_create новых связей; один UPDATE participants_count/version по
+    всем затронутым проектам (CASE).
+bulk_create не шлёт post_save — ни create_user_profile (профиль на каждую
+строку отдельным INSERT), ни инвалидацию auth-кэша; профили создаются
+пачкой выше, auth-кэш пачки сбрасывается одним delete_many.
+Ошибочные строки пропускаются и попадают в отчёт с номером строки.
+"""
+import codecs
+import csv
+import json
+import re
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from . import auth_cache
+from .models import Project, UserProfile
+
+DEFAULTS = {
+    "BATCH_SIZE": 1000,
+    "MAX_ERRORS": 100,   # ошибок в отчёте, дальше только счётчик
+}
+
+FORMATS = ("csv", "ndjson")
+USER_FIELDS = ("email", "first_name", "last_name")
+PROFILE_FIELDS = ("display_name", "role")
+COLUMNS = ("username",) + USER_FIELDS + PROFILE_FIELDS + ("projects",)
+
+Membership = Project.participants.through
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "USER_PROVISIONING", {})}
+
+
+def guess_format(name):
+    """Формат по расширению файла или None."""
+    name = name.lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+# ---- Разбор ----
+def read_rows(chunks, fmt):
+    """(номер строки, dict или ValueError) из потока байтовых строк; BOM в начале допускается."""
+    lines = codecs.iterdecode(chunks, "utf-8-sig")
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            row = ValueError(f"не JSON: {exc}")
+        yield number, row if isinstance(row, (dict, ValueError)) else ValueError("ожидается объект")
+
+
+def _project_ids(value):
+    if value in (None, ""):
+        return []
+    items = re.split(r"[;\s]+", value.strip()) if isinstance(value, str) else value
+    try:
+        return sorted({int(item) for item in items if item != ""})
+    except (TypeError, ValueError):
+        raise ValueError(f"projects: ожидаются id проектов, получено {value!r}")
+
+
+def _clean(row):
+    """Проверенная строка: {"username", полей..., "projects": [id]}; ValueError — строка пропускается."""
+    username = str(row.get("username") or "").strip()
+    if not username:
+        raise ValueError("нет username")
+    try:
+        User.username_validator(username)
+    except ValidationError as exc:
+        raise ValueError(f"username: {' '.join(exc.messages)}")
+    if len(username) > User._meta.get_field("username").max_length:
+        raise ValueError("username: слишком длинный")
+    clean = {"username": username, "projects": _project_ids(row.get("projects"))}
+    for field in USER_FIELDS + PROFILE_FIELDS:
+        value = str(row.get(field) or "").strip()
+        model = User if field in USER_FIELDS else UserProfile
+        if len(value) > model._meta.get_field(field).max_length:
+            raise ValueError(f"{field}: длиннее {model._meta.get_field(field).max_length} символов")
+        clean[field] = value
+    if clean["email"]:
+        try:
+            validate_email(clean["email"])
+        except ValidationError:
+            raise ValueError(f"email: неверный адрес {clean['email']!r}")
+    return clean
+
+
+# ---- Запись пачки ----
+def _write_batch(rows, columns, report):
+    """rows — {username: строка} (повтор username в пачке — побеждает последняя)."""
+    user_fields = [f for f in USER_FIELDS if f in columns]
+    profile_fields = [f for f in PROFILE_FIELDS if f in columns]
+    names = list(rows)
+    with transaction.atomic():
+        existing = set(User.objects.filter(username__in=names).values_list("username", flat=True))
+        users = [
+            User(username=name, password=make_password(None), **{f: rows[name][f] for f in USER_FIELDS})
+            for name in names
+        ]
+        if user_fields:
+            User.objects.bulk_create(users, update_conflicts=True, unique_fields=["username"],
+                                     update_fields=user_fields)
+        else:
+            User.objects.bulk_create([u for u in users if u.username not in existing])
+        ids = dict(User.objects.filter(username__in=names).values_list("username", "pk"))
+
+        profiles = [UserProfile(user_id=ids[name], **{f: rows[name][f] for f in PROFILE_FIELDS}) for name in names]
+        if profile_fields:
+            UserProfile.objects.bulk_create(profiles, update_conflicts=True, unique_fields=["user"],
+                                            update_fields=profile_fields)
+        else:
+            UserProfile.objects.bulk_create(profiles, ignore_conflicts=True)
+
+        wanted = {(project_id, ids[name]) for name in names for project_id in rows[name]["projects"]}
+        added = _add_memberships(wanted, report)
+
+    auth_cache.invalidate(*ids.values())
+    report["created"] += len(names) - len(existing)
+    report["updated"] += len(existing)
+    report["memberships"] += added
+
+
+def _add_memberships(wanted, report):
+    if not wanted:
+        return 0
+    project_ids = {project_id for project_id, _ in wanted}
+    known = set(Project.objects.filter(pk__in=project_ids).values_list("pk", flat=True))
+    if unknown := project_ids - known:
+        report["unknown_projects"] = sorted(set(report["unknown_projects"]) | unknown)
+        wanted = {pair for pair in wanted if pair[0] in known}
+    if not wanted:
+        return 0
+    current = set(Membership.objects.filter(project_id__in=known, user_id__in={u for _, u in wanted})
+                  .values_list("project_id", "user_id"))
+    new = sorted(wanted - current)
+    Membership.objects.bulk_create([Membership(project_id=p, user_id=u) for p, u in new])
+    deltas = {}
+    for project_id, _ in new:
+        deltas[project_id] = deltas.get(project_id, 0) + 1
+    if deltas:
+        # m2m_changed не шлётся (tasks/counters.py) — счётчик и версия (ETag) всех проектов одним UPDATE
+        Project.objects.filter(pk__in=deltas).update(
+            participants_count=F("participants_count") + Case(
+                *[When(pk=pk, then=Value(n)) for pk, n in deltas.items()], output_field=IntegerField()
+            ),
+            version=F("version") + 1,
+        )
+    return len(new)
+
+
+def provision(chunks, fmt, batch_size=None, log=None):
+    """
+    Загружает пользователей из потока байтовых строк (файл, тело запроса).
+    Отчёт: {"rows", "created", "updated", "memberships", "skipped", "errors": [{"line", "error"}],
+    "unknown_projects"}.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"формат: {', '.join(FORMATS)}")
+    config = get_config()
+    batch_size = batch_size or config["BATCH_SIZE"]
+    report = {"rows": 0, "created": 0, "updated": 0, "memberships": 0, "skipped": 0, "errors": [],
+              "unknown_projects": []}
+    columns = None
+    batch = {}
+    for line, row in read_rows(chunks, fmt):
+        report["rows"] += 1
+        try:
+            if isinstance(row, ValueError):
+                raise row
+            if columns is None:
+                columns = set(row) & set(COLUMNS)
+            clean = _clean(row)
+        except ValueError as exc:
+            report["skipped"] += 1
+            if len(report["errors"]) < config["MAX_ERRORS"]:
+                report["errors"].append({"line": line, "error": str(exc)})
+            continue
+        batch.pop(clean["username"], None)   # повтор в пачке: последняя строка, в её порядке
+        batch[clean["username"]] = clean
+        if len(batch) >= batch_size:
+            _write_batch(batch, columns, report)
+            batch = {}
+            if log:
+                log(f"provision_users: {report['rows']} строк, создано {report['created']}, "
+                    f"обновлено {report['updated']}")
+    if batch:
+        _write_batch(batch, columns, report)
+    return report
@@ -0,0 +1,177 @@
+# tasks/querywatch.py
+"""
+Детектор N+1 и медленных SQL-запросов (opt-in, с сэмплированием).
+
+На каждое соединение вешается постоянная execute-обёртка (см. TasksConfig.ready);
+она ничего не делает, пока в текущем контексте нет QueryLog. QueryInspectorMiddleware
+заводит QueryLog для доли запросов SAMPLE_RATE, а в конце запроса:
+
+* группирует запросы по «форме» (SQL с плейсхолдерами, IN (%s, %s, ...) схлопнут),
+  кроме управления транзакциями (BEGIN, SAVEPOINT, RELEASE, ROLLBACK, COMMIT —
+  их повторяет каждый atomic(), это не N+1), и если одна форма повторилась >= N_PLUS_ONE_THRESHOLD раз — пишет warning
+  с местом в нашем коде, откуда пошёл повтор;
+* каждый запрос дольше SLOW_QUERY_MS логируется сразу, тоже с местом вызова.
+
+Стек снимается только для «подозрительных» запросов (на пороге повторов
+и для медленных), поэтому основная стоимость — подсчёт по словарю.
+
+Настройки (settings.QUERY_INSPECTOR): ENABLED, SAMPLE_RATE,
+N_PLUS_ONE_THRESHOLD, SLOW_QUERY_MS, STACK_DEPTH.
+"""
+import logging
+import random
+import re
+import sys
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger("tasks.querywatch")
+
+DEFAULTS = {
+    "ENABLED": False,
+    "SAMPLE_RATE": 0.05,
+    "N_PLUS_ONE_THRESHOLD": 5,
+    "SLOW_QUERY_MS": 200,
+    "STACK_DEPTH": 3,
+}
+
+_IN_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+_TRANSACTION = re.compile(r"\s*(?:BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b", re.IGNORECASE)
+_current = ContextVar("query_log", default=None)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "QUERY_INSPECTOR", {})}
+
+
+def query_shape(sql):
+    """Форма запроса для группировки; None — управление транзакцией, не группируется."""
+    if _TRANSACTION.match(sql):
+        return None
+    return _IN_LIST.sub("(...)", sql)
+
+
+# обёртки инструментовки — не «место вызова», пропускаем их
+_SKIP_MODULES = frozenset({__name__, "tasks.metrics"})
+
+
+def call_site(depth):
+    """
+    Ближайшие `depth` кадров из кода проекта. Если наш код в стеке не найден
+    (например, ленивый запрос из недр DRF), отдаём первый кадр вне django.db.
+    """
+    root = str(settings.BASE_DIR)
+    frames = []
+    fallback = None
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < depth:
+        module = frame.f_globals.get("__name__", "")
+        if module not in _SKIP_MODULES:
+            filename = frame.f_code.co_filename
+            where = f"{frame.f_code.co_name} ({module}:{frame.f_lineno})"
+            if filename.startswith(root) and "site-packages" not in filename:
+                frames.append(where)
+            elif fallback is None and not module.startswith("django.db"):
+                fallback = where
+        frame = frame.f_back
+    return frames or [fallback or "<неизвестно>"]
+
+
+class QueryLog:
+    __slots__ = ("threshold", "slow_seconds", "depth", "counts", "sites", "times")
+
+    def __init__(self, config):
+        self.threshold = config["N_PLUS_ONE_THRESHOLD"]
+        self.slow_seconds = config["SLOW_QUERY_MS"] / 1000.0
+        self.depth = config["STACK_DEPTH"]
+        self.counts = {}
+        self.sites = {}
+        self.times = {}
+
+    def record(self, sql, duration):
+        shape = query_shape(sql)
+        if shape is not None:
+            n = self.counts.get(shape, 0) + 1
+            self.counts[shape] = n
+            self.times[shape] = self.times.get(shape, 0.0) + duration
+            if n == self.threshold:
+                self.sites[shape] = call_site(self.depth)
+        if duration >= self.slow_seconds:
+            logger.warning(
+                "Медленный запрос %.1f ms: %s\n  at %s",
+                duration * 1000, sql[:500], "\n  at ".join(call_site(self.depth)),
+            )
+
+    def report(self, route):
+        for shape, n in self.counts.items():
+            if n < self.threshold:
+                continue
+            logger.warning(
+                "Возможный N+1 в %s: %d одинаковых запросов (%.1f ms): %s\n  at %s",
+                route, n, self.times[shape] * 1000, shape[:500], "\n  at ".join(self.sites[shape]),
+            )
+
+
+def inspector_execute_wrapper(execute, sql, params, many, context):
+    log = _current.get()
+    if log is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        log.record(sql, time.perf_counter() - started)
+
+
+def install_inspector_wrapper(sender, connection, **kwargs):
+    if inspector_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(inspector_execute_wrapper)
+
+
+class QueryInspectorMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = get_config()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _new_log(self):
+        config = self.config
+        if not config["ENABLED"] or random.random() >= config["SAMPLE_RATE"]:
+            return None
+        return QueryLog(config)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        log = self._new_log()
+        if log is None:
+            return self.get_response(request)
+        token = _current.set(log)
+        try:
+            return self.get_response(request)
+        finally:
+            _current.reset(token)
+            log.report(_route(request))
+
+    async def __acall__(self, request):
+        log = self._new_log()
+        if log is None:
+            return await self.get_response(request)
+        token = _current.set(log)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current.reset(token)
+            log.report(_route(request))
+
+
+def _route(request):
+    match = getattr(request, "resolver_match", None)
+    return f"{request.method} {match.view_name if match else request.path}"
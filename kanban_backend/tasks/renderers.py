@@ -0,0 +1,46 @@
+# tasks/renderers.py
+"""
+Быстрые JSON-рендерер и парсер для DRF на orjson (в разы быстрее stdlib json
+на больших досках). Если orjson не установлен — ведут себя как штатные
+JSONRenderer/JSONParser.
+"""
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - опциональная зависимость
+    orjson = None
+
+# то, что orjson не умеет сам (Decimal, lazy-строки, QuerySet...), отдаём энкодеру DRF
+_default = JSONEncoder().default
+
+
+def dumps(data):
+    if orjson is None:
+        return JSONRenderer().render(data)
+    return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        # pretty-print (?format=json; indent=4, browsable API) — штатным путём
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,172 @@
+# tasks/replicas.py
+"""
+Чтение с реплик с гарантией read-your-writes.
+
+ReplicaRoutingMiddleware помечает запрос (ContextVar), ReplicaRouter решает по
+этой пометке:
+    * GET/HEAD/OPTIONS без cookie-пина — чтения идут на одну из реплик
+      (выбирается один раз на запрос, чтобы ответ был согласован сам с собой);
+    * любая запись в ходе запроса переключает остаток запроса на primary;
+    * небезопасный метод или запись — ставим cookie READ_REPLICAS["COOKIE"]
+      на PIN_SECONDS: следующий GET клиента (PATCH-then-GET в ProjectBoard.jsx)
+      читает с primary, пока реплика догоняет;
+    * вне запроса (команды, фоновые задачи) и внутри atomic() — всегда primary.
+
+Отставание реплики проверяется не чаще LAG_CHECK_INTERVAL секунд на процесс:
+на PostgreSQL — по pg_last_xact_replay_timestamp(), на остальных СУБД —
+просто доступность. Реплика с лагом > MAX_LAG или с ошибкой подключения
+пропускается; если годных нет — читаем с primary.
+
+Локально: добавить в DATABASES второй алиас (копия db.sqlite3 или вторая
+PostgreSQL) и перечислить его в READ_REPLICAS["ALIASES"].
+"""
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ALIASES": (),
+    "PIN_SECONDS": 5,
+    "MAX_LAG": 2.0,
+    "LAG_CHECK_INTERVAL": 5.0,
+    "COOKIE": "kanban_primary",
+}
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+PG_LAG_SQL = (
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "READ_REPLICAS", {})}
+
+
+class _RouteState:
+    __slots__ = ("use_replica", "alias", "wrote")
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.alias = None
+        self.wrote = False
+
+
+_state = ContextVar("replica_route", default=None)
+
+_health = {}   # alias -> (monotonic время проверки, годна ли)
+
+
+def replica_lag(alias):
+    """Секунды отставания реплики (0 — догнала или СУБД не умеет сказать)."""
+    with connections[alias].cursor() as cursor:
+        if connections[alias].vendor == "postgresql":
+            cursor.execute(PG_LAG_SQL)
+            return float(cursor.fetchone()[0] or 0)
+        cursor.execute("SELECT 1")
+        return 0.0
+
+
+def is_healthy(alias, config):
+    now = time.monotonic()
+    checked = _health.get(alias)
+    if checked is not None and now - checked[0] < config["LAG_CHECK_INTERVAL"]:
+        return checked[1]
+    try:
+        lag = replica_lag(alias)
+        ok = lag <= config["MAX_LAG"]
+        if not ok:
+            logger.warning("replica %s lags %.1fs — reading from primary", alias, lag)
+    except DatabaseError as exc:
+        logger.warning("replica %s unavailable: %s", alias, exc)
+        ok = False
+    _health[alias] = (now, ok)
+    return ok
+
+
+def choose_replica(config):
+    healthy = [alias for alias in config["ALIASES"] if is_healthy(alias, config)]
+    return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.config = get_config()
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replica:
+            return None
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            # связанные объекты читаем оттуда же, откуда сам объект
+            return instance._state.db
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        if state.alias is None:
+            state.alias = choose_replica(self.config)
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.use_replica = False
+            state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # primary и реплики — одна и та же база
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = get_config()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(request, response, state)
+
+    def start(self, request):
+        use_replica = bool(
+            self.config["ALIASES"]
+            and request.method in SAFE_METHODS
+            and self.config["COOKIE"] not in request.COOKIES
+        )
+        return _RouteState(use_replica)
+
+    def finish(self, request, response, state):
+        if state.wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(self.config["COOKIE"], "1", max_age=self.config["PIN_SECONDS"],
+                                httponly=True, samesite="Lax")
+        return response
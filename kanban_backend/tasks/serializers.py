@@ -1,15 +1,26 @@
 # tasks/serializers.py
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Task, TaskImage, UserProfile, Project
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from .models import ArchivedTask, DeletionJob, Task, TaskImage, UserProfile, Project
+from .concurrency import VersionedSerializerMixin
+from .metrics import TimedSerializerMixin
+from . import counters, participants, subtasks
 
-class UserSerializer(serializers.ModelSerializer):
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     role = serializers.SerializerMethodField()
     display_name = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = ['id', 'username', 'display_name', 'role']
+        list_serializer_class = TimedListSerializer
 
     def get_role(self, obj):
         prof = getattr(obj, 'profile', None)
@@ -26,23 +37,45 @@ class UserSerializer(serializers.ModelSerializer):
         return prof.display_name if (prof and prof.display_name) else obj.username
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(VersionedSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
     participants = UserSerializer(many=True, read_only=True)
     participants_ids = serializers.PrimaryKeyRelatedField(
         many=True, queryset=User.objects.all(), source="participants",
         write_only=True, required=False
     )
+    # готовые счётчики из строки проекта (tasks/counters.py) — без пересчёта задач
+    counters = serializers.SerializerMethodField()
 
     class Meta:
         model = Project
         fields = [
             'id', 'title', 'description', 'due_date',
             'participants', 'participants_ids',
+            'counters', 'version',
             'created_at', 'updated_at'
         ]
+        list_serializer_class = TimedListSerializer
+
+    def get_counters(self, obj):
+        return counters.as_dict(obj)
+
+
+class ParticipantsDeltaSerializer(serializers.Serializer):
+    """Тело POST /api/projects/<id>/participants/ (tasks/participants.py)."""
+    add = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list,
+                                max_length=participants.MAX_IDS)
+    remove = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list,
+                                   max_length=participants.MAX_IDS)
+
+    def validate(self, attrs):
+        if not attrs["add"] and not attrs["remove"]:
+            raise serializers.ValidationError("Укажите add и/или remove.")
+        if both := set(attrs["add"]) & set(attrs["remove"]):
+            raise serializers.ValidationError({"remove": f"Одновременно добавляются и убираются: {sorted(both)}"})
+        return attrs
 
 
-class TaskImageSerializer(serializers.ModelSerializer):
+class TaskImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     url = serializers.SerializerMethodField()
     image = serializers.ImageField(write_only=True, required=False)
 
@@ -50,6 +83,7 @@ class TaskImageSerializer(serializers.ModelSerializer):
         model = TaskImage
         fields = ['id', 'task', 'position', 'image', 'url']
         read_only_fields = ['id', 'url']
+        list_serializer_class = TimedListSerializer
 
     def get_url(self, obj):
         if not obj.image:
@@ -61,7 +95,20 @@ class TaskImageSerializer(serializers.ModelSerializer):
         return request.build_absolute_uri(rel) if request else rel
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskListSerializer(TimedListSerializer):
+    """
+    Прогресс подзадач для всего списка считает вьюха — одним запросом subtasks.rollup —
+    и кладёт в context["subtask_rollup"]: сериализация сама в базу не ходит
+    (async-вьюхи, tasks/async_views.py, и не могут).
+    """
+
+    def to_representation(self, data):
+        if "subtask_rollup" not in self.context:
+            raise ImproperlyConfigured("TaskSerializer(many=True): нет context['subtask_rollup'] (subtasks.rollup)")
+        return super().to_representation(data)
+
+
+class TaskSerializer(VersionedSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
     project = ProjectSerializer(read_only=True)
     project_id = serializers.PrimaryKeyRelatedField(
         queryset=Project.objects.all(), source='project',
@@ -73,6 +120,11 @@ class TaskSerializer(serializers.ModelSerializer):
         write_only=True, required=False, allow_null=True
     )
     images = TaskImageSerializer(many=True, read_only=True)
+    parent_id = serializers.PrimaryKeyRelatedField(
+        queryset=Task.objects.all(), source='parent', required=False, allow_null=True
+    )
+    # {"total", "done", "progress"} по всем уровням подзадач или null (tasks/subtasks.py)
+    subtasks = serializers.SerializerMethodField()
 
     # цвет бейджа для выполнённых задач
     done_color = serializers.SerializerMethodField()
@@ -84,8 +136,16 @@ class TaskSerializer(serializers.ModelSerializer):
             'priority', 'due_date', 'completed_at',
             'project', 'project_id',
             'responsible', 'responsible_id',
-            'images', 'done_color',
+            'images', 'done_color', 'version',
+            'parent_id', 'subtasks',
         ]
+        list_serializer_class = TaskListSerializer
+
+    def get_subtasks(self, obj):
+        rollup = self.context.get("subtask_rollup")
+        if rollup is None:   # одиночный объект
+            rollup = subtasks.rollup([obj.pk])
+        return subtasks.as_dict(rollup.get(obj.pk))
 
     def get_done_color(self, obj):
         if obj.column != 'done':
@@ -109,4 +169,76 @@ class TaskSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({
                 'responsible_id': 'Этот пользователь не состоит в проекте и не может быть ответственным.'
             })
+        if 'parent' in attrs or 'project' in attrs:
+            self._validate_parent(attrs.get('parent', getattr(self.instance, 'parent', None)), project, attrs)
         return attrs
+
+    def _validate_parent(self, parent, project, attrs):
+        task = self.instance
+        if parent is not None:
+            if project is None or parent.project_id != project.pk:
+                raise serializers.ValidationError({'parent_id': 'Родитель должен быть задачей того же проекта.'})
+            if task is not None and (parent.pk == task.pk or subtasks.is_descendant(parent.pk, task.pk)):
+                raise serializers.ValidationError({
+                    'parent_id': 'Задача не может стать подзадачей самой себя или своей подзадачи.'
+                })
+        if task is not None and 'project' in attrs and attrs['project'] != task.project and task.children.exists():
+            raise serializers.ValidationError({'project_id': 'Сначала перенесите подзадачи в другую задачу.'})
+
+
+class TaskBriefSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Облегчённая задача для списков вне доски (tasks/my_tasks.py): без пользователей, картинок и подзадач."""
+    project = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Task
+        fields = ['id', 'title', 'column', 'priority', 'due_date', 'position', 'parent_id', 'version', 'project']
+        read_only_fields = fields
+        list_serializer_class = TimedListSerializer
+
+    def get_project(self, obj):
+        return {"id": obj.project_id, "title": obj.project.title if obj.project else None}
+
+
+class ArchivedTaskSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Только чтение: id — исходный id задачи, картинки — из ArchivedTask.images."""
+    id = serializers.IntegerField(source='original_id', read_only=True)
+    responsible = UserSerializer(read_only=True)
+    images = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedTask
+        fields = [
+            'id', 'title', 'description', 'priority',
+            'due_date', 'completed_at', 'project_id',
+            'responsible', 'images', 'created_at', 'archived_at',
+        ]
+        read_only_fields = fields
+        list_serializer_class = TimedListSerializer
+
+    def get_images(self, obj):
+        request = self.context.get("request")
+        out = []
+        for item in obj.images:
+            rel = default_storage.url(item["image"])
+            if request and not rel.startswith(("http://", "https://")):
+                rel = request.build_absolute_uri(rel)
+            out.append({"position": item["position"], "url": rel})
+        return out
+
+
+
+class DeletionJobSerializer(serializers.ModelSerializer):
+    """Прогресс фонового удаления проекта (tasks/deletion.py)."""
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DeletionJob
+        fields = ['id', 'project_id', 'title', 'status', 'total', 'purged', 'progress',
+                  'created_at', 'finished_at']
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        if obj.status == "done":
+            return 100
+        return min(99, obj.purged * 100 // obj.total) if obj.total else 0
@@ -0,0 +1,70 @@
+# tasks/shard_api.py
+"""
+DRF-часть шардирования (tasks/sharding.py): закрепление шарда на время запроса
+и ответ 503 + Retry-After, пока проект переносится между шардами.
+"""
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from . import sharding
+from .models import Task, TaskImage
+
+
+class ProjectMovingError(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Проект переносится на другой сервер, повторите через несколько секунд."
+    default_code = "project_moving"
+
+    def __init__(self, wait):
+        super().__init__()
+        self.wait = wait   # DRF exception_handler превращает в Retry-After
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ShardedViewMixin:
+    """
+    Закрепляет шард до выполнения действия:
+        * detail-маршрут — шард, где лежит объект с этим pk (sharding.locate);
+        * иначе — шард проекта из тела (project_id), ?project= или задачи из тела (task).
+    Не нашли — шард не закреплён: list/чтения идут fan-out'ом, detail отдаст 404.
+    С одним шардом ничего не делает.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if sharding.is_sharded():
+            alias = self.resolve_shard(request, kwargs)
+            if alias is not None:
+                self._shard_token = sharding.pin(alias)
+
+    def resolve_shard(self, request, kwargs):
+        model = self.get_serializer_class().Meta.model
+        pk = _as_id(kwargs.get(self.lookup_url_kwarg or self.lookup_field))
+        if pk is not None:
+            return sharding.locate(model, pk)
+        data = request.data if request.method not in ("GET", "HEAD", "OPTIONS") else {}
+        project_id = _as_id(data.get("project_id") or request.query_params.get("project"))
+        if project_id is not None:
+            return sharding.shard_for_project(project_id)
+        task_id = _as_id(data.get("task"))
+        if model is TaskImage and task_id is not None:
+            return sharding.locate(Task, task_id)
+        return None
+
+    def handle_exception(self, exc):
+        if isinstance(exc, sharding.ProjectMoving):
+            exc = ProjectMovingError(exc.retry_after)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        token = self.__dict__.pop("_shard_token", None)
+        if token is not None:
+            sharding.unpin(token)
+        return response
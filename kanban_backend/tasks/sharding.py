@@ -0,0 +1,478 @@
+# tasks/sharding.py
+"""
+Горизонтальное шардирование задач по проектам.
+
+Что где лежит:
+    * default — пользователи, сессии, проекты (строка проекта и есть запись
+      директории: Project.shard), счётчики, архив, журналы и сводки;
+    * шард проекта — его Task, TaskImage и TaskClosure (дерево подзадач).
+Task.project/responsible — FK без ограничения в БД (db_constraint=False):
+Django не умеет связи между базами, каскады при удалении проекта и
+пользователя делают сигналы ниже.
+
+Новый проект получает шард SHARDS[id % len(SHARDS)]; дальше решает директория
+(move_project может его перенести). Директория кэшируется в памяти процесса на
+DIRECTORY_TTL секунд; запись всегда сверяется со свежей строкой проекта
+(ensure_writable), так что устаревший кэш может дать только устаревшее чтение.
+
+ShardRouter отправляет Task/TaskImage в шард, закреплённый в ContextVar
+(use_shard / ShardedViewMixin), или в базу объекта-подсказки; чтения
+связанных с задачей проекта и пользователя — всегда в default.
+Запросы без известного проекта (все задачи пользователя, сканеры) идут через
+fan_out() — параллельно по шардам в пуле потоков — и сливаются вызывающим.
+
+Id задач уникальны глобально: у каждого шарда свой блок id (init_shard),
+поэтому перенос проекта сохраняет id и ссылки на них. На SQLite id блока
+выдаёт счётчик ShardSequence на самом шарде (UPDATE ... RETURNING — атомарно
+и без MAX() на каждую вставку). СУБД шардов проверяются при старте (check_config).
+С одним шардом (по умолчанию) всё это не делает ни одного лишнего запроса.
+"""
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Project, ShardSequence, Task, TaskClosure, TaskImage
+
+DEFAULTS = {
+    "SHARDS": (DEFAULT_DB_ALIAS,),
+    "DIRECTORY_TTL": 30,
+    "FAN_OUT_WORKERS": 8,
+    "ID_BLOCK": 10 ** 12,
+    "MOVE_SETTLE": 2,      # сек после заморозки: дождаться записей, начатых до неё
+    "COPY_BATCH": 500,
+}
+
+SHARDED_MODELS = (Task, TaskImage, TaskClosure)
+# id из блока шарда нужны только тем, на кого ссылаются по id (closure копируется с новыми id)
+ID_MODELS = (Task, TaskImage)
+# блоки id умеем ставить только здесь (reset_sequences)
+VENDORS = ("sqlite", "postgresql")
+
+logger = logging.getLogger(__name__)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "SHARDING", {})}
+
+
+def shards():
+    return tuple(get_config()["SHARDS"])
+
+
+def is_sharded():
+    return len(shards()) > 1
+
+
+def check_config():
+    """При старте (TasksConfig.ready): каждый шард есть в DATABASES и его СУБД поддерживается."""
+    if not is_sharded():
+        return
+    for alias in shards():
+        if alias not in settings.DATABASES:
+            raise ImproperlyConfigured(f"SHARDING['SHARDS']: {alias!r} нет в DATABASES")
+        vendor = connections[alias].vendor
+        if vendor not in VENDORS:
+            raise ImproperlyConfigured(
+                f"SHARDING['SHARDS']: {alias!r} на {vendor}, шарды поддерживаются на {', '.join(VENDORS)}"
+            )
+
+
+class ProjectMoving(Exception):
+    """Проект переносится (или директория устарела) — запись надо повторить позже."""
+
+    def __init__(self, retry_after=2):
+        super().__init__("project is being moved between shards")
+        self.retry_after = retry_after
+
+
+# ---- Закреплённый шард текущего контекста ----
+_pinned = contextvars.ContextVar("shard", default=None)
+
+
+def current():
+    return _pinned.get()
+
+
+def pin(alias):
+    """Закрепить шард до unpin(token) — для вьюх, где нет одного with-блока."""
+    return _pinned.set(alias)
+
+
+def unpin(token):
+    _pinned.reset(token)
+
+
+@contextmanager
+def use_shard(alias):
+    token = pin(alias)
+    try:
+        yield alias
+    finally:
+        unpin(token)
+
+
+@contextmanager
+def atomic():
+    """transaction.atomic на default и, если закреплён другой шард, на нём тоже."""
+    with ExitStack() as stack:
+        stack.enter_context(transaction.atomic(using=DEFAULT_DB_ALIAS))
+        alias = current()
+        if alias not in (None, DEFAULT_DB_ALIAS):
+            stack.enter_context(transaction.atomic(using=alias))
+        yield
+
+
+# ---- Директория ----
+_directory = {}   # project_id -> (alias, monotonic-время истечения)
+
+
+def choose_shard(project_id):
+    aliases = shards()
+    return aliases[project_id % len(aliases)]
+
+
+def shard_for_project(project_id):
+    """Шард проекта или None, если проекта нет."""
+    if not is_sharded():
+        return DEFAULT_DB_ALIAS
+    project_id = int(project_id)
+    now = time.monotonic()
+    entry = _directory.get(project_id)
+    if entry is not None and entry[1] > now:
+        return entry[0]
+    alias = (Project.objects.using(DEFAULT_DB_ALIAS).filter(pk=project_id)
+             .values_list("shard", flat=True).first())
+    if alias is not None:
+        _directory[project_id] = (alias, now + get_config()["DIRECTORY_TTL"])
+    return alias
+
+
+def forget(project_id):
+    _directory.pop(int(project_id), None)
+
+
+def group_by_shard(project_ids):
+    grouped = {}
+    for project_id in project_ids:
+        alias = shard_for_project(project_id)
+        if alias is not None:
+            grouped.setdefault(alias, []).append(project_id)
+    return grouped
+
+
+def owns(alias, project_id):
+    """Авторитетна ли копия задачи на шарде alias (во время переноса она есть на двух)."""
+    if project_id is None:
+        return alias == DEFAULT_DB_ALIAS
+    return shard_for_project(project_id) == alias
+
+
+def owned_project_ids(alias):
+    """
+    Проекты, задачи которых на этом шарде можно менять фоновым задачам:
+    шард авторитетен и проект не переносится. None — шард один, фильтр не нужен.
+    """
+    if not is_sharded():
+        return None
+    return list(Project.objects.using(DEFAULT_DB_ALIAS).filter(shard=alias, shard_frozen=False)
+                .values_list("pk", flat=True))
+
+
+def ensure_writable(project):
+    """
+    Перед записью задач проекта: project — свежая строка из default.
+    Заморожен переносом или закреплённый шард не совпал с директорией — ProjectMoving.
+    """
+    if project is None or not is_sharded():
+        return
+    if project.shard_frozen:
+        raise ProjectMoving()
+    if project.shard != (current() or DEFAULT_DB_ALIAS):
+        forget(project.pk)
+        raise ProjectMoving(retry_after=1)
+
+
+# ---- Fan-out ----
+def fan_out(fn, aliases=None):
+    """
+    fn(alias) на каждом шарде с закреплённым шардом; {alias: результат}.
+    Несколько шардов — параллельно, у каждого потока своё соединение, закрываем его сами.
+    """
+    aliases = list(aliases or shards())
+    if len(aliases) == 1:
+        with use_shard(aliases[0]):
+            return {aliases[0]: fn(aliases[0])}
+
+    def run(alias):
+        try:
+            with use_shard(alias):
+                return fn(alias)
+        finally:
+            connections[alias].close()
+
+    workers = min(len(aliases), get_config()["FAN_OUT_WORKERS"])
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # copy_context: тайминги (tasks/metrics.py) и прочие ContextVar видны и в потоках
+        futures = {alias: pool.submit(contextvars.copy_context().run, run, alias) for alias in aliases}
+        return {alias: future.result() for alias, future in futures.items()}
+
+
+def locate(model, pk):
+    """Шард, где живёт Task/TaskImage с данным pk (с учётом директории при переносе)."""
+    if not is_sharded():
+        return DEFAULT_DB_ALIAS
+    project_field = "project_id" if model is Task else "task__project_id"
+    found = fan_out(lambda alias: model._base_manager.using(alias).filter(pk=pk)
+                    .values_list(project_field, flat=True).first())
+    candidates = [alias for alias, project_id in found.items() if project_id is not None]
+    for alias in candidates:
+        if shard_for_project(found[alias]) == alias:
+            return alias
+    return candidates[0] if candidates else None
+
+
+def join(queryset, *fields):
+    """select_related в пределах одной базы; при шардировании — prefetch (связи уходят в default)."""
+    return queryset.prefetch_related(*fields) if is_sharded() else queryset.select_related(*fields)
+
+
+# ---- Блоки id ----
+def id_block(alias):
+    return shards().index(alias) * get_config()["ID_BLOCK"]
+
+
+def _max_in_block(model, alias):
+    low = id_block(alias)
+    return (model._base_manager.using(alias).filter(pk__gte=low, pk__lt=low + get_config()["ID_BLOCK"])
+            .order_by("-pk").values_list("pk", flat=True).first())
+
+
+def _raise_sequence(cursor, table, value):
+    """Счётчик ShardSequence не меньше value (назад не двигаем — выданные id не повторятся)."""
+    cursor.execute(
+        f"INSERT INTO {ShardSequence._meta.db_table} (name, value) VALUES (%s, %s) "
+        f"ON CONFLICT (name) DO UPDATE SET value = MAX(value, excluded.value)",
+        [table, value],
+    )
+
+
+def reset_sequences(alias):
+    """
+    Ставит выдачу id Task/TaskImage на шарде в его блок.
+    На PostgreSQL — setval последовательности (явные id переноса её не двигают);
+    SQLite же берёт max(rowid) + 1 — там id выдаёт _allocate_sqlite_id из ShardSequence.
+    СУБД уже проверена check_config.
+    """
+    low = id_block(alias)
+    connection = connections[alias]
+    for model in ID_MODELS:
+        table = model._meta.db_table
+        current_max = _max_in_block(model, alias)
+        value = current_max if current_max is not None else low
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                _raise_sequence(cursor, table, value)
+            else:
+                cursor.execute("SELECT setval(pg_get_serial_sequence(%s, 'id'), %s, %s)",
+                               [table, max(value, 1), current_max is not None or low > 0])
+
+
+def _next_sqlite_id(model, alias):
+    """
+    Следующий id блока: UPDATE строки счётчика берёт блокировку записи SQLite,
+    так что параллельные вставки получают разные id; откат транзакции откатывает и его.
+    """
+    table = model._meta.db_table
+    sql = f"UPDATE {ShardSequence._meta.db_table} SET value = value + 1 WHERE name = %s RETURNING value"
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+        if row is None:   # шард без init_shard — заводим счётчик по факту
+            current_max = _max_in_block(model, alias)
+            _raise_sequence(cursor, table, id_block(alias) if current_max is None else current_max)
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    return row[0]
+
+
+# ---- Перенос проекта между шардами ----
+def _copy(model, rows, target, batch_size):
+    """
+    bulk_create с исходными id. created_at/updated_at: pre_save(add=True) в bulk_create
+    ставит им now() прямо в объектах — запоминаем исходные до вставки и пишем их
+    bulk_update'ом (он pre_save не зовёт).
+    """
+    stamps = [f.attname for f in model._meta.concrete_fields
+              if getattr(f, "auto_now", False) or getattr(f, "auto_now_add", False)]
+    saved = [[getattr(row, name) for name in stamps] for row in rows]
+    model.objects.using(target).bulk_create(rows, batch_size=batch_size)
+    if stamps and rows:
+        for row, values in zip(rows, saved):
+            for name, value in zip(stamps, values):
+                setattr(row, name, value)
+        model.objects.using(target).bulk_update(rows, stamps, batch_size=batch_size)
+
+
+def raw_delete(queryset):
+    """
+    DELETE одним запросом: без каскадного сборщика и сигналов (post_delete,
+    а с ним и удаления файлов картинок). Зависимые строки — на вызывающем.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def move_project(project_id, target, keep_source=False, grace=None, log=logger.info):
+    """
+    Переносит задачи и картинки проекта на шард target, не останавливая остальных:
+        1. копирует задачи (id сохраняются) — проект в это время пишется как обычно;
+        2. замораживает проект (shard_frozen): запись его задач отвечает 503 + Retry-After;
+        3. досинхронизирует изменённые/удалённые с начала копирования задачи и картинки;
+        4. переключает Project.shard и размораживает;
+        5. через grace (DIRECTORY_TTL — пока другие процессы помнят старый шард)
+           удаляет исходные строки.
+    Возвращает (число задач, число картинок).
+    """
+    config = get_config()
+    batch = config["COPY_BATCH"]
+    if target not in shards():
+        raise ValueError(f"{target!r} нет в SHARDING['SHARDS']")
+    project = Project.objects.using(DEFAULT_DB_ALIAS).get(pk=project_id)
+    source = project.shard
+    if source == target:
+        return 0, 0
+
+    def source_tasks():
+        return Task.objects.using(source).filter(project_id=project_id).order_by("pk")
+
+    def closure(alias):
+        return TaskClosure.objects.using(alias).filter(descendant__project_id=project_id)
+
+    # строки переносятся, а не удаляются — файлы картинок остаются (raw_delete без сигналов)
+    # 1. начальная копия; остатки прошлой прерванной попытки на target убираем
+    started = timezone.now()
+    with transaction.atomic(using=target):   # parent может ссылаться на задачу из следующей пачки
+        raw_delete(closure(target))
+        raw_delete(TaskImage.objects.using(target).filter(task__project_id=project_id))
+        raw_delete(Task.objects.using(target).filter(project_id=project_id))
+        _copy(Task, list(source_tasks()), target, batch)
+    log(f"move_project {project_id}: {source} -> {target}, задачи скопированы")
+
+    # 2. заморозка
+    Project.objects.using(DEFAULT_DB_ALIAS).filter(pk=project_id).update(shard_frozen=True)
+    forget(project_id)
+    time.sleep(config["MOVE_SETTLE"])
+    try:
+        with transaction.atomic(using=target):
+            # 3. дельта: изменённые после started — заново, пропавшие на source — удалить
+            changed = list(source_tasks().filter(updated_at__gte=started))
+            source_ids = set(source_tasks().values_list("pk", flat=True))
+            target_ids = set(Task.objects.using(target).filter(project_id=project_id).values_list("pk", flat=True))
+            stale = [pk for pk in target_ids if pk not in source_ids] + [t.pk for t in changed]
+            for i in range(0, len(stale), batch):
+                raw_delete(Task.objects.using(target).filter(pk__in=stale[i:i + batch]))
+            _copy(Task, changed, target, batch)
+            images = list(TaskImage.objects.using(source).filter(task__project_id=project_id).order_by("pk"))
+            _copy(TaskImage, images, target, batch)
+            # closure целиком: строк на проект немного, а отслеживать их изменения нечем
+            raw_delete(closure(target))
+            links = list(closure(source).order_by("pk"))
+            for link in links:
+                link.pk = None
+            TaskClosure.objects.using(target).bulk_create(links, batch_size=batch)
+            # явные id из чужого блока сдвинули автоинкремент target (SQLite) — возвращаем
+            reset_sequences(target)
+        # 4. переключение — после коммита копии
+        Project.objects.using(DEFAULT_DB_ALIAS).filter(pk=project_id).update(shard=target, shard_frozen=False)
+    except BaseException:
+        Project.objects.using(DEFAULT_DB_ALIAS).filter(pk=project_id).update(shard_frozen=False)
+        raise
+    forget(project_id)
+    log(f"move_project {project_id}: переключён на {target} (задач {len(source_ids)}, картинок {len(images)})")
+
+    # 5. исходные строки
+    if not keep_source:
+        time.sleep(config["DIRECTORY_TTL"] if grace is None else grace)
+        with transaction.atomic(using=source):
+            raw_delete(closure(source))
+            raw_delete(TaskImage.objects.using(source).filter(task__project_id=project_id))
+            raw_delete(Task.objects.using(source).filter(project_id=project_id))
+        log(f"move_project {project_id}: строки на {source} удалены")
+    return len(source_ids), len(images)
+
+
+@receiver(pre_save, sender=Task)
+@receiver(pre_save, sender=TaskImage)
+def _allocate_sqlite_id(sender, instance, raw=False, using=None, **kwargs):
+    # SQLite выдаёт max(rowid) + 1: после переноса проекта с id из чужого блока
+    # это был бы id чужого шарда. Выдаём следующий id своего блока явно.
+    if instance.pk is None and not raw and is_sharded() and connections[using].vendor == "sqlite":
+        instance.pk = _next_sqlite_id(sender, using)
+
+
+# ---- Каскады между базами ----
+@receiver(post_save, sender=Project)
+def _assign_shard(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and is_sharded():
+        alias = choose_shard(instance.pk)
+        if alias != instance.shard:
+            Project.objects.using(DEFAULT_DB_ALIAS).filter(pk=instance.pk).update(shard=alias)
+            instance.shard = alias
+
+
+@receiver(pre_delete, sender=Project)
+def _delete_project_tasks(sender, instance, **kwargs):
+    # задачи в default удалит сам Collector; на остальных шардах — мы
+    if not is_sharded():
+        return
+    for alias in shards():
+        if alias != DEFAULT_DB_ALIAS:
+            TaskClosure.objects.using(alias).filter(descendant__project_id=instance.pk).delete()
+            TaskImage.objects.using(alias).filter(task__project_id=instance.pk).delete()
+            Task.objects.using(alias).filter(project_id=instance.pk).delete()
+    forget(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def _unassign_user_tasks(sender, instance, **kwargs):
+    if not is_sharded():
+        return
+    for alias in shards():
+        if alias != DEFAULT_DB_ALIAS:
+            Task.objects.using(alias).filter(responsible_id=instance.pk).update(responsible=None)
+
+
+# ---- Роутер ----
+def _is_sharded_model(model):
+    return issubclass(model, SHARDED_MODELS)
+
+
+class ShardRouter:
+    def _route(self, model, hints):
+        instance = hints.get("instance")
+        if _is_sharded_model(model):
+            if instance is not None and _is_sharded_model(type(instance)) and instance._state.db:
+                return instance._state.db
+            return current()
+        if instance is not None and _is_sharded_model(type(instance)) and is_sharded():
+            # task.project, task.responsible, image.task.project — из default
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -0,0 +1,120 @@
+# tasks/subtasks.py
+"""
+Иерархия задач (эпик -> задачи -> подзадачи) на closure-таблице TaskClosure.
+
+Task.parent — прямой родитель (его пишет API), TaskClosure — все пары
+(предок, потомок, глубина). За счёт этого любая выборка по дереву — один
+индексный запрос без рекурсии:
+    поддерево      — Task JOIN closure WHERE ancestor_id = X;
+    прогресс эпиков — GROUP BY ancestor_id по closure JOIN Task (rollup);
+    цепочка предков — closure WHERE descendant_id = X (индекс descendant, depth).
+
+Изменения дерева — несколько set-based запросов независимо от глубины:
+    attach  — новая задача под родителем: копия строк предков родителя + 1;
+    move    — смена родителя: DELETE связей поддерева с прежними предками,
+              INSERT декартова произведения «новые предки x поддерево»;
+    detach  — перед удалением задачи её дети поднимаются к её родителю,
+              глубины под ней уменьшаются на 1. Вызывается сигналом pre_delete
+              на любое удаление через ORM (API, админка, shell); массовые
+              raw_delete (архив, очистка проекта) дерево чинят сами.
+Вызывать внутри транзакции записи задачи; дерево всегда в пределах одного
+проекта, а значит и одного шарда (tasks/sharding.py).
+"""
+from django.db.models import Count, F, Q
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import sharding
+from .models import Task, TaskClosure
+
+INSERT_BATCH = 1000
+
+
+def _ancestors(task_id):
+    """[(ancestor_id, depth)] от родителя до корня."""
+    return list(TaskClosure.objects.filter(descendant_id=task_id).values_list("ancestor_id", "depth"))
+
+
+def _chain(parent_id):
+    """Предки будущего потомка parent_id с глубинами относительно него: [(parent, 1), (дед, 2), ...]."""
+    return [(parent_id, 1)] + [(ancestor_id, depth + 1) for ancestor_id, depth in _ancestors(parent_id)]
+
+
+def is_descendant(task_id, ancestor_id):
+    return TaskClosure.objects.filter(ancestor_id=ancestor_id, descendant_id=task_id).exists()
+
+
+def attach(task):
+    """Новая задача с parent: строки closure к родителю и его предкам."""
+    if task.parent_id is None:
+        return
+    TaskClosure.objects.bulk_create(
+        [TaskClosure(ancestor_id=a, descendant_id=task.pk, depth=d) for a, d in _chain(task.parent_id)],
+        batch_size=INSERT_BATCH,
+    )
+
+
+def move(task, old_parent_id):
+    """task.parent_id уже новый; переносим всё поддерево task."""
+    if task.parent_id == old_parent_id:
+        return
+    subtree = TaskClosure.objects.filter(ancestor_id=task.pk)
+    if old_parent_id is not None:
+        old_ancestors = TaskClosure.objects.filter(descendant_id=task.pk).values("ancestor_id")
+        TaskClosure.objects.filter(
+            Q(descendant_id=task.pk) | Q(descendant_id__in=subtree.values("descendant_id")),
+            ancestor_id__in=old_ancestors,
+        ).delete()
+    if task.parent_id is None:
+        return
+    nodes = [(task.pk, 0)] + list(subtree.values_list("descendant_id", "depth"))
+    TaskClosure.objects.bulk_create(
+        [TaskClosure(ancestor_id=a, descendant_id=n, depth=da + dn)
+         for a, da in _chain(task.parent_id) for n, dn in nodes],
+        batch_size=INSERT_BATCH,
+    )
+
+
+def detach(task):
+    """Перед удалением task: её поддерево поднимается на уровень (строки с самой task удалит каскад)."""
+    subtree = TaskClosure.objects.filter(ancestor_id=task.pk).values("descendant_id")
+    ancestors = TaskClosure.objects.filter(descendant_id=task.pk).values("ancestor_id")
+    TaskClosure.objects.filter(ancestor_id__in=ancestors, descendant_id__in=subtree).update(depth=F("depth") - 1)
+    # ETag детей устаревает вместе со сменой parent; updated_at — для дельты move_project
+    Task.objects.filter(parent_id=task.pk).update(parent_id=task.parent_id, version=F("version") + 1,
+                                                  updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Task)
+def _detach_on_delete(sender, instance, using, **kwargs):
+    # иначе SET_NULL на parent оставит детей корнями, а их строки closure — с удалённой ступенью
+    with sharding.use_shard(using):
+        detach(instance)
+
+
+def subtree(task_id):
+    """Все потомки task_id с глубиной (annotate depth), один запрос."""
+    return (Task.objects.filter(ancestor_links__ancestor_id=task_id)
+            .annotate(depth=F("ancestor_links__depth")))
+
+
+def rollup(task_ids):
+    """
+    {task_id: (всего потомков, из них done)} по всем уровням — один GROUP BY.
+    Задачи без подзадач в словарь не попадают.
+    """
+    if not task_ids:
+        return {}
+    rows = (TaskClosure.objects.filter(ancestor_id__in=task_ids).order_by()
+            .values("ancestor_id")
+            .annotate(total=Count("id"), done=Count("id", filter=Q(descendant__column="done")))
+            .values_list("ancestor_id", "total", "done"))
+    return {task_id: (total, done) for task_id, total, done in rows}
+
+
+def as_dict(counts):
+    if counts is None:
+        return None
+    total, done = counts
+    return {"total": total, "done": done, "progress": (done * 100 + total // 2) // total}
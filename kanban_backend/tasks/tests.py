@@ -1,3 +1,1121 @@
-from django.test import TestCase
+import copy
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from functools import partial
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.http import HttpResponse
+from django.db.models import F
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from tasks import (archive, auth_cache, columnar, compression, concurrency, counters, deadlines, deletion, flow,
+                   media_gc, metrics, my_tasks, provisioning, querywatch, replicas, sharding, subtasks, throttling)
+from tasks.admin import EstimatedCountPaginator
+from tasks.models import (ArchivedTask, CycleTimeDay, DeletionJob, FlowDay, NotificationDigest, Project, Task,
+                          TaskClosure, TaskImage, TaskTransition)
+from tasks.renderers import FastJSONRenderer
+
+# Второй шард для тестов: отдельная SQLite (в тестах — в памяти). Регистрируется
+# при импорте модуля — раньше, чем раннер создаёт тестовые базы.
+SHARD = "test_shard"
+settings.DATABASES.setdefault(SHARD, copy.deepcopy(settings.DATABASES["default"]))
+
+SHARDS = {"SHARDS": ["default", SHARD], "DIRECTORY_TTL": 0, "MOVE_SETTLE": 0}
+
+
+class ApiTestCase(TestCase):
+    """Пользователь owner в проекте board; кэш (auth-кэш, лимиты) между тестами не переживает отката базы."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("owner", password="x")
+        self.project = Project.objects.create(title="board")
+        self.project.participants.add(self.user)
+        self.client.force_login(self.user)
+
+    def post(self, url, data, **extra):
+        return self.client.post(url, data, content_type="application/json", **extra)
+
+    def patch(self, url, data, **extra):
+        return self.client.patch(url, data, content_type="application/json", **extra)
+
+    def create_task(self, **fields):
+        response = self.post("/api/tasks/", {"title": "t", "project_id": self.project.pk, **fields})
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def counters(self):
+        return Project.all_objects.filter(pk=self.project.pk).values(
+            "tasks_new", "tasks_in_progress", "tasks_testing", "tasks_review", "tasks_done", "tasks_done_late",
+            "tasks_archived", "participants_count",
+        ).get()
+
+
+class TaskCounterTests(ApiTestCase):
+    def columns(self):
+        counts = self.counters()
+        return {column: counts[f"tasks_{column}"] for column in ("new", "in_progress", "done")}
+
+    def test_create_move_delete(self):
+        task = self.create_task()
+        self.assertEqual(self.columns(), {"new": 1, "in_progress": 0, "done": 0})
+        self.patch(f"/api/tasks/{task['id']}/", {"column": "in_progress"})
+        self.assertEqual(self.columns(), {"new": 0, "in_progress": 1, "done": 0})
+        self.client.delete(f"/api/tasks/{task['id']}/")
+        self.assertEqual(self.columns(), {"new": 0, "in_progress": 0, "done": 0})
+
+    def test_done_late(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        task = self.create_task(due_date=str(yesterday))
+        self.patch(f"/api/tasks/{task['id']}/", {"column": "done"})
+        self.assertEqual((self.counters()["tasks_done"], self.counters()["tasks_done_late"]), (1, 1))
+        self.patch(f"/api/tasks/{task['id']}/", {"column": "review"})
+        self.assertEqual((self.counters()["tasks_done"], self.counters()["tasks_done_late"]), (0, 0))
+
+    def test_decrement_is_clamped(self):
+        # задача создана мимо API — счётчик её не видел, удаление не уводит его в минус
+        task = Task.objects.create(project=self.project, title="orm")
+        self.assertEqual(self.client.delete(f"/api/tasks/{task.pk}/").status_code, 204)
+        self.assertEqual(self.columns()["new"], 0)
+
+    def test_response_carries_fresh_counters(self):
+        task = self.create_task()
+        self.assertEqual(task["project"]["counters"]["new"], 1)
+        response = self.patch(f"/api/tasks/{task['id']}/", {"column": "done"})
+        counts = response.json()["project"]["counters"]
+        self.assertEqual((counts["new"], counts["done"]), (0, 1))
+
+    def test_participants_count(self):
+        mate = User.objects.create_user("mate")
+        self.project.participants.add(mate)
+        self.project.participants.remove(mate, self.user)
+        self.project.participants.remove(self.user)
+        self.assertEqual(self.counters()["participants_count"], 0)
+
+
+class OptimisticConcurrencyTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = self.create_task()
+        self.url = f"/api/tasks/{self.task['id']}/"
+
+    def test_etag_and_if_match(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["ETag"], '"1"')
+        response = self.patch(self.url, {"title": "mine"}, HTTP_IF_MATCH='"1"')
+        self.assertEqual((response.status_code, response["ETag"]), (200, '"2"'))
+        response = self.patch(self.url, {"title": "stale"}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(Task.objects.get(pk=self.task["id"]).title, "mine")
+
+    def test_delete_with_stale_if_match(self):
+        self.patch(self.url, {"title": "changed"})
+        self.assertEqual(self.client.delete(self.url, HTTP_IF_MATCH='"1"').status_code, 412)
+        self.assertEqual(self.client.delete(self.url, HTTP_IF_MATCH='"2"').status_code, 204)
+
+    def concurrent_move_to_done(self):
+        """Подменяет conditional_update: перед первой записью «другой запрос» переносит задачу в done."""
+        real = concurrency.conditional_update
+        calls = []
+
+        def racing(instance, fields, expected_version=None):
+            if not calls:
+                other = Task.objects.get(pk=instance.pk)
+                old = counters.task_state(other)
+                Task.objects.filter(pk=instance.pk).update(column="done", version=F("version") + 1)
+                counters.apply_task_change(old=old, new=counters.task_state(Task.objects.get(pk=instance.pk)))
+            calls.append(expected_version)
+            return real(instance, fields, expected_version)
+
+        return calls, racing
+
+    def test_lost_race_without_if_match_rereads_old_state(self):
+        calls, racing = self.concurrent_move_to_done()
+        with mock.patch("tasks.concurrency.conditional_update", racing):
+            response = self.patch(self.url, {"title": "renamed"})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(calls, [1, 2])
+        counts = self.counters()
+        self.assertEqual((counts["tasks_new"], counts["tasks_done"]), (0, 1))
+
+    def test_lost_race_with_if_match_is_412(self):
+        calls, racing = self.concurrent_move_to_done()
+        with mock.patch("tasks.concurrency.conditional_update", racing):
+            response = self.patch(self.url, {"title": "renamed"}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 412)
+
+    def test_delete_after_lost_race_uses_current_state(self):
+        calls, racing = self.concurrent_move_to_done()
+        with mock.patch("tasks.views.conditional_update", racing):
+            self.assertEqual(self.client.delete(self.url).status_code, 204)
+        counts = self.counters()
+        self.assertEqual((counts["tasks_new"], counts["tasks_done"]), (0, 0))
+
+
+class ThrottleTests(ApiTestCase):
+    def test_take_spends_and_refills(self):
+        bucket = caches["default"]
+        results = [throttling.take(bucket, "tb:test", rate=2.0, burst=3, now=100.0) for _ in range(4)]
+        self.assertEqual([allowed for allowed, _ in results], [True, True, True, False])
+        self.assertAlmostEqual(results[-1][1], 0.5)
+        # отказ не списывает токены: через полсекунды ровно один снова доступен
+        self.assertEqual(throttling.take(bucket, "tb:test", rate=2.0, burst=3, now=100.5), (True, 0.0))
+        self.assertFalse(throttling.take(bucket, "tb:test", rate=2.0, burst=3, now=100.5)[0])
+        # простой дольше ёмкости бакета не копит токены сверх BURST
+        allowed = [throttling.take(bucket, "tb:test", rate=2.0, burst=3, now=200.0)[0] for _ in range(4)]
+        self.assertEqual(allowed, [True, True, True, False])
+
+    def test_concurrent_takes_do_not_exceed_burst(self):
+        bucket = caches["default"]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: throttling.take(bucket, "tb:race", rate=0.01, burst=10)[0], range(40)))
+        self.assertEqual(results.count(True), 10)
+
+    @override_settings(RATE_LIMITS={"SCOPES": {"tasks": {"RATE": 0.5, "BURST": 2}}})
+    def test_api_returns_429_with_retry_after(self):
+        self.create_task()
+        self.create_task()
+        response = self.post("/api/tasks/", {"title": "third", "project_id": self.project.pk})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "2")
+        self.assertEqual(self.client.get("/api/tasks/").status_code, 200)   # чтение не ограничивается
+
+    def test_compression_slots_are_bounded(self):
+        with mock.patch.object(throttling, "_compression_slots", threading.BoundedSemaphore(1)):
+            with throttling.compression_slot():
+                with self.assertRaises(throttling.ServiceBusy) as busy:
+                    with throttling.compression_slot():
+                        pass
+            self.assertEqual(busy.exception.wait, 2)
+            with throttling.compression_slot():   # слот вернулся после выхода
+                pass
+
+
+class ColumnarBoardTests(ApiTestCase):
+    def test_board_in_columnar_format(self):
+        first = self.create_task(column="done", due_date="2026-01-01", responsible_id=self.user.pk)
+        self.create_task(parent_id=first["id"], due_date="2026-01-01")
+        response = self.client.get(f"/api/tasks/?project={self.project.pk}", HTTP_ACCEPT=columnar.MEDIA_TYPE)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith(columnar.MEDIA_TYPE))
+        data = response.json()
+        self.assertEqual((data["format"], data["count"]), (columnar.FORMAT, 2))
+        cols = data["columns"]
+        row = cols["id"].index(first["id"])
+        self.assertEqual(data["enums"]["column"][cols["column"][row]], "done")
+        self.assertEqual(data["dicts"]["date"], ["2026-01-01", str(timezone.localdate())])
+        self.assertEqual(data["dicts"]["users"][cols["responsible"][row]]["username"], "owner")
+        self.assertEqual(cols["subtasks"][row], [1, 0])
+
+    def test_only_for_list(self):
+        task = self.create_task()
+        response = self.client.get(f"/api/tasks/{task['id']}/", HTTP_ACCEPT=columnar.MEDIA_TYPE)
+        self.assertEqual(response.status_code, 406)
+
+
+class ParticipantsDeltaTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = f"/api/projects/{self.project.pk}/participants/"
+        self.alice = User.objects.create_user("alice")
+        self.bob = User.objects.create_user("bob")
+
+    def test_add_and_remove(self):
+        response = self.post(self.url, {"add": [self.alice.pk, self.bob.pk]})
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual((body["added"], body["participants_count"]), ([self.alice.pk, self.bob.pk], 3))
+        self.assertEqual(response["ETag"], f'"{body["version"]}"')
+        # уже участник / не участник — не считается изменением
+        body = self.post(self.url, {"add": [self.alice.pk], "remove": [self.bob.pk]}).json()
+        self.assertEqual((body["added"], body["removed"], body["participants_count"]), ([], [self.bob.pk], 2))
+        self.assertEqual(set(self.project.participants.values_list("username", flat=True)), {"owner", "alice"})
+        self.assertEqual(self.counters()["participants_count"], 2)
+
+    def test_count_is_clamped(self):
+        Project.objects.filter(pk=self.project.pk).update(participants_count=0)   # рассинхрон до reconcile
+        body = self.post(self.url, {"remove": [self.user.pk]}).json()
+        self.assertEqual((body["removed"], body["participants_count"]), ([self.user.pk], 0))
+
+    def test_if_match(self):
+        version = Project.objects.get(pk=self.project.pk).version
+        response = self.post(self.url, {"add": [self.alice.pk]}, HTTP_IF_MATCH=f'"{version}"')
+        self.assertEqual(response.status_code, 200)
+        response = self.post(self.url, {"add": [self.bob.pk]}, HTTP_IF_MATCH=f'"{version}"')
+        self.assertEqual(response.status_code, 412)
+        self.assertFalse(self.project.participants.filter(pk=self.bob.pk).exists())
+
+    def test_validation(self):
+        self.assertEqual(self.post(self.url, {}).status_code, 400)
+        self.assertEqual(self.post(self.url, {"add": [self.alice.pk], "remove": [self.alice.pk]}).status_code, 400)
+        response = self.post(self.url, {"add": [self.alice.pk, 999_999]})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.project.participants.filter(pk=self.alice.pk).exists())
+
+    def test_non_member_gets_404(self):
+        self.client.force_login(self.alice)
+        self.assertEqual(self.post(self.url, {"add": [self.alice.pk]}).status_code, 404)
+
+
+class ProjectDeletionTests(ApiTestCase):
+    def test_small_project_is_purged_inline(self):
+        task = self.create_task()
+        self.assertEqual(self.client.delete(f"/api/projects/{self.project.pk}/").status_code, 204)
+        self.assertFalse(Project.all_objects.filter(pk=self.project.pk).exists())
+        self.assertFalse(Task.objects.filter(pk=task["id"]).exists())
+        self.assertEqual(DeletionJob.objects.get().status, "done")
+
+    @override_settings(PROJECT_DELETION={"INLINE_MAX_TASKS": 2, "BATCH_SIZE": 2, "PAUSE": 0})
+    def test_large_project_is_purged_in_background(self):
+        parent = self.create_task()
+        for _ in range(2):
+            self.create_task(parent_id=parent["id"])
+        ArchivedTask.objects.create(original_id=10_000, project=self.project, title="old",
+                                    created_at=timezone.now())
+        response = self.client.delete(f"/api/projects/{self.project.pk}/")
+        self.assertEqual(response.status_code, 202)
+        job = response.json()
+        self.assertEqual((job["status"], job["total"], job["progress"]), ("pending", 3, 0))
+
+        # проект сразу не виден, хотя строки ещё на месте
+        self.assertEqual(self.client.get(f"/api/projects/{self.project.pk}/").status_code, 404)
+        self.assertEqual(self.client.get("/api/tasks/").json(), [])
+        self.assertEqual(Task.objects.filter(project_id=self.project.pk).count(), 3)
+
+        self.assertEqual(deletion.run_pending(), 1)
+        job = self.client.get(f"/api/deletions/{job['id']}/").json()
+        self.assertEqual((job["status"], job["purged"], job["progress"]), ("done", 4, 100))
+        self.assertFalse(Task.objects.filter(project_id=self.project.pk).exists())
+        self.assertFalse(ArchivedTask.objects.filter(project_id=self.project.pk).exists())
+        self.assertFalse(TaskClosure.objects.exists())
+        self.assertFalse(Project.all_objects.filter(pk=self.project.pk).exists())
+
+    def test_jobs_are_private(self):
+        self.client.delete(f"/api/projects/{self.project.pk}/")
+        self.client.force_login(User.objects.create_user("other"))
+        self.assertEqual(self.client.get("/api/deletions/").json(), [])
+
+
+class ProvisioningTests(ApiTestCase):
+    CSV = (
+        "username,email,display_name,role,projects\n"
+        "anna,anna@example.com,Анна,Дизайнер,{pk}\n"
+        "boris,not-an-email,,,\n"
+        "clara,,,,{pk};999999\n"
+    )
+
+    def provision(self, text, fmt="csv", **kwargs):
+        return provisioning.provision(io.BytesIO(text.encode()), fmt, **kwargs)
+
+    def test_csv_creates_users_profiles_and_memberships(self):
+        report = self.provision(self.CSV.format(pk=self.project.pk))
+        self.assertEqual((report["rows"], report["created"], report["skipped"]), (3, 2, 1))
+        self.assertEqual(report["errors"][0]["line"], 3)
+        self.assertEqual((report["memberships"], report["unknown_projects"]), (2, [999999]))
+        anna = User.objects.get(username="anna")
+        self.assertEqual((anna.email, anna.profile.display_name, anna.has_usable_password()),
+                         ("anna@example.com", "Анна", False))
+        self.assertTrue(self.project.participants.filter(username="clara").exists())
+        self.assertEqual(self.counters()["participants_count"], 3)
+
+    def test_update_touches_only_given_columns(self):
+        self.provision(self.CSV.format(pk=self.project.pk))
+        report = self.provision('{"username": "anna", "role": "Ведущий дизайнер"}\n', fmt="ndjson")
+        self.assertEqual((report["created"], report["updated"], report["memberships"]), (0, 1, 0))
+        anna = User.objects.get(username="anna")
+        self.assertEqual((anna.email, anna.profile.display_name, anna.profile.role),
+                         ("anna@example.com", "Анна", "Ведущий дизайнер"))
+
+    def test_queries_per_batch_do_not_grow_with_rows(self):
+        def queries(n, prefix):
+            rows = "".join(f"{prefix}{i},{prefix}{i}@example.com,{self.project.pk}\n" for i in range(n))
+            with CaptureQueriesContext(connection) as ctx:
+                self.provision("username,email,projects\n" + rows, batch_size=100)
+            return len(ctx)
+
+        self.assertEqual(queries(2, "a"), queries(20, "b"))
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8") as f:
+            f.write(self.CSV.format(pk=self.project.pk))
+        self.addCleanup(os.remove, f.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command("provision_users", f.name, stdout=out, stderr=err)
+        self.assertIn('"created": 2', out.getvalue())
+        self.assertIn("строка 3: email", err.getvalue())
+
+    def test_api_is_staff_only(self):
+        body = "username\ndora\n"
+        self.assertEqual(self.client.post("/api/users/provision/", body, content_type="text/csv").status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post("/api/users/provision/", body, content_type="text/csv")
+        self.assertEqual((response.status_code, response.json()["created"]), (200, 1))
+        response = self.client.post("/api/users/provision/", body, content_type="text/plain")
+        self.assertEqual(response.status_code, 400)
+
+
+class CalendarTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        Project.objects.filter(pk=self.project.pk).update(due_date=date(2026, 3, 10))
+        self.early = self.create_task(title="early", due_date="2026-03-02")
+        self.late = self.create_task(title="late", due_date="2026-03-10")
+        self.create_task(title="outside", due_date="2026-05-01")
+        self.create_task(title="no date")
+        foreign = Project.objects.create(title="foreign", due_date=date(2026, 3, 5))
+        Task.objects.create(project=foreign, title="foreign", due_date=date(2026, 3, 3))
+
+    def get(self, **params):
+        return self.client.get("/api/calendar/", params)
+
+    def test_days_and_milestones(self):
+        data = self.get(**{"from": "2026-03-01", "to": "2026-03-31"}).json()
+        self.assertEqual(data["count"], 2)
+        self.assertEqual([day["date"] for day in data["days"]], ["2026-03-02", "2026-03-10"])
+        self.assertEqual([t["title"] for t in data["days"][1]["tasks"]], ["late"])
+        self.assertEqual(data["days"][1]["milestones"], [self.project.pk])
+        self.assertEqual(list(data["projects"]), [str(self.project.pk)])   # чужой проект не виден
+
+    def test_default_window_starts_today(self):
+        data = self.get().json()
+        today = timezone.localdate()
+        self.assertEqual((data["from"], data["to"]), (str(today), str(today + timedelta(days=27))))
+
+    def test_window_limits(self):
+        self.assertEqual(self.get(**{"from": "2026-03-10", "to": "2026-03-01"}).status_code, 400)
+        self.assertEqual(self.get(**{"from": "2026-01-01", "to": "2026-04-02"}).status_code, 200)   # 92 дня
+        self.assertEqual(self.get(**{"from": "2026-01-01", "to": "2026-04-03"}).status_code, 400)
+        self.assertEqual(self.get(**{"from": "март"}).status_code, 400)
+        self.assertEqual(self.get(project="x").status_code, 400)
+
+    def test_foreign_project_is_empty_for_members_but_not_staff(self):
+        foreign = Project.objects.get(title="foreign")
+        params = {"from": "2026-03-01", "to": "2026-03-31", "project": foreign.pk}
+        self.assertEqual(self.get(**params).json()["days"], [])
+        self.user.is_staff = True
+        self.user.save()
+        data = self.get(**params).json()
+        self.assertEqual([day["date"] for day in data["days"]], ["2026-03-03", "2026-03-05"])
+
+
+class MyTasksTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        days = [date(2026, 3, d) for d in (5, 1, 3)] + [None, None]
+        self.expected = []
+        for i, due in enumerate(days):
+            task = Task.objects.create(project=self.project, title=f"t{i}", responsible=self.user, due_date=due)
+            self.expected.append((due is None, due or date.min, task.pk))
+        self.expected = [pk for *_, pk in sorted(self.expected)]
+        Task.objects.create(project=self.project, title="done", responsible=self.user, column="done")
+        Task.objects.create(project=self.project, title="nobody's")
+        other = Project.objects.create(title="other")
+        Task.objects.create(project=other, title="left project", responsible=self.user)
+
+    def test_first_page_per_column(self):
+        data = self.client.get("/api/tasks/mine/", {"limit": 2}).json()
+        columns = {c["column"]: c for c in data["columns"]}
+        self.assertEqual(list(columns), my_tasks.OPEN_COLUMNS)   # done не входит
+        new = columns["new"]
+        self.assertEqual((new["count"], [t["id"] for t in new["results"]]), (5, self.expected[:2]))
+        self.assertEqual((columns["review"]["count"], columns["review"]["next"]), (0, None))
+
+    def test_column_is_paged_by_cursor(self):
+        url = self.client.get("/api/tasks/mine/", {"limit": 2}).json()["columns"][0]["next"]
+        seen = []
+        while url:
+            page = self.client.get(url).json()["columns"][0]
+            self.assertIsNone(page["count"])
+            seen += [t["id"] for t in page["results"]]
+            url = page["next"]
+        self.assertEqual(seen, self.expected[2:])   # без срока — в конце, по id
+
+    def test_bad_params(self):
+        for params in ({"limit": "0"}, {"limit": "x"}, {"column": "done"}, {"column": "new", "cursor": "nope"}):
+            self.assertEqual(self.client.get("/api/tasks/mine/", params).status_code, 400, params)
+
+
+class AsyncViewTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mine = self.create_task(title="mine", responsible_id=self.user.pk, due_date="2020-01-01")
+        self.create_task(title="done", column="done")
+        foreign = Project.objects.create(title="foreign")
+        Task.objects.create(project=foreign, title="foreign")
+
+    def test_same_payload_as_drf_views(self):
+        for sync_url, async_url in (("/api/me/", "/api/async/me/"),
+                                    ("/api/tasks/", "/api/async/tasks/"),
+                                    ("/api/projects/", "/api/async/projects/")):
+            expected = self.client.get(sync_url).json()
+            response = self.client.get(async_url)
+            self.assertEqual(response.status_code, 200, async_url)
+            self.assertEqual(response.json(), expected, async_url)
+
+    def test_project_stats(self):
+        stats = self.client.get(f"/api/async/projects/{self.project.pk}/stats/").json()
+        self.assertEqual((stats["total_all"], stats["done_all"], stats["progress"]), (2, 1, 50))
+        self.assertEqual((stats["total_mine"], stats["new_mine"], stats["overdue_mine"]), (1, 1, 1))
+        foreign = Project.objects.get(title="foreign")
+        self.assertEqual(self.client.get(f"/api/async/projects/{foreign.pk}/stats/").status_code, 404)
+
+    def test_deleted_project_is_hidden(self):
+        Project.objects.filter(pk=self.project.pk).update(deleted_at=timezone.now())
+        self.assertEqual(self.client.get("/api/async/tasks/").json(), [])
+
+    def test_anonymous_and_unsafe_methods(self):
+        self.assertEqual(self.client.post("/api/async/tasks/").status_code, 405)
+        self.client.logout()
+        self.assertEqual(self.client.get("/api/async/me/").status_code, 401)
+        self.assertEqual(self.client.get("/api/async/tasks/").status_code, 403)
+
+    async def test_inside_event_loop(self):
+        # настоящий async-контекст: синхронный запрос к базе здесь — SynchronousOnlyOperation
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(f"/api/async/tasks/?project={self.project.pk}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+
+class MetricsTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+
+    def test_server_timing_and_registry(self):
+        response = self.client.get("/api/projects/")
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="[1-9]\d* queries", ser;dur=[\d.]+, app;dur=[\d.]+, total;dur=')
+        self.user.is_staff = True
+        self.user.save()
+        text = self.client.get("/api/_metrics").content.decode()
+        self.assertIn('kanban_requests_total{route="project-list",method="GET",status="200"} 1', text)
+        self.assertIn('kanban_request_db_queries_count{route="project-list",method="GET"} 1', text)
+        self.assertNotIn('route="metrics"', text)   # сам сбор метрик не считается
+
+    def test_metrics_are_staff_only(self):
+        self.assertEqual(self.client.get("/api/_metrics").status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.client.get("/api/_metrics").status_code, 403)
+        with override_settings(PERF_METRICS={"SCRAPE_IPS": ("10.0.5.12",)}):
+            self.assertEqual(self.client.get("/api/_metrics", REMOTE_ADDR="10.0.5.12").status_code, 200)
+            self.assertEqual(self.client.get("/api/_metrics").status_code, 403)
+
+
+class AuthCacheTests(ApiTestCase):
+    def test_warm_request_needs_no_auth_queries(self):
+        self.client.get("/api/me/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/me/")
+        self.assertEqual(response.json()["username"], "owner")
+
+    def test_profile_change_invalidates(self):
+        self.client.get("/api/me/")
+        profile = self.user.profile
+        profile.display_name = "Хозяин"
+        profile.save()
+        self.assertEqual(self.client.get("/api/me/").json()["display_name"], "Хозяин")
+
+    def test_membership_changes_invalidate(self):
+        other = Project.objects.create(title="other")
+        self.assertEqual(auth_cache.get_cached_user(self.user.pk)._project_ids, {self.project.pk})
+        other.participants.add(self.user)
+        self.assertEqual(auth_cache.get_cached_user(self.user.pk)._project_ids, {self.project.pk, other.pk})
+        self.user.projects.remove(self.project)
+        self.assertEqual(auth_cache.get_cached_user(self.user.pk)._project_ids, {other.pk})
+        other.participants.clear()
+        self.assertEqual(auth_cache.get_cached_user(self.user.pk)._project_ids, frozenset())
+
+    def test_deactivated_user_is_logged_out(self):
+        self.client.get("/api/me/")
+        User.objects.filter(pk=self.user.pk).update(is_active=False)   # мимо сигналов
+        auth_cache.invalidate(self.user.pk)
+        self.assertEqual(self.client.get("/api/me/").status_code, 401)
+
+
+class AdminTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user.is_staff = self.user.is_superuser = True
+        self.user.save()
+
+    def test_paginator_count_is_capped(self):
+        for i in range(4):
+            Project.objects.create(title=f"p{i}")
+        with mock.patch.object(EstimatedCountPaginator, "MAX_COUNT", 3):
+            self.assertEqual(EstimatedCountPaginator(Project.objects.order_by("id"), 2).count, 3)
+        self.assertEqual(EstimatedCountPaginator(Project.objects.order_by("id"), 2).count, 5)
+
+    def test_task_changelist_queries_do_not_grow(self):
+        def queries():
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get("/admin/tasks/task/").status_code, 200)
+            return len(ctx)
+
+        self.create_task(responsible_id=self.user.pk)
+        few = queries()
+        mate = User.objects.create_user("mate")
+        self.project.participants.add(mate)
+        for _ in range(5):
+            self.create_task(responsible_id=mate.pk)
+        self.assertEqual(queries(), few)
+
+    def test_search_and_autocomplete(self):
+        Project.objects.create(title="Roadmap")
+        response = self.client.get("/admin/tasks/project/", {"q": "road"})
+        self.assertContains(response, "Roadmap")
+        self.assertNotContains(response, ">board<")
+        response = self.client.get("/admin/autocomplete/", {
+            "app_label": "tasks", "model_name": "project", "field_name": "participants", "term": "own"})
+        self.assertEqual([r["text"] for r in response.json()["results"]], ["owner"])
+
+    def test_task_edits_keep_counters(self):
+        first, second = self.create_task(), self.create_task()
+        response = self.client.post(f"/admin/tasks/task/{first['id']}/change/", {
+            "title": "t", "description": "", "column": "in_progress", "position": 0, "priority": "medium",
+            "project": self.project.pk, "version": 1,
+        })
+        self.assertEqual(response.status_code, 302, response.content[:2000])
+        self.assertEqual((self.counters()["tasks_new"], self.counters()["tasks_in_progress"]), (1, 1))
+        self.client.post("/admin/tasks/task/", {
+            "action": "delete_selected", "_selected_action": [first["id"], second["id"]], "post": "yes"})
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual((self.counters()["tasks_new"], self.counters()["tasks_in_progress"]), (0, 0))
+
+
+class CompressionTests(ApiTestCase):
+    def test_choose_encoding(self):
+        self.assertEqual(compression.choose_encoding("gzip, deflate"), "gzip")
+        self.assertIsNone(compression.choose_encoding("gzip;q=0, identity"))
+        self.assertIsNone(compression.choose_encoding("*;q=0"))
+        self.assertIsNone(compression.choose_encoding(""))
+
+    def test_large_json_is_gzipped(self):
+        task = self.create_task(description="описание " * 300)
+        response = self.client.get(f"/api/tasks/{task['id']}/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(response["ETag"], f'W/"{task["version"]}"')   # тело другое — ETag слабый
+        self.assertEqual(json.loads(gzip.decompress(response.content))["id"], task["id"])
+
+    def test_small_and_excluded_responses_are_not_compressed(self):
+        self.assertFalse(self.client.get("/api/me/", HTTP_ACCEPT_ENCODING="gzip").has_header("Content-Encoding"))
+        with override_settings(RESPONSE_COMPRESSION={"MIN_SIZE": 0}):
+            self.client = self.client_class()
+            response = self.client.get("/api/csrf/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+
+class FastJSONTests(ApiTestCase):
+    def test_renderer_matches_drf(self):
+        data = {"n": Decimal("1.50"), "day": date(2026, 3, 1), 1: "ключ"}
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+    def test_bad_json_is_400(self):
+        response = self.client.post("/api/tasks/", "{нет", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("JSON parse error", response.json()["detail"])
+
+
+class FlowTests(ApiTestCase):
+    def transitions(self):
+        return list(TaskTransition.objects.order_by("id").values_list("from_column", "to_column"))
+
+    def test_transitions_are_logged(self):
+        task = self.create_task()
+        self.patch(f"/api/tasks/{task['id']}/", {"title": "без смены колонки"})
+        self.patch(f"/api/tasks/{task['id']}/", {"column": "in_progress"})
+        self.client.delete(f"/api/tasks/{task['id']}/")
+        self.assertEqual(self.transitions(), [("", "new"), ("new", "in_progress"), ("in_progress", "")])
+
+    def test_rollup_and_analytics(self):
+        today = timezone.localdate()
+        first, second = today - timedelta(days=2), today - timedelta(days=1)
+        a, b = self.create_task(), self.create_task()
+        self.patch(f"/api/tasks/{a['id']}/", {"column": "in_progress"})
+        self.patch(f"/api/tasks/{a['id']}/", {"column": "done"})
+        # события «в прошлом»: создание и старт — позавчера, выполнение — вчера
+        at = [(first, 10), (first, 10), (first, 11), (second, 11)]
+        for event, (day, hour) in zip(TaskTransition.objects.order_by("id"), at):
+            event.at = timezone.make_aware(datetime.combine(day, datetime.min.time()).replace(hour=hour))
+            event.save(update_fields=["at"])
+
+        self.assertEqual(flow.rollup(first, second), 2)
+        counts = {(row.day, row.column): (row.count, row.entered, row.exited) for row in FlowDay.objects.all()}
+        self.assertEqual(counts[first, "new"], (1, 2, 1))
+        self.assertEqual(counts[first, "in_progress"], (1, 1, 0))
+        self.assertEqual(counts[second, "in_progress"], (0, 0, 1))
+        self.assertEqual(counts[second, "done"], (1, 1, 0))
+        cycle = CycleTimeDay.objects.get()
+        self.assertEqual((cycle.day, cycle.throughput, cycle.cycle_p50, cycle.lead_p50), (second, 1, 24.0, 25.0))
+
+        response = self.client.get(f"/api/projects/{self.project.pk}/analytics/",
+                                   {"from": str(first), "to": str(second)})
+        data = response.json()
+        self.assertEqual([point["day"] for point in data["cfd"]], [str(first), str(second)])
+        self.assertEqual(data["cfd"][1]["counts"]["done"], 1)
+        self.assertEqual(data["cycle_time"][0]["lead"]["p95"], 25.0)
+
+    def test_analytics_range_is_validated(self):
+        url = f"/api/projects/{self.project.pk}/analytics/"
+        self.assertEqual(self.client.get(url, {"from": "2026-03-02", "to": "2026-03-01"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"from": "2024-01-01", "to": "2026-01-01"}).status_code, 400)
+
+
+class DeadlineDigestTests(ApiTestCase):
+    TODAY = date(2026, 3, 10)
+
+    def setUp(self):
+        super().setUp()
+        self.mate = User.objects.create_user("mate")
+        self.project.participants.add(self.mate)
+        task = partial(Task.objects.create, project=self.project, responsible=self.user)
+        self.soon = task(title="soon", due_date=date(2026, 3, 12))
+        self.late = task(title="late", due_date=date(2026, 3, 4))
+        task(title="far", due_date=date(2026, 3, 13))
+        task(title="forgotten", due_date=date(2026, 3, 2))                      # старше CATCH_UP_DAYS
+        task(title="done", due_date=date(2026, 3, 11), column="done")
+        Task.objects.create(project=self.project, title="nobody's", due_date=date(2026, 3, 11))
+        Project.objects.filter(pk=self.project.pk).update(due_date=date(2026, 3, 11))
+
+    def digest(self, user):
+        return {(item["target"], item["title"], item["kind"]) for item in
+                NotificationDigest.objects.filter(user=user).latest("id").items}
+
+    def test_one_digest_per_user(self):
+        self.assertEqual(deadlines.scan(self.TODAY), (3, 2))
+        self.assertEqual(self.digest(self.user), {
+            ("task", "soon", "due_soon"), ("task", "late", "overdue"), ("project", "board", "due_soon")})
+        self.assertEqual(self.digest(self.mate), {("project", "board", "due_soon")})
+
+    def test_rescan_is_idempotent_until_something_changes(self):
+        deadlines.scan(self.TODAY)
+        self.assertEqual(deadlines.scan(self.TODAY), (0, 0))
+        # сроки прошли — новые напоминания «просрочено»; far вошла в окно
+        self.assertEqual(deadlines.scan(date(2026, 3, 13)), (3, 2))
+        self.assertEqual(self.digest(self.user), {
+            ("task", "soon", "overdue"), ("task", "far", "due_soon"), ("project", "board", "overdue")})
+        # перенос срока — новое напоминание
+        Task.objects.filter(pk=self.soon.pk).update(due_date=date(2026, 3, 14))
+        self.assertEqual(deadlines.scan(date(2026, 3, 13)), (1, 1))
+        self.assertEqual(self.digest(self.user), {("task", "soon", "due_soon")})
+
+    def test_deleted_project_is_skipped(self):
+        Project.objects.filter(pk=self.project.pk).update(deleted_at=timezone.now())
+        self.assertEqual(deadlines.scan(self.TODAY), (0, 0))
+
+
+class LazyImportTests(ApiTestCase):
+    PROBE = """
+import sys, django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+loaded = {"drf_serializers": "rest_framework.serializers" in sys.modules}
+from django.urls import resolve
+resolve("/api/tasks/")
+loaded["pil"] = "PIL" in sys.modules
+print(loaded)
+"""
+
+    def test_worker_start_skips_pillow_and_drf(self):
+        result = subprocess.run(
+            [sys.executable, "-c", self.PROBE], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=120,
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": "kanban_backend.settings"},
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "{'drf_serializers': False, 'pil': False}")
+
+    def test_upload_is_compressed_on_demand(self):
+        from PIL import Image
+
+        task = self.create_task()
+        png = io.BytesIO()
+        Image.new("RGB", (3000, 1500), "navy").save(png, "PNG")
+        png.seek(0)
+        png.name = "big.png"
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            response = self.client.post("/api/task-images/", {"task": task["id"], "image": png})
+            self.assertEqual(response.status_code, 201, response.content)
+            image = TaskImage.objects.get()
+            self.assertTrue(image.image.name.endswith(".webp"))
+            with Image.open(image.image.path) as stored:
+                self.assertEqual(stored.size, (2560, 1280))
+
+
+@override_settings(MEDIA_GC={"CHUNK": 2, "GRACE_HOURS": 24, "QUARANTINE_DAYS": 7})
+class MediaGcTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.storage = FileSystemStorage(location=media.name)
+        task = Task.objects.create(project=self.project, title="t")
+        for i in range(3):
+            TaskImage.objects.create(task=task, image=f"tasks/ref{i}.webp", position=i)
+        ArchivedTask.objects.create(original_id=10_000, project=self.project, title="old", created_at=timezone.now(),
+                                    images=[{"image": "tasks/archived.webp", "position": 0}])
+        for name in ("ref0", "ref1", "ref2", "archived", "orphan", "fresh"):
+            self.write(f"tasks/{name}.webp", age=timedelta(hours=1 if name == "fresh" else 48))
+
+    def write(self, name, age):
+        self.storage.save(name, ContentFile(b"img"))
+        stamp = (timezone.now() - age).timestamp()
+        os.utime(self.storage.path(name), (stamp, stamp))
+
+    def test_orphans_go_to_quarantine_then_away(self):
+        report = media_gc.collect(dry_run=True, storage=self.storage)
+        self.assertEqual((report["scanned"], report["orphans"], report["skipped_recent"]), (6, 1, 1))
+        self.assertTrue(self.storage.exists("tasks/orphan.webp"))
+
+        report = media_gc.collect(storage=self.storage)
+        self.assertEqual((report["orphans"], report["orphan_bytes"], report["purged"]), (1, 3, 0))
+        self.assertFalse(self.storage.exists("tasks/orphan.webp"))
+        self.assertTrue(self.storage.exists("quarantine/tasks/orphan.webp"))
+        self.assertEqual(sorted(self.storage.listdir("tasks/")[1]),
+                         ["archived.webp", "fresh.webp", "ref0.webp", "ref1.webp", "ref2.webp"])
+
+        stamp = (timezone.now() - timedelta(days=8)).timestamp()
+        os.utime(self.storage.path("quarantine/tasks/orphan.webp"), (stamp, stamp))
+        report = media_gc.collect(storage=self.storage)
+        self.assertEqual((report["orphans"], report["purged"]), (0, 1))
+        self.assertFalse(self.storage.exists("quarantine/tasks/orphan.webp"))
+
+    def test_without_quarantine_deletes_at_once(self):
+        report = media_gc.collect(quarantine=False, storage=self.storage)
+        self.assertEqual(report["orphans"], 1)
+        self.assertFalse(self.storage.exists("tasks/orphan.webp"))
+        self.assertFalse(self.storage.exists("quarantine/tasks/orphan.webp"))
+
+    def test_row_delete_removes_file_after_commit(self):
+        with mock.patch("tasks.media_gc.default_storage", self.storage):
+            with self.captureOnCommitCallbacks(execute=True):
+                TaskImage.objects.get(image="tasks/ref0.webp").delete()
+            self.assertFalse(self.storage.exists("tasks/ref0.webp"))
+            with media_gc.keep_files(), self.captureOnCommitCallbacks(execute=True):
+                TaskImage.objects.get(image="tasks/ref1.webp").delete()
+            self.assertTrue(self.storage.exists("tasks/ref1.webp"))
+
+
+class SubtaskListTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.epic = self.create_task(title="epic")
+        self.create_task(title="a", parent_id=self.epic["id"])
+        self.create_task(title="b", parent_id=self.epic["id"], column="done")
+
+    def progress(self, rows):
+        return {row["id"]: row["subtasks"] for row in rows}[self.epic["id"]]
+
+    def test_list_rollup(self):
+        response = self.client.get(f"/api/tasks/?project={self.project.pk}")
+        self.assertEqual(self.progress(response.json()), {"total": 2, "done": 1, "progress": 50})
+
+    def test_async_list_rollup(self):
+        response = self.client.get(f"/api/async/tasks/?project={self.project.pk}")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.progress(response.json()), {"total": 2, "done": 1, "progress": 50})
+
+    def test_subtree(self):
+        response = self.client.get(f"/api/tasks/{self.epic['id']}/subtree/")
+        self.assertEqual([row["depth"] for row in response.json()], [1, 1])
+
+
+class UserDirectoryTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mate = User.objects.create_user("mate")
+        self.project.participants.add(self.mate)
+        self.stranger = User.objects.create_user("stranger")
+
+    def usernames(self, rows):
+        return sorted(row["username"] for row in rows)
+
+    def test_bare_list_is_scoped_to_co_members(self):
+        for url in ("/api/users/", "/api/async/users/"):
+            with self.subTest(url=url):
+                self.assertEqual(self.usernames(self.client.get(url).json()), ["mate", "owner"])
+
+    def test_search_is_scoped_and_paginated(self):
+        for url in ("/api/users/", "/api/async/users/"):
+            with self.subTest(url=url):
+                first = self.client.get(url, {"q": "", "limit": 1}).json()
+                self.assertEqual(self.usernames(first["results"]), ["mate"])
+                second = self.client.get(first["next"]).json()
+                self.assertEqual(self.usernames(second["results"]), ["owner"])
+                self.assertIsNone(second["next"])
+                self.assertEqual(self.client.get(url, {"q": "str"}).json()["results"], [])
+
+    def test_exact_lookup_finds_users_outside_shared_projects(self):
+        self.stranger.email = "Stranger@Example.com"
+        self.stranger.save()
+        for url in ("/api/users/", "/api/async/users/"):
+            with self.subTest(url=url):
+                self.assertEqual(self.usernames(self.client.get(url, {"exact": "STRANGER"}).json()), ["stranger"])
+                self.assertEqual(self.usernames(self.client.get(url, {"exact": "stranger@example.com"}).json()),
+                                 ["stranger"])
+                # только точное совпадение — не перебор по префиксу
+                self.assertEqual(self.client.get(url, {"exact": "strang"}).json(), [])
+                self.assertEqual(self.client.get(url, {"exact": " "}).json(), [])
+
+    def test_staff_sees_everyone(self):
+        self.user.is_staff = True
+        self.user.save()
+        for url in ("/api/users/", "/api/async/users/"):
+            with self.subTest(url=url):
+                self.assertEqual(self.usernames(self.client.get(url).json()), ["mate", "owner", "stranger"])
+
+
+class ArchiveTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.long_ago = timezone.localdate() - timedelta(days=90)
+
+    def test_moves_done_tasks_and_shifts_counters(self):
+        task = self.create_task(column="done", due_date=str(self.long_ago - timedelta(days=1)))
+        Task.objects.filter(pk=task["id"]).update(completed_at=self.long_ago)
+        self.create_task(column="new")
+
+        self.assertEqual(archive.archive_done_tasks(after_days=30, pause=0), 1)
+        self.assertTrue(ArchivedTask.objects.filter(original_id=task["id"]).exists())
+        self.assertFalse(Task.objects.filter(pk=task["id"]).exists())
+        counts = self.counters()
+        self.assertEqual((counts["tasks_new"], counts["tasks_done"], counts["tasks_done_late"],
+                          counts["tasks_archived"]), (1, 0, 0, 1))
+
+    def test_drifted_counters_are_clamped(self):
+        # задача создана мимо API — счётчики проекта её не видели
+        Task.objects.create(project=self.project, title="orm", column="done", completed_at=self.long_ago,
+                            due_date=self.long_ago - timedelta(days=1))
+        self.assertEqual(archive.archive_done_tasks(after_days=30, pause=0), 1)
+        counts = self.counters()
+        self.assertEqual((counts["tasks_done"], counts["tasks_done_late"], counts["tasks_archived"]), (0, 0, 1))
+
+    def test_list_is_scoped_and_paged_by_cursor(self):
+        other = Project.objects.create(title="чужой")
+        for n in range(3):
+            Task.objects.create(project=self.project, title=f"a{n}", column="done", completed_at=self.long_ago)
+        Task.objects.create(project=other, title="b", column="done", completed_at=self.long_ago)
+        self.assertEqual(archive.archive_done_tasks(after_days=30, pause=0), 4)
+
+        first = self.client.get(f"/api/tasks/archive/?project={self.project.pk}&limit=2").json()
+        self.assertEqual([t["title"] for t in first["results"]], ["a2", "a1"])
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([t["title"] for t in second["results"]], ["a0"])
+        self.assertIsNone(second["next"])
+        # без ?project= — только проекты, где пользователь участник
+        everything = self.client.get("/api/tasks/archive/").json()
+        self.assertEqual(len(everything["results"]), 3)
+        self.assertEqual(self.client.get("/api/tasks/archive/?project=x").status_code, 400)
+
+
+@override_settings(SHARDING=SHARDS)
+class ShardedTestCase(TransactionTestCase):
+    # fan_out ходит в шарды из потоков со своими соединениями — данные должны быть закоммичены
+    databases = {"default", SHARD}
+
+    def setUp(self):
+        for alias in sharding.shards():
+            sharding.reset_sequences(alias)
+        self.user = User.objects.create_user("owner", password="x")
+
+    def make_project(self, alias):
+        """Проект на шарде alias (новый проект получает SHARDS[id % 2] — переставляем директорию)."""
+        project = Project.objects.create(title=f"p-{alias}")
+        Project.objects.filter(pk=project.pk).update(shard=alias)
+        project.participants.add(self.user)
+        project.refresh_from_db()
+        sharding.forget(project.pk)
+        auth_cache.invalidate(self.user.pk)
+        return project
+
+    def make_task(self, project, **fields):
+        with sharding.use_shard(project.shard):
+            task = Task.objects.create(project=project, title=fields.pop("title", "t"), **fields)
+            subtasks.attach(task)
+        return task
+
+
+class MoveProjectTests(ShardedTestCase):
+    def test_moves_rows_and_keeps_ids_stamps_and_tree(self):
+        project = self.make_project("default")
+        root = self.make_task(project, title="root")
+        child = self.make_task(project, title="child", parent=root)
+        leaf = self.make_task(project, title="leaf", parent=child)
+        with sharding.use_shard("default"):
+            TaskImage.objects.create(task=child, image="tasks/child.webp")
+        old = datetime(2024, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc)
+        Task.objects.using("default").filter(project_id=project.pk).update(created_at=old, updated_at=old)
+
+        moved = sharding.move_project(project.pk, SHARD, grace=0, log=lambda message: None)
+
+        self.assertEqual(moved, (3, 1))
+        self.assertEqual(Project.objects.get(pk=project.pk).shard, SHARD)
+        self.assertFalse(Task.objects.using("default").filter(project_id=project.pk).exists())
+        tasks = {t.pk: t for t in Task.objects.using(SHARD).filter(project_id=project.pk)}
+        self.assertEqual(set(tasks), {root.pk, child.pk, leaf.pk})
+        self.assertEqual(tasks[leaf.pk].parent_id, child.pk)
+        for task in tasks.values():
+            self.assertEqual((task.created_at, task.updated_at), (old, old))
+        self.assertEqual(
+            set(TaskClosure.objects.using(SHARD).values_list("ancestor_id", "descendant_id", "depth")),
+            {(root.pk, child.pk, 1), (root.pk, leaf.pk, 2), (child.pk, leaf.pk, 1)},
+        )
+        self.assertEqual(TaskImage.objects.using(SHARD).get().task_id, child.pk)
+
+    def test_new_ids_stay_in_shard_block_after_move(self):
+        project = self.make_project("default")
+        self.make_task(project)
+        sharding.move_project(project.pk, SHARD, grace=0, log=lambda message: None)
+
+        # на target лежат id из блока default — новые задачи всё равно получают id из блока target
+        block = sharding.id_block(SHARD)
+        first = self.make_task(Project.objects.get(pk=project.pk))
+        second = self.make_task(Project.objects.get(pk=project.pk))
+        self.assertEqual((first.pk, second.pk), (block + 1, block + 2))
+
+
+class FanOutTests(ShardedTestCase):
+    def test_results_keyed_by_alias_in_order_and_pinned(self):
+        result = sharding.fan_out(lambda alias: (alias, sharding.current()), aliases=[SHARD, "default"])
+        self.assertEqual(list(result), [SHARD, "default"])
+        self.assertEqual(result, {SHARD: (SHARD, SHARD), "default": ("default", "default")})
+
+    def test_merged_column_is_ordered_across_shards(self):
+        here, there = self.make_project("default"), self.make_project(SHARD)
+        days = [date(2026, 1, 5), None, date(2026, 1, 1), date(2026, 1, 3), None, date(2026, 1, 1)]
+        created = [
+            self.make_task(project, responsible=self.user, due_date=day)
+            for project, day in zip([here, there] * 3, days)
+        ]
+        expected = sorted(created, key=lambda t: (t.due_date is None, t.due_date or date.min, t.pk))
+
+        first = my_tasks.first_pages(self.user, limit=4)["new"]
+        self.assertEqual(first[0], 6)
+        self.assertEqual([t.pk for t in first[1]], [t.pk for t in expected[:4]])
+        self.assertTrue(first[2])
+
+        cursor = my_tasks.decode_cursor(my_tasks.encode_cursor(first[1][-1]))
+        rest, more = my_tasks.column_page(self.user, "new", cursor, limit=4)
+        self.assertEqual([t.pk for t in rest], [t.pk for t in expected[4:]])
+        self.assertFalse(more)
+
+
+class QueryWatchTests(SimpleTestCase):
+    def log(self):
+        return querywatch.QueryLog({**querywatch.DEFAULTS, "N_PLUS_ONE_THRESHOLD": 3})
+
+    def test_repeated_shape_is_reported(self):
+        log = self.log()
+        for _ in range(3):
+            log.record('SELECT "tasks_task"."id" FROM "tasks_task" WHERE "id" IN (%s, %s)', 0)
+        with self.assertLogs("tasks.querywatch", "WARNING") as logs:
+            log.report("GET tasks-list")
+        self.assertIn("3 одинаковых запросов", logs.output[0])
+        self.assertIn("IN (...)", logs.output[0])
+
+    def test_transaction_statements_are_not_n_plus_one(self):
+        log = self.log()
+        for i in range(5):
+            for sql in ("BEGIN", f'SAVEPOINT "s1_x{i}"', f'RELEASE SAVEPOINT "s1_x{i}"',
+                        f'ROLLBACK TO SAVEPOINT "s1_x{i}"', "COMMIT"):
+                log.record(sql, 0)
+        self.assertEqual(log.counts, {})
+        with self.assertNoLogs("tasks.querywatch", "WARNING"):
+            log.report("POST tasks-list")
+
+
+@override_settings(READ_REPLICAS={"ALIASES": ("replica",), "LAG_CHECK_INTERVAL": 60})
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        replicas._health.clear()
+        self.addCleanup(replicas._health.clear)
+        self.router = replicas.ReplicaRouter()
+
+    def route(self, state):
+        token = replicas._state.set(state)
+        self.addCleanup(replicas._state.reset, token)
+
+    @mock.patch("tasks.replicas.replica_lag", return_value=0.5)
+    def test_reads_go_to_replica_until_first_write(self, lag):
+        self.assertIsNone(self.router.db_for_read(Task))   # вне запроса — primary
+        self.route(replicas._RouteState(use_replica=True))
+        self.assertEqual(self.router.db_for_read(Task), "replica")
+        self.router.db_for_write(Task)
+        self.assertIsNone(self.router.db_for_read(Task))
+        self.assertEqual(lag.call_count, 1)
+
+    def test_unhealthy_replica_is_skipped_and_cached(self):
+        config = replicas.get_config()
+        with mock.patch("tasks.replicas.replica_lag", return_value=5.0) as lag, \
+                self.assertLogs("tasks.replicas", "WARNING"):
+            self.assertEqual(replicas.choose_replica(config), "default")
+            self.assertEqual(replicas.choose_replica(config), "default")
+        self.assertEqual(lag.call_count, 1)   # не чаще LAG_CHECK_INTERVAL
+        replicas._health.clear()
+        with mock.patch("tasks.replicas.replica_lag", side_effect=DatabaseError("down")), \
+                self.assertLogs("tasks.replicas", "WARNING"):
+            self.assertFalse(replicas.is_healthy("replica", config))
+
+    def test_pin_cookie(self):
+        factory = RequestFactory()
+
+        def middleware(view):
+            return replicas.ReplicaRoutingMiddleware(lambda request: view(request) or HttpResponse())
+
+        reading = middleware(lambda request: self.assertTrue(replicas._state.get().use_replica))
+        self.assertNotIn("kanban_primary", reading(factory.get("/")).cookies)
+        self.assertIn("kanban_primary", middleware(lambda r: None)(factory.post("/")).cookies)
+        writing = middleware(lambda request: self.router.db_for_write(Task))
+        self.assertIn("kanban_primary", writing(factory.get("/")).cookies)
+        # с пином GET читает с primary
+        pinned = factory.get("/")
+        pinned.COOKIES["kanban_primary"] = "1"
+        middleware(lambda request: self.assertFalse(replicas._state.get().use_replica))(pinned)
+
+
+class LoadTestHarnessTests(SimpleTestCase):
+    def test_short_asgi_run(self):
+        """Прогон bench/loadtest.py на in-process ASGI: сценарии фронтенда проходят без ошибок."""
+        result = subprocess.run(
+            [sys.executable, "bench/loadtest.py", "run", "--users", "2", "--duration", "2",
+             "--ramp-up", "0", "--think-time", "0.05"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=300,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        rows = {line[:30].strip(): line[30:].split() for line in result.stdout.splitlines()[2:]}
+        self.assertEqual(rows["POST /api/login/"][:2], ["2", "0.0"])
+        self.assertIn("GET /api/tasks/?project=[id]", rows)
+        self.assertEqual(rows["TOTAL"][1], "0.0")
+
+
+class CheckConfigTests(SimpleTestCase):
+    @override_settings(SHARDING={"SHARDS": ["default", "missing"]})
+    def test_unknown_alias(self):
+        with self.assertRaises(ImproperlyConfigured):
+            sharding.check_config()
+
+    @override_settings(SHARDING=SHARDS)
+    def test_supported_vendors(self):
+        sharding.check_config()
@@ -0,0 +1,147 @@
+# tasks/throttling.py
+"""
+Ограничение частоты записи и загрузок + обратное давление на сжатие картинок.
+
+TokenBucketThrottle — DRF-троттлинг на токен-бакетах в общем кэше (GCRA:
+в кэше одно число — «теоретическое время прихода» следующего запроса).
+Лимиты задаются на класс эндпоинта через `throttle_scope` вьюсета и
+settings.RATE_LIMITS["SCOPES"]: RATE — токенов в секунду, BURST — ёмкость
+бакета. Ключ — пользователь (или IP для анонимов) + scope. Читающие методы
+не ограничиваются. Загрузка стоит 1 + Content-Length / BYTES_PER_TOKEN токенов
+(тело к этому моменту ещё не разобрано).
+
+В кэше TAT хранится целым числом миллисекунд и двигается только атомарными
+cache.add / cache.incr / cache.decr: одновременные запросы не перетирают друг
+друга (get + set пропускал бы сверх лимита по запросу на каждую гонку).
+Отказ возвращает списанное через decr. Стоимость — 2–3 обращения к кэшу
+(микросекунды на LocMem, ~0.5 мс на Redis). Лимит общий ровно настолько,
+насколько общий кэш: с LocMem у каждого процесса свои бакеты, поэтому при
+нескольких воркерах RATE_LIMITS["CACHE"] должен указывать на Redis/Memcached.
+
+compression_slot() — не больше UPLOAD_CONCURRENCY одновременных сжатий
+на процесс; сверх этого — 503 с Retry-After, а не очередь, съедающая воркеры.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+DEFAULTS = {
+    "ENABLED": True,
+    "CACHE": "default",
+    "SCOPES": {},
+    "UPLOAD_CONCURRENCY": 2,
+    "BUSY_RETRY_AFTER": 2,
+}
+
+KEY = "tb:{}:{}"
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "RATE_LIMITS", {})}
+
+
+# ключ может истечь между add и incr — тогда повторяем
+TAKE_ATTEMPTS = 3
+
+
+def take(cache, key, rate, burst, cost=1.0, now=None):
+    """
+    Списывает cost токенов. Возвращает (разрешено, сколько секунд ждать).
+    GCRA: tat — момент (мс), когда бакет снова будет полон.
+    """
+    now_ms = int((time.time() if now is None else now) * 1000)
+    step = max(1, round(cost * 1000 / rate))
+    burst_ms = burst * 1000 / rate
+    for _ in range(TAKE_ATTEMPTS):
+        cache.add(key, now_ms, math.ceil(burst_ms / 1000) + 1)
+        try:
+            tat = cache.incr(key, step)
+            if tat - step < now_ms:
+                # бакет был полон: отсчёт от «сейчас», а не от давнего tat
+                tat = cache.incr(key, now_ms - (tat - step))
+        except ValueError:
+            continue
+        allow_at = tat - burst_ms
+        if now_ms < allow_at:
+            cache.decr(key, step)
+            return False, (allow_at - now_ms) / 1000
+        cache.touch(key, math.ceil((tat - now_ms) / 1000) + 1)
+        return True, 0.0
+    return True, 0.0   # кэш не удерживает ключ — лучше пропустить, чем заблокировать всех
+
+
+class TokenBucketThrottle(BaseThrottle):
+    def __init__(self):
+        self.config = get_config()
+        self._wait = None
+
+    def get_cost(self, request, rule):
+        per_token = rule.get("BYTES_PER_TOKEN")
+        if not per_token:
+            return 1.0
+        try:
+            size = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            size = 0
+        return 1.0 + size / per_token
+
+    def allow_request(self, request, view):
+        if not self.config["ENABLED"] or request.method in SAFE_METHODS:
+            return True
+        scope = getattr(view, "throttle_scope", None)
+        rule = self.config["SCOPES"].get(scope)
+        if not rule:
+            return True
+        user = request.user
+        ident = user.pk if user and user.is_authenticated else f"ip:{self.get_ident(request)}"
+        burst = rule["BURST"]
+        cost = min(self.get_cost(request, rule), burst)   # дороже полного бакета не бывает
+        allowed, self._wait = take(caches[self.config["CACHE"]], KEY.format(scope, ident),
+                                   rule["RATE"], burst, cost)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class ServiceBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Сервер занят обработкой изображений, повторите позже."
+    default_code = "service_busy"
+
+    def __init__(self, wait):
+        super().__init__()
+        self.wait = wait   # DRF exception_handler превращает в Retry-After
+
+
+_compression_slots = None
+_slots_lock = threading.Lock()
+
+
+def _slots(config):
+    global _compression_slots
+    if _compression_slots is None:
+        with _slots_lock:
+            if _compression_slots is None:
+                _compression_slots = threading.BoundedSemaphore(config["UPLOAD_CONCURRENCY"])
+    return _compression_slots
+
+
+@contextmanager
+def compression_slot():
+    config = get_config()
+    slots = _slots(config)
+    if not slots.acquire(blocking=False):
+        raise ServiceBusy(config["BUSY_RETRY_AFTER"])
+    try:
+        yield
+    finally:
+        slots.release()
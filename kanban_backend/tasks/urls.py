@@ -1,17 +1,34 @@
 # tasks/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TaskViewSet, TaskImageViewSet, users_list, me, login, logout, ProjectViewSet
+from .views import (TaskViewSet, TaskImageViewSet, users_list, me, login, logout, ProjectViewSet, DeletionJobViewSet,
+                    calendar_view, provision_users)
+from . import async_views
+from .metrics import metrics_view
 
 router = DefaultRouter()
 router.register(r"projects", ProjectViewSet, basename="project")
 router.register(r"tasks", TaskViewSet, basename="task")
 router.register(r"task-images", TaskImageViewSet, basename="task-image")
+router.register(r"deletions", DeletionJobViewSet, basename="deletion")
+
+# async-версии горячих GET-эндпоинтов (обслуживаются через asgi.py)
+async_urlpatterns = [
+    path("me/", async_views.me, name="async-me"),
+    path("users/", async_views.users_list, name="async-users-list"),
+    path("tasks/", async_views.task_list, name="async-task-list"),
+    path("projects/", async_views.project_list, name="async-project-list"),
+    path("projects/<int:pk>/stats/", async_views.project_stats, name="async-project-stats"),
+]
 
 urlpatterns = [
     path("users/", users_list, name="users-list"),
+    path("users/provision/", provision_users, name="users-provision"),
     path("me/", me, name="me"),
     path("login/", login, name="login"),
     path("logout/", logout, name="logout"),
+    path("calendar/", calendar_view, name="calendar"),
+    path("_metrics", metrics_view, name="metrics"),
+    path("async/", include(async_urlpatterns)),
     path("", include(router.urls)),
 ]
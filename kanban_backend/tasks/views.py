@@ -1,93 +1,43 @@
 # tasks/views.py
-from django.db import transaction
-from django.db.models import Max, F
+from itertools import chain
+
+from django.db.models import Max, F, Q
 from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
 from django.middleware.csrf import get_token
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login as dj_login, logout as dj_logout
 
 from rest_framework import viewsets, permissions, status, parsers
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import api_view, permission_classes, parser_classes, action
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
 
 from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
-from .models import Task, TaskImage, Project   # <- ВАЖНО: Project из models
+from .models import ArchivedTask, DeletionJob, Task, TaskImage, Project   # <- ВАЖНО: Project из models
+from . import (auth_cache, calendar, columnar, counters, deletion, flow, my_tasks, participants, provisioning,
+               sharding, subtasks, throttling)
+from .concurrency import ConditionalUpdateMixin, PreconditionFailed, conditional_update, etag, parse_if_match
+from .columnar import ColumnarTaskRenderer
+from .pagination import ArchivePagination, UserDirectoryPagination
+from .shard_api import ShardedViewMixin
 from .serializers import (                     # <- ВАЖНО: ProjectSerializer из serializers
     TaskSerializer,
     TaskImageSerializer,
     UserSerializer,
     ProjectSerializer,
+    ArchivedTaskSerializer,
+    DeletionJobSerializer,
+    ParticipantsDeltaSerializer,
+    TaskBriefSerializer,
 )
 
-# === Pillow-based compression ===
-from io import BytesIO
-from django.core.files.uploadedfile import InMemoryUploadedFile
-from PIL import Image
-import os
-import uuid
-
-MAX_SIDE = 2560
-WEBP_QUALITY = 82
-PNG_COMPRESS_LEVEL = 6
-
-def _has_alpha(pil: Image.Image) -> bool:
-    return pil.mode in ("RGBA", "LA") or (pil.mode == "P" and "transparency" in pil.info)
-
-def _resize_down(pil: Image.Image) -> Image.Image:
-    w, h = pil.size
-    long_side = max(w, h)
-    if long_side <= MAX_SIDE:
-        return pil
-    scale = MAX_SIDE / float(long_side)
-    new_size = (int(w * scale), int(h * scale))
-    return pil.resize(new_size, Image.Resampling.LANCZOS)
-
-def compress_image_to_best(file_obj, prefer_webp=True):
-    file_obj.seek(0)
-    with Image.open(file_obj) as im:
-        im.load()
-        im.info.pop("icc_profile", None)
-        im.info.pop("exif", None)
-
-        has_alpha = _has_alpha(im)
-        im = _resize_down(im)
-
-        buffer = BytesIO()
-        orig_name = getattr(file_obj, "name", f"upload_{uuid.uuid4().hex}")
-        base, _ext = os.path.splitext(orig_name)
-
-        if has_alpha:
-            if im.mode not in ("RGBA", "LA"):
-                im = im.convert("RGBA")
-            im.save(buffer, format="PNG", optimize=True, compress_level=PNG_COMPRESS_LEVEL)
-            new_ext = ".png"
-        else:
-            if im.mode != "RGB":
-                im = im.convert("RGB")
-            if prefer_webp:
-                im.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=6)
-                new_ext = ".webp"
-            else:
-                im.save(buffer, format="JPEG", quality=86, optimize=True, progressive=True)
-                new_ext = ".jpg"
-
-        buffer.seek(0)
-        new_name = f"{base}{new_ext}"
-        content_type = "image/png" if new_ext == ".png" else ("image/webp" if new_ext == ".webp" else "image/jpeg")
-
-        return InMemoryUploadedFile(
-            file=buffer,
-            field_name="image",
-            name=new_name,
-            content_type=content_type,
-            size=buffer.getbuffer().nbytes,
-            charset=None,
-        ), new_name
-
-
 # ---- Auth / CSRF / Me ----
 @api_view(["GET"])
 @permission_classes([permissions.AllowAny])
@@ -122,26 +72,141 @@ def logout(request):
     dj_logout(request)
     return Response({"detail": "ok"}, status=200)
 
+def user_directory_queryset(user, q=""):
+    """
+    Пользователи, с которыми caller делит хотя бы один проект (staff видит всех),
+    с префиксным поиском по username и display_name.
+    """
+    qs = User.objects.select_related("profile")
+    if not (user.is_superuser or user.is_staff):
+        shared = Project.participants.through.objects.filter(
+            project_id__in=auth_cache.member_project_ids(user)
+        ).values("user_id")
+        qs = qs.filter(Q(pk=user.pk) | Q(pk__in=shared))
+    if q:
+        qs = qs.filter(Q(username__istartswith=q) | Q(profile__display_name__istartswith=q))
+    return qs
+
+
+def user_lookup_queryset(value):
+    """
+    Точное совпадение username или email без учёта регистра — чтобы добавить в проект
+    коллегу, с которым ещё нет общих проектов (в справочник ?q= он не попадает).
+    Индексы — auth_user_username_* (0014) и auth_user_email_* (0027).
+    """
+    value = value.strip()
+    if not value:
+        return User.objects.none()
+    return User.objects.select_related("profile").filter(Q(username__iexact=value) | Q(email__iexact=value))
+
+
+DIRECTORY_PARAMS = {"q", "limit", "cursor"}
+
+
+def directory_page(request):
+    """Страница справочника {"next", "previous", "results"} для DRF-запроса (её же отдаёт async-вьюха)."""
+    q = (request.query_params.get("q") or "").strip()
+    paginator = UserDirectoryPagination()
+    page = paginator.paginate_queryset(user_directory_queryset(request.user, q), request)
+    data = UserSerializer(page, many=True, context={"request": request}).data
+    return paginator.get_paginated_response(data).data
+
+
 @api_view(["GET"])
 @permission_classes([permissions.IsAuthenticated])
 def users_list(request):
+    """
+    GET /api/users/?project=<id>          -> участники проекта (массив)
+    GET /api/users/?q=<префикс>[&limit=N] -> справочник: поиск + курсорная пагинация
+                                             {"next", "previous", "results"}
+    GET /api/users/?exact=<username|email> -> точное совпадение среди всех (массив, обычно 0-1)
+    GET /api/users/                        -> массив без пагинации, только для совместимости: те же, кого
+                                             видно в справочнике (участники общих проектов; staff — все).
+                                             Пикеры фронтенда ходят в ?q= (src/api/users.js)
+    """
     project_id = request.query_params.get("project")
     if project_id:
         try:
             project = Project.objects.get(pk=project_id)
         except Project.DoesNotExist:
             return Response({"detail":"Проект не найден"}, status=404)
-        qs = project.participants.all().order_by("id")
+        qs = project.participants.select_related("profile").order_by("id")
+    elif "exact" in request.query_params:
+        qs = user_lookup_queryset(request.query_params["exact"]).order_by("id")
+    elif DIRECTORY_PARAMS & request.query_params.keys():
+        return Response(directory_page(request))
     else:
-        # если нужно — ограничьте по участию в ЛЮБЫХ проектах пользователя
-        qs = User.objects.all().order_by("id")
+        qs = user_directory_queryset(request.user).order_by("id")
     data = UserSerializer(qs, many=True, context={"request": request}).data
     return Response(data)
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+PROVISIONING_CONTENT_TYPES = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAdminUser])
+@parser_classes([parsers.MultiPartParser])
+def provision_users(request):
+    """
+    POST /api/users/provision/ — массовая загрузка пользователей (tasks/provisioning.py), только staff.
+    Тело — CSV (Content-Type: text/csv) или NDJSON (application/x-ndjson) как есть, читается
+    построчно; либо multipart с файлом в поле file (формат — по расширению или полю format).
+    """
+    content_type = request.content_type.split(";")[0].strip()
+    if content_type == "multipart/form-data":
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": "Нет файла"})
+        fmt = request.data.get("format") or provisioning.guess_format(upload.name)
+        stream = upload
+    else:
+        fmt = PROVISIONING_CONTENT_TYPES.get(content_type)
+        stream = request.stream or []
+    if fmt not in provisioning.FORMATS:
+        raise ValidationError({"format": "Ожидается CSV (text/csv) или NDJSON (application/x-ndjson)"})
+    return Response(provisioning.provision(stream, fmt))
+
+
+def _date_param(request, param, default):
+    """?from=/?to= в формате YYYY-MM-DD или default."""
+    value = request.query_params.get(param)
+    if value is None:
+        return default
+    try:
+        day = parse_date(value)
+    except ValueError:   # формат верный, даты нет (2025-02-30)
+        day = None
+    if day is None:
+        raise ValidationError({param: "Ожидается дата YYYY-MM-DD"})
+    return day
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def calendar_view(request):
+    """
+    GET /api/calendar/?from=YYYY-MM-DD&to=YYYY-MM-DD[&project=<id>]
+    Задачи со сроком в окне и сроки проектов по дням (tasks/calendar.py).
+    Без ?from= — с сегодняшнего дня, без ?to= — DEFAULT_DAYS дней.
+    """
+    config = calendar.get_config()
+    since = _date_param(request, "from", timezone.localdate())
+    until = _date_param(request, "to", since + timedelta(days=config["DEFAULT_DAYS"] - 1))
+    if since > until:
+        raise ValidationError({"from": "Начало периода позже конца"})
+    if (until - since).days >= config["MAX_DAYS"]:
+        raise ValidationError({"to": f"Период не больше {config['MAX_DAYS']} дней"})
+    project_id = request.query_params.get("project")
+    if project_id is not None and not project_id.isdigit():
+        raise ValidationError({"project": "Ожидается id проекта"})
+    return Response(calendar.window(request.user, since, until, project_id and int(project_id)))
+
+
+class ProjectViewSet(ConditionalUpdateMixin, viewsets.ModelViewSet):
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "projects"
 
     def get_queryset(self):
         user = self.request.user
@@ -154,64 +219,300 @@ class ProjectViewSet(viewsets.ModelViewSet):
         ctx["request"] = self.request
         return ctx
 
-    @action(detail=True, methods=["get"], permission_classes=[permissions.IsAuthenticated])
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        # participants_count обновился F()-апдейтом в m2m_changed — подтягиваем в ответ
+        serializer.instance.refresh_from_db(fields=["participants_count"])
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        serializer.instance.refresh_from_db(fields=["participants_count"])
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        Проект сразу пропадает из API; задачи и прочее удаляются пачками (tasks/deletion.py).
+        Маленький проект — 204 как раньше, большой — 202 с заданием (GET /api/deletions/<id>/).
+        """
+        job = deletion.delete_project(self.get_object(), user=request.user)
+        if job.status == "done":
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(DeletionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["get", "post"], permission_classes=[permissions.IsAuthenticated])
     def participants(self, request, pk=None):
+        """
+        GET  — участники проекта.
+        POST {"add": [id, ...], "remove": [id, ...]} [If-Match] — изменить состав дельтой
+             (tasks/participants.py): {"added", "removed", "participants_count", "version"}.
+        """
         project = self.get_object()
-        data = UserSerializer(project.participants.all().order_by("id"),
-                              many=True, context={"request": request}).data
-        return Response(data)
+        if request.method == "GET":
+            data = UserSerializer(project.participants.all().order_by("id"),
+                                  many=True, context={"request": request}).data
+            return Response(data)
+        delta = ParticipantsDeltaSerializer(data=request.data)
+        delta.is_valid(raise_exception=True)
+        try:
+            added, removed = participants.apply_delta(
+                project, delta.validated_data["add"], delta.validated_data["remove"],
+                expected_version=parse_if_match(request.headers.get("If-Match")),
+            )
+        except participants.UnknownUsers as exc:
+            raise ValidationError({"detail": f"Пользователи не найдены: {exc.ids}"})
+        response = Response({"added": added, "removed": removed,
+                             "participants_count": project.participants_count, "version": project.version})
+        response["ETag"] = etag(project.version)
+        return response
+
+    @action(detail=True, methods=["get"])
+    def analytics(self, request, pk=None):
+        """
+        GET /api/projects/<id>/analytics/?from=YYYY-MM-DD&to=YYYY-MM-DD
+        CFD и cycle/lead time из суточных сводок (tasks/flow.py); по умолчанию — 30 дней.
+        """
+        project = self.get_object()
+        until = _date_param(request, "to", timezone.localdate() - timedelta(days=1))
+        since = _date_param(request, "from", until - timedelta(days=29))
+        if since > until:
+            raise ValidationError({"from": "Начало периода позже конца"})
+        if (until - since).days > 366:
+            raise ValidationError({"from": "Период не больше года"})
+        return Response(flow.project_analytics(project, since, until))
+
+class DeletionJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """GET /api/deletions/[<id>/] — фоновые удаления проектов, свои (staff — все)."""
+    serializer_class = DeletionJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        qs = DeletionJob.objects.order_by("-id")
+        if user.is_superuser or user.is_staff:
+            return qs
+        return qs.filter(requested_by=user)
 
 # --- Задачи ---
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ShardedViewMixin, ConditionalUpdateMixin, viewsets.ModelViewSet):
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "tasks"
+    # Accept: application/vnd.kanban.columnar+json — компактная доска (tasks/columnar.py)
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, ColumnarTaskRenderer]
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.action != "list":
+            renderers = [r for r in renderers if not isinstance(r, ColumnarTaskRenderer)]
+        return renderers
+
+    def list(self, request, *args, **kwargs):
+        columnar_format = request.accepted_renderer.format == ColumnarTaskRenderer.format
+        if sharding.is_sharded() and sharding.current() is None and "project" not in request.query_params:
+            if columnar_format:
+                raise ValidationError({"project": "Компактный формат — только для доски проекта (?project=)"})
+            return self.list_all_shards()
+        qs = self.filter_queryset(self.get_queryset())
+        if columnar_format:
+            return Response(columnar.encode_tasks(qs, request))
+        page = self.paginate_queryset(qs)
+        tasks = list(page if page is not None else qs)
+        serializer = self.get_serializer(tasks, many=True, context=self._rollup_context(tasks))
+        return self.get_paginated_response(serializer.data) if page is not None else Response(serializer.data)
+
+    def _rollup_context(self, tasks, rollup=None):
+        """Контекст списка: прогресс подзадач одним запросом (TaskListSerializer сам не считает)."""
+        if rollup is None:
+            rollup = subtasks.rollup([t.pk for t in tasks])
+        return {**self.get_serializer_context(), "subtask_rollup": rollup}
+
+    def list_all_shards(self):
+        """Задачи из всех проектов пользователя: по запросу на шард параллельно, слияние по (position, id)."""
+        qs = self.filter_queryset(self.get_queryset())
+
+        def shard_tasks(alias):
+            tasks = [t for t in qs.using(alias) if sharding.owns(alias, t.project_id)]
+            return tasks, subtasks.rollup([t.pk for t in tasks])   # closure — на том же шарде
+
+        per_shard = sharding.fan_out(shard_tasks).values()
+        tasks = sorted(chain.from_iterable(t for t, _ in per_shard), key=lambda t: (t.position, t.pk))
+        rollup = {k: v for _, shard_rollup in per_shard for k, v in shard_rollup.items()}
+        return Response(self.get_serializer(tasks, many=True, context=self._rollup_context(tasks, rollup)).data)
 
     def get_queryset(self):
         user = self.request.user
-        qs = (Task.objects.select_related("responsible","project")
-              .prefetch_related("images"))
-        if user.is_superuser or user.is_staff:
-            pass
-        else:
-            qs = qs.filter(project__participants=user)
+        # без JOIN на participants: проекты пользователя уже в auth-кэше,
+        # а project и responsible при шардировании живут в другой базе
+        qs = sharding.join(Task.objects, "responsible", "project").prefetch_related("images")
+        if not (user.is_superuser or user.is_staff):
+            qs = qs.filter(project_id__in=auth_cache.member_project_ids(user))
+        elif hidden := deletion.hidden_project_ids():
+            qs = qs.exclude(project_id__in=hidden)
         project_id = self.request.query_params.get("project")
         if project_id:
             qs = qs.filter(project_id=project_id)
         return qs.order_by("position","id")
 
+    @sharding.atomic()
     def perform_create(self, serializer):
         project = serializer.validated_data.get("project")
         user = self.request.user
         if not project:
             raise ValidationError({"project_id": "project_id обязателен"})
-        if not (user.is_superuser or user.is_staff or project.participants.filter(id=user.id).exists()):
+        if not (user.is_superuser or user.is_staff or auth_cache.is_member(user, project)):
             raise PermissionDenied("Вы не участник проекта")
+        sharding.ensure_writable(project)
 
         col = serializer.validated_data.get("column", "new")
         if col == 'done' and not serializer.validated_data.get("completed_at"):
-            serializer.save(completed_at=timezone.now().date())
+            task = serializer.save(completed_at=timezone.now().date())
         else:
-            serializer.save()
-
+            task = serializer.save()
+        subtasks.attach(task)
+        new_state = counters.task_state(task)
+        counters.apply_task_change(new=new_state)
+        flow.record(task.pk, new=new_state)
+        counters.refresh(task.project)
+
+    # Старое состояние задачи для счётчиков и журнала берётся из строки, которую уже
+    # прочитал get_object, а запись идёт условным UPDATE по её версии (tasks/concurrency.py):
+    # если строку успели изменить, UPDATE не найдёт её — без SELECT FOR UPDATE и второго чтения.
+    # С If-Match конфликт — 412; без него перечитываем строку и повторяем (last-write-wins).
+    WRITE_ATTEMPTS = 3
+
+    def _reread(self, instance, client_version, attempt):
+        if client_version is not None or attempt + 1 == self.WRITE_ATTEMPTS:
+            raise PreconditionFailed()
+        return get_object_or_404(sharding.join(Task.objects, "project"), pk=instance.pk)
+
+    @sharding.atomic()
     def perform_update(self, serializer):
-        instance: Task = self.get_object()
+        instance: Task = serializer.instance
         project = serializer.validated_data.get("project") or instance.project
         user = self.request.user
-        if project and not (user.is_superuser or user.is_staff or project.participants.filter(id=user.id).exists()):
+        if project and not (user.is_superuser or user.is_staff or auth_cache.is_member(user, project)):
             raise PermissionDenied("Вы не участник проекта")
+        if sharding.is_sharded() and project and instance.project and project.shard != instance.project.shard:
+            raise ValidationError({"project_id": "Перенос задачи в проект на другом шарде не поддерживается"})
+        sharding.ensure_writable(project)
+
+        client_version = serializer.context.get("if_match")
+        new_col = serializer.validated_data.get("column")
+        for attempt in range(self.WRITE_ATTEMPTS):
+            serializer.instance = instance
+            serializer.context["if_match"] = instance.version if client_version is None else client_version
+            old_state = counters.task_state(instance)
+            old_parent_id = instance.parent_id
+            column = new_col or instance.column
+            extra = {}
+            if instance.column != 'done' and column == 'done' and not instance.completed_at:
+                extra["completed_at"] = timezone.now().date()
+            elif instance.column == 'done' and column != 'done':
+                extra["completed_at"] = None
+            try:
+                task = serializer.save(**extra)
+                break
+            except PreconditionFailed:
+                instance = self._reread(instance, client_version, attempt)
+        subtasks.move(task, old_parent_id)
+        new_state = counters.task_state(task)
+        counters.apply_task_change(old=old_state, new=new_state)
+        flow.record(task.pk, old=old_state, new=new_state)
+        counters.refresh(task.project)
+
+    @sharding.atomic()
+    def perform_destroy(self, instance):
+        sharding.ensure_writable(instance.project)
+        client_version = parse_if_match(self.request.headers.get("If-Match"))
+        for attempt in range(self.WRITE_ATTEMPTS):
+            try:
+                # условный UPDATE версии фиксирует прочитанное состояние (и держит строку до коммита)
+                conditional_update(instance, [], instance.version if client_version is None else client_version)
+                break
+            except PreconditionFailed:
+                instance = self._reread(instance, client_version, attempt)
+        old_state = counters.task_state(instance)
+        task_id = instance.pk
+        instance.delete()
+        counters.apply_task_change(old=old_state)
+        flow.record(task_id, old=old_state)
+
+    @action(detail=True, methods=["get"])
+    def subtree(self, request, pk=None):
+        """
+        GET /api/tasks/<id>/subtree/ — все подзадачи на всех уровнях плоским списком
+        с depth и parent_id (дерево собирает клиент), по (depth, position).
+        """
+        root = self.get_object()
+        qs = (sharding.join(subtasks.subtree(root.pk), "responsible", "project")
+              .prefetch_related("images").order_by("depth", "position", "id"))
+        tasks = list(qs)
+        data = self.get_serializer(tasks, many=True, context=self._rollup_context(tasks)).data
+        for row, task in zip(data, tasks):
+            row["depth"] = task.depth
+        return Response(data)
 
-        new_col = serializer.validated_data.get("column", instance.column)
-
-        if instance.column != 'done' and new_col == 'done' and not instance.completed_at:
-            serializer.save(completed_at=timezone.now().date())
-        elif instance.column == 'done' and new_col != 'done':
-            serializer.save(completed_at=None)
+    @action(detail=False, methods=["get"])
+    def mine(self, request):
+        """
+        GET /api/tasks/mine/[?limit=N] — открытые задачи caller'а во всех проектах (tasks/my_tasks.py):
+            {"columns": [{"column", "count", "next", "results"}, ...]}
+        next — ?column=<колонка>&cursor=<...>: следующая страница одной колонки (count там null).
+        """
+        limit = request.query_params.get("limit") or str(my_tasks.PAGE_SIZE)
+        if not limit.isdigit() or int(limit) == 0:
+            raise ValidationError({"limit": "Ожидается положительное число"})
+        limit = min(int(limit), my_tasks.MAX_PAGE_SIZE)
+        column = request.query_params.get("column")
+        if column is None:
+            pages = [(col, total, tasks, more)
+                     for col, (total, tasks, more) in my_tasks.first_pages(request.user, limit).items()]
+        elif column in my_tasks.OPEN_COLUMNS:
+            cursor = request.query_params.get("cursor")
+            try:
+                cursor = my_tasks.decode_cursor(cursor) if cursor else None
+            except ValueError:
+                raise ValidationError({"cursor": "Неверный курсор"})
+            tasks, more = my_tasks.column_page(request.user, column, cursor, limit)
+            pages = [(column, None, tasks, more)]
         else:
-            serializer.save()
+            raise ValidationError({"column": f"Ожидается одна из: {', '.join(my_tasks.OPEN_COLUMNS)}"})
+
+        base_url = remove_query_param(request.build_absolute_uri(), "cursor")
+        columns = []
+        for col, total, tasks, more in pages:
+            next_url = None
+            if more:
+                next_url = replace_query_param(replace_query_param(base_url, "column", col),
+                                               "cursor", my_tasks.encode_cursor(tasks[-1]))
+            columns.append({"column": col, "count": total, "next": next_url,
+                            "results": TaskBriefSerializer(tasks, many=True).data})
+        return Response({"columns": columns})
+
+    @action(detail=False, methods=["get"], url_path="archive")
+    def archive(self, request):
+        """
+        GET /api/tasks/archive/?project=N[&limit=&cursor=]
+        Заархивированные задачи (tasks/archive.py), курсорная пагинация.
+        """
+        user = request.user
+        qs = ArchivedTask.objects.select_related("responsible__profile")
+        if not (user.is_superuser or user.is_staff):
+            qs = qs.filter(project_id__in=auth_cache.member_project_ids(user))
+        elif hidden := deletion.hidden_project_ids():
+            qs = qs.exclude(project_id__in=hidden)
+        project_id = request.query_params.get("project")
+        if project_id:
+            if not project_id.isdigit():
+                raise ValidationError({"project": "Ожидается id проекта"})
+            qs = qs.filter(project_id=project_id)
+        paginator = ArchivePagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        data = ArchivedTaskSerializer(page, many=True, context={"request": request}).data
+        return paginator.get_paginated_response(data)
 
 
 # ---- Task Images ----
-class TaskImageViewSet(viewsets.ModelViewSet):
+class TaskImageViewSet(ShardedViewMixin, viewsets.ModelViewSet):
     """
     POST   /api/task-images/        -> загрузить новое изображение (с компрессией; кладём в конец)
     PATCH  /api/task-images/<id>/   -> безопасный реордер (position / task)
@@ -221,6 +522,7 @@ class TaskImageViewSet(viewsets.ModelViewSet):
     serializer_class = TaskImageSerializer
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser]
+    throttle_scope = "uploads"
 
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
@@ -246,11 +548,15 @@ class TaskImageViewSet(viewsets.ModelViewSet):
             task = Task.objects.get(pk=task_id)
         except Task.DoesNotExist:
             return Response({"detail": "Task not found"}, status=404)
+        sharding.ensure_writable(task.project)
 
-        try:
-            compressed_file, _name = compress_image_to_best(file_in, prefer_webp=True)
-        except Exception:
-            compressed_file = file_in
+        # Pillow грузится только здесь, а не при старте воркера (tasks/images.py)
+        from .images import compress_image_to_best
+        with throttling.compression_slot():   # занято — 503 + Retry-After
+            try:
+                compressed_file, _name = compress_image_to_best(file_in, prefer_webp=True)
+            except Exception:
+                compressed_file = file_in
 
         last = TaskImage.objects.filter(task=task).aggregate(m=Max("position"))["m"]
         next_pos = 0 if last is None else last + 1
@@ -261,9 +567,14 @@ class TaskImageViewSet(viewsets.ModelViewSet):
         ser = self.get_serializer(obj)
         return Response(ser.data, status=status.HTTP_201_CREATED)
 
-    @transaction.atomic
+    def perform_destroy(self, instance):
+        sharding.ensure_writable(instance.task.project)
+        super().perform_destroy(instance)
+
+    @sharding.atomic()
     def partial_update(self, request, *args, **kwargs):
         instance: TaskImage = self.get_object()
+        sharding.ensure_writable(instance.task.project)
         new_task_id = request.data.get("task", None)
         new_pos_raw = request.data.get("position", None)
 
@@ -272,6 +583,10 @@ class TaskImageViewSet(viewsets.ModelViewSet):
             try:
                 new_task = Task.objects.get(pk=new_task_id)
             except Task.DoesNotExist:
+                # ищем на шарде картинки: задача с другого шарда сюда не видна
+                if sharding.is_sharded() and sharding.locate(Task, new_task_id) is not None:
+                    return Response({"detail": "Перенос картинки в задачу на другом шарде не поддерживается"},
+                                    status=400)
                 return Response({"detail": "Task not found"}, status=404)
 
             TaskImage.objects.filter(task_id=instance.task_id, position__gt=instance.position) \
@@ -0,0 +1,37 @@
+// src/api/columnar.js
+// Декодер компактной доски: GET /api/tasks/?project=N
+// с заголовком Accept: application/vnd.kanban.columnar+json (см. tasks/columnar.py).
+// Возвращает массив задач в привычной форме; done_color считаем сами (computeDoneColor).
+
+export const COLUMNAR_ACCEPT = "application/vnd.kanban.columnar+json";
+
+function subtaskProgress([total, done]) {
+    return { total, done, progress: Math.round((done * 100) / total) };
+}
+
+export function decodeColumnarTasks(payload) {
+    if (!payload || payload.format !== "columnar/1") return [];
+    const { count, enums, dicts, columns: c } = payload;
+    const date = (i) => (i === null ? null : dicts.date[i]);
+    const tasks = new Array(count);
+    for (let i = 0; i < count; i++) {
+        const r = c.responsible[i];
+        tasks[i] = {
+            id: c.id[i],
+            title: c.title[i],
+            description: c.description[i],
+            column: enums.column[c.column[i]],
+            position: c.position[i],
+            priority: enums.priority[c.priority[i]],
+            due_date: date(c.due_date[i]),
+            completed_at: date(c.completed_at[i]),
+            project: c.project_id[i] === null ? null : { id: c.project_id[i] },
+            responsible: r === null ? null : dicts.users[r],
+            images: c.images[i].map(([id, position, url]) => ({ id, task: c.id[i], position, url })),
+            version: c.version ? c.version[i] : undefined,
+            parent_id: c.parent_id ? c.parent_id[i] : null,
+            subtasks: c.subtasks && c.subtasks[i] ? subtaskProgress(c.subtasks[i]) : null,
+        };
+    }
+    return tasks;
+}
@@ -0,0 +1,81 @@
+// src/api/users.js
+// Справочник пользователей для пикеров: GET /api/users/?q=<префикс>&limit=N
+// (курсорная пагинация {next, results}, см. users_list в tasks/views.py).
+// Полный список пользователей больше не грузим — ищем по префиксу и листаем по next.
+// Справочник показывает только тех, с кем уже есть общий проект; нового коллегу
+// находим точным совпадением логина или email (?exact=) — он встаёт первым в выдаче.
+
+import { useCallback, useEffect, useState } from "react";
+
+export const USER_PAGE_SIZE = 20;
+const SEARCH_DELAY_MS = 250;
+const EXACT_MIN_LENGTH = 3;
+
+async function fetchPage(url) {
+    const res = await fetch(url, { credentials: "include" });
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    const data = await res.json();
+    return { results: Array.isArray(data.results) ? data.results : [], next: data.next || null };
+}
+
+async function fetchExact(baseUrl, value) {
+    if (value.length < EXACT_MIN_LENGTH) return [];
+    const res = await fetch(`${baseUrl}/api/users/?exact=${encodeURIComponent(value)}`, { credentials: "include" });
+    if (!res.ok) return [];
+    const data = await res.json();
+    return Array.isArray(data) ? data : [];
+}
+
+function mergeUsers(first, rest) {
+    const seen = new Set(first.map((u) => u.id));
+    return [...first, ...rest.filter((u) => !seen.has(u.id))];
+}
+
+export function useUserDirectory(baseUrl, enabled = true) {
+    const [query, setQuery] = useState("");
+    const [results, setResults] = useState([]);
+    const [next, setNext] = useState(null);
+    const [loading, setLoading] = useState(false);
+
+    useEffect(() => {
+        if (!enabled) return;
+        let alive = true;
+        const timer = setTimeout(() => {
+            const value = query.trim();
+            setLoading(true);
+            Promise.all([
+                fetchPage(`${baseUrl}/api/users/?q=${encodeURIComponent(value)}&limit=${USER_PAGE_SIZE}`),
+                fetchExact(baseUrl, value),
+            ])
+                .then(([page, exact]) => {
+                    if (!alive) return;
+                    setResults(mergeUsers(exact, page.results));
+                    setNext(page.next);
+                })
+                .catch(() => {
+                    if (!alive) return;
+                    setResults([]);
+                    setNext(null);
+                })
+                .finally(() => alive && setLoading(false));
+        }, SEARCH_DELAY_MS);
+        return () => {
+            alive = false;
+            clearTimeout(timer);
+        };
+    }, [baseUrl, query, enabled]);
+
+    const loadMore = useCallback(() => {
+        if (!next || loading) return;
+        setLoading(true);
+        fetchPage(next)
+            .then((page) => {
+                setResults((prev) => mergeUsers(prev, page.results));
+                setNext(page.next);
+            })
+            .catch(() => setNext(null))
+            .finally(() => setLoading(false));
+    }, [next, loading]);
+
+    return { query, setQuery, results, hasMore: Boolean(next), loadMore, loading };
+}
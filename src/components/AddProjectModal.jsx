@@ -2,12 +2,13 @@
 import { useEffect, useMemo, useState } from "react";
 import { FaTimes, FaPlus } from "react-icons/fa";
 import { MdPeople } from "react-icons/md";
+import { useUserDirectory } from "../api/users";
 
 export default function AddProjectModal({
     open,
     onClose,
     onSubmit,
-    users = [],
+    baseUrl,
     loading = false,
     initialProject = null, // ← если есть — редактирование
 }) {
@@ -18,6 +19,9 @@ export default function AddProjectModal({
         participants: [], // массив ID выбранных пользователей
     });
     const [candidateId, setCandidateId] = useState("");
+    // выбранные пользователи по id — для подписей, когда их уже нет в текущей выдаче поиска
+    const [known, setKnown] = useState({});
+    const directory = useUserDirectory(baseUrl, open);
 
     // при открытии модалки заполняем из initialProject (если редактирование)
     useEffect(() => {
@@ -31,16 +35,18 @@ export default function AddProjectModal({
                     ? initialProject.participants.map((u) => u.id)
                     : [],
             });
-            setCandidateId("");
+            setKnown(Object.fromEntries((initialProject.participants || []).map((u) => [u.id, u])));
         } else {
             setForm({ title: "", description: "", due_date: "", participants: [] });
-            setCandidateId("");
+            setKnown({});
         }
+        setCandidateId("");
+        directory.setQuery("");
     }, [open, initialProject]);
 
     const availableUsers = useMemo(
-        () => users.filter((u) => !form.participants.includes(u.id)),
-        [users, form.participants]
+        () => directory.results.filter((u) => !form.participants.includes(u.id)),
+        [directory.results, form.participants]
     );
 
     if (!open) return null;
@@ -54,6 +60,8 @@ export default function AddProjectModal({
         const id = Number(candidateId);
         if (!id) return;
         if (form.participants.includes(id)) return;
+        const user = directory.results.find((u) => u.id === id);
+        if (user) setKnown((s) => ({ ...s, [id]: user }));
         setForm((s) => ({ ...s, participants: [...s.participants, id] }));
         setCandidateId("");
     };
@@ -139,6 +147,15 @@ export default function AddProjectModal({
                         <div>
                             <label className="block text-14 text-gray-700 mb-1">Люди в проекте</label>
 
+                            {/* поиск по username / отображаемому имени: справочник листается страницами */}
+                            <input
+                                value={directory.query}
+                                onChange={(e) => directory.setQuery(e.target.value)}
+                                onKeyDown={(e) => e.key === "Enter" && e.preventDefault()}
+                                className="w-full mb-2 rounded-lg border border-[#D8D8D8] px-3 py-2 outline-none focus:ring-2 focus:ring-darkblue/30"
+                                placeholder="Поиск: имя, логин или точный email"
+                            />
+
                             {/* выбор одного пользователя + плюс */}
                             <div className="flex items-center gap-2">
                                 <div className="flex items-center flex-1 border border-[#D8D8D8] rounded-lg px-3 h-[39px]">
@@ -169,11 +186,22 @@ export default function AddProjectModal({
                                 </button>
                             </div>
 
+                            {directory.hasMore && (
+                                <button
+                                    type="button"
+                                    onClick={directory.loadMore}
+                                    disabled={directory.loading}
+                                    className="mt-2 text-12 text-darkblue hover:underline disabled:opacity-60"
+                                >
+                                    Показать ещё
+                                </button>
+                            )}
+
                             {/* выбранные участники */}
                             {form.participants.length > 0 ? (
                                 <div className="mt-2 space-y-2">
                                     {form.participants.map((id) => {
-                                        const u = users.find((x) => x.id === id);
+                                        const u = known[id];
                                         if (!u) return null;
                                         return (
                                             <div
@@ -2,31 +2,38 @@
 import { useEffect, useMemo, useState } from "react";
 import { FaTimes, FaPlus } from "react-icons/fa";
 import { MdPeople } from "react-icons/md";
+import { useUserDirectory } from "../api/users";
 
 export default function ProjectPeopleModal({
     open,
     onClose,
-    onSubmit,          // (ids: number[]) => void
-    allUsers = [],     // полный список пользователей
-    initialIds = [],   // стартовый набор id участников
+    onSubmit,          // ({ add, remove }, users) => void — дельта к initialUsers и итоговый состав
+    baseUrl,
+    initialUsers = [], // текущие участники проекта (объекты пользователей)
     loading = false,
 }) {
     // 1) Все хуки — только наверху и всегда вызываются в одном порядке
     const [ids, setIds] = useState([]);
     const [candidateId, setCandidateId] = useState("");
+    // выбранные пользователи по id — для подписей, когда их уже нет в текущей выдаче поиска
+    const [known, setKnown] = useState({});
+    const directory = useUserDirectory(baseUrl, open);
 
-    // доступные к добавлению пользователи
+    // доступные к добавлению пользователи (текущая страница поиска)
     const availableUsers = useMemo(
-        () => allUsers.filter((u) => !ids.includes(u.id)),
-        [allUsers, ids]
+        () => directory.results.filter((u) => !ids.includes(u.id)),
+        [directory.results, ids]
     );
 
     // синхронизация при открытии модалки
     useEffect(() => {
         if (!open) return;
-        setIds(Array.isArray(initialIds) ? [...initialIds] : []);
+        const initial = Array.isArray(initialUsers) ? initialUsers : [];
+        setIds(initial.map((u) => u.id));
+        setKnown(Object.fromEntries(initial.map((u) => [u.id, u])));
         setCandidateId("");
-    }, [open, initialIds]);
+        directory.setQuery("");
+    }, [open, initialUsers]);
 
     // 2) После хуков можно безопасно сделать ранний выход
     if (!open) return null;
@@ -37,15 +44,24 @@ export default function ProjectPeopleModal({
     const add = () => {
         const id = Number(candidateId);
         if (!id || ids.includes(id)) return;
+        const user = directory.results.find((u) => u.id === id);
+        if (user) setKnown((s) => ({ ...s, [id]: user }));
         setIds((prev) => [...prev, id]);
         setCandidateId("");
     };
 
     const remove = (id) => setIds((prev) => prev.filter((x) => x !== id));
 
+    // на сервер уходит только разница с исходным составом (POST /api/projects/<id>/participants/)
     const handleSubmit = (e) => {
         e?.preventDefault?.();
-        onSubmit?.(ids);
+        const before = new Set((initialUsers || []).map((u) => u.id));
+        const after = new Set(ids);
+        const delta = {
+            add: ids.filter((id) => !before.has(id)),
+            remove: [...before].filter((id) => !after.has(id)),
+        };
+        onSubmit?.(delta, ids.map((id) => known[id]).filter(Boolean));
     };
 
     return (
@@ -63,6 +79,15 @@ export default function ProjectPeopleModal({
 
                     {/* Тело */}
                     <form onSubmit={handleSubmit} className="p-5 space-y-4">
+                        {/* поиск по username / отображаемому имени: справочник листается страницами */}
+                        <input
+                            value={directory.query}
+                            onChange={(e) => directory.setQuery(e.target.value)}
+                            onKeyDown={(e) => e.key === "Enter" && e.preventDefault()}
+                            className="w-full mb-2 rounded-lg border border-[#D8D8D8] px-3 py-2 outline-none focus:ring-2 focus:ring-darkblue/30"
+                            placeholder="Поиск: имя, логин или точный email"
+                        />
+
                         {/* Выбор одного пользователя + плюс */}
                         <div className="flex items-center gap-2">
                             <div className="flex items-center flex-1 border border-[#D8D8D8] rounded-lg px-3 h-[39px]">
@@ -93,11 +118,22 @@ export default function ProjectPeopleModal({
                             </button>
                         </div>
 
+                        {directory.hasMore && (
+                            <button
+                                type="button"
+                                onClick={directory.loadMore}
+                                disabled={directory.loading}
+                                className="mt-2 text-12 text-darkblue hover:underline disabled:opacity-60"
+                            >
+                                Показать ещё
+                            </button>
+                        )}
+
                         {/* Список выбранных */}
                         {ids.length > 0 ? (
                             <div className="mt-2 space-y-2">
                                 {ids.map((id) => {
-                                    const u = allUsers.find((x) => x.id === id);
+                                    const u = known[id];
                                     if (!u) return null;
                                     return (
                                         <div
@@ -12,6 +12,7 @@ import TaskColumn from '../components/TaskColumn';
 import AddTaskModal from "../components/TaskModal";
 import Switch from '../components/Switch';
 import ProjectPeopleModal from "../components/ProjectPeopleModal";
+import { COLUMNAR_ACCEPT, decodeColumnarTasks } from "../api/columnar";
 
 export default function ProjectBoard({ baseUrl, me }) {
     const { id } = useParams();
@@ -29,7 +30,6 @@ export default function ProjectBoard({ baseUrl, me }) {
     const [saving, setSaving] = useState(false);
 
     const [peopleOpen, setPeopleOpen] = useState(false);
-    const [allUsers, setAllUsers] = useState([]);
     const [savingPeople, setSavingPeople] = useState(false);
 
     const columnTypes = { new: "Новые", in_progress: "Выполняются", testing: "Тестирование", review: "Правки", done: "Выполнено" };
@@ -44,9 +44,13 @@ export default function ProjectBoard({ baseUrl, me }) {
     }, [baseUrl, projectId]);
 
     useEffect(() => {
-        fetch(`${baseUrl}/api/tasks/?project=${projectId}`, { credentials: 'include' })
+        // доска — компактным форматом (tasks/columnar.py): одна таблица вместо объекта на задачу
+        fetch(`${baseUrl}/api/tasks/?project=${projectId}`, {
+            credentials: 'include',
+            headers: { Accept: COLUMNAR_ACCEPT },
+        })
             .then(async (res) => { if (!res.ok) throw new Error(); return res.json(); })
-            .then((data) => setTasks(Array.isArray(data) ? data : []))
+            .then((data) => setTasks(decodeColumnarTasks(data).map(t => ({ ...t, done_color: computeDoneColor(t) }))))
             .catch(() => setTasks([]));
 
         // ВАЖНО: только участники проекта
@@ -56,34 +60,38 @@ export default function ProjectBoard({ baseUrl, me }) {
             .catch(() => setUsers([]));
     }, [baseUrl, projectId]);
 
-    useEffect(() => {
-        fetch(`${baseUrl}/api/users/`, { credentials: 'include' })
-            .then(r => r.ok ? r.json() : [])
-            .then(data => setAllUsers(Array.isArray(data) ? data : []))
-            .catch(() => setAllUsers([]));
-    }, [baseUrl]);
-
     const openPeople = () => setPeopleOpen(true);
     const closePeople = () => setPeopleOpen(false);
 
-    const savePeople = async (ids) => {
+    // состав меняем дельтой; If-Match — версия проекта, с которой открывали окно
+    const savePeople = async (delta, members) => {
+        if (!delta.add.length && !delta.remove.length) {
+            setPeopleOpen(false);
+            return;
+        }
         try {
             setSavingPeople(true);
-            const res = await fetch(`${baseUrl}/api/projects/${projectId}/`, {
-                method: 'PATCH',
+            const headers = {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken'),
+            };
+            if (project?.version) headers['If-Match'] = `"${project.version}"`;
+            const res = await fetch(`${baseUrl}/api/projects/${projectId}/participants/`, {
+                method: 'POST',
                 credentials: 'include',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'X-CSRFToken': getCookie('csrftoken'),
-                },
-                body: JSON.stringify({ participants_ids: ids }),
+                headers,
+                body: JSON.stringify(delta),
             });
+            if (res.status === 412) throw new Error('проект уже изменили — обновите страницу');
             if (!res.ok) throw new Error(await res.text());
-            const updated = await res.json();
+            const { participants_count, version } = await res.json();
 
             // обновляем проект и участников в состоянии
-            setProject(updated);
-            setUsers(Array.isArray(updated.participants) ? updated.participants : []);
+            setProject(p => p && ({
+                ...p, version,
+                counters: p.counters && { ...p.counters, participants: participants_count },
+            }));
+            setUsers(members);
             setPeopleOpen(false);
         } catch (e) {
             alert(`Не удалось сохранить участников: ${e.message || e}`);
@@ -102,12 +110,16 @@ export default function ProjectBoard({ baseUrl, me }) {
         if (!res.ok) throw new Error('createTask failed');
         return res.json();
     };
-    const patchTask = async (id, payload) => {
+    // version — из последнего ответа по задаче; с ним бэк вернёт 412, если карточку уже поменяли
+    const patchTask = async (id, payload, version) => {
+        const headers = { 'Content-Type': 'application/json', 'X-CSRFToken': getCookie('csrftoken') };
+        if (version) headers['If-Match'] = `"${version}"`;
         const res = await fetch(`${baseUrl}/api/tasks/${id}/`, {
             method: 'PATCH', credentials: 'include',
-            headers: { 'Content-Type': 'application/json', 'X-CSRFToken': getCookie('csrftoken') },
+            headers,
             body: JSON.stringify(payload),
         });
+        if (res.status === 412) throw new Error('Карточку уже изменили — обновите доску');
         if (!res.ok) throw new Error('patchTask failed');
         return res.json();
     };
@@ -166,7 +178,7 @@ export default function ProjectBoard({ baseUrl, me }) {
 
         try {
             // 2) Сохраняем на бэке
-            await patchTask(taskId, { column: toCol });
+            await patchTask(taskId, { column: toCol }, prev.find(t => t.id === taskId)?.version);
 
             // 3) Тянем актуальную карточку с бэка и кладём в стейт
             const refreshed = await fetch(`${baseUrl}/api/tasks/${taskId}/`, { credentials: 'include' })
@@ -197,7 +209,7 @@ export default function ProjectBoard({ baseUrl, me }) {
         try {
             setSaving(true);
             if (editingTask) {
-                await patchTask(editingTask.id, formPayload);
+                await patchTask(editingTask.id, formPayload, editingTask.version);
                 const refreshed = await fetch(`${baseUrl}/api/tasks/${editingTask.id}/`, { credentials: 'include' }).then(r => r.json());
                 const normalized = { ...refreshed, responsible: toRespObj(refreshed.responsible, users) };
                 setTasks(prev => prev.map(t => (t.id === refreshed.id ? normalized : t)));
@@ -380,8 +392,8 @@ export default function ProjectBoard({ baseUrl, me }) {
                     open={peopleOpen}
                     onClose={closePeople}
                     onSubmit={savePeople}
-                    allUsers={allUsers}
-                    initialIds={Array.isArray(users) ? users.map(u => u.id) : []}
+                    baseUrl={baseUrl}
+                    initialUsers={users}
                     loading={savingPeople}
                 />
             </div>
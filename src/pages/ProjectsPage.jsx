@@ -14,7 +14,6 @@ export default function ProjectsPage({ baseUrl, me }) {
     const [projects, setProjects] = useState([]);
     const [loading, setLoading] = useState(true);
 
-    const [users, setUsers] = useState([]);
     const [modalOpen, setModalOpen] = useState(false);
     const [saving, setSaving] = useState(false);
     const [editingProject, setEditingProject] = useState(null);
@@ -37,15 +36,6 @@ export default function ProjectsPage({ baseUrl, me }) {
         return () => (alive = false);
     }, [baseUrl]);
 
-    useEffect(() => {
-        let alive = true;
-        fetch(`${baseUrl}/api/users/`, { credentials: "include" })
-            .then((r) => (r.ok ? r.json() : []))
-            .then((data) => alive && setUsers(Array.isArray(data) ? data : []))
-            .catch(() => alive && setUsers([]));
-        return () => (alive = false);
-    }, [baseUrl]);
-
     useEffect(() => {
         let alive = true;
         setLoadingStats(true);
@@ -289,7 +279,7 @@ export default function ProjectsPage({ baseUrl, me }) {
                 open={modalOpen}
                 onClose={closeModal}
                 onSubmit={editingProject ? handleEditSubmit : handleCreate}
-                users={users}
+                baseUrl={baseUrl}
                 loading={saving}
                 initialProject={editingProject}
             />